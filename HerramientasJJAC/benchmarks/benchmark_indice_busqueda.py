@@ -0,0 +1,87 @@
+# benchmarks/benchmark_indice_busqueda.py
+"""
+Mide cuánto tarda en estar lista una búsqueda con el índice persistente de los buscadores.
+
+Genera un archivo histórico (años / meses / carpetas de factura con PDF) y compara el
+recorrido completo con os.walk que hacían los buscadores en cada ejecución con la
+construcción inicial de indice_busqueda.IndiceBusqueda y con su actualización cuando
+nada cambió y cuando cambiaron unas pocas carpetas.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_indice_busqueda.py --carpetas 5000 --archivos 4
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logica.core import indice_busqueda
+from logica.core.indice_busqueda import IndiceBusqueda
+
+
+def generar_archivo(ruta_raiz, carpetas, archivos):
+    for n in range(carpetas):
+        ruta_carpeta = os.path.join(ruta_raiz, f"20{n % 5}", f"mes{n % 12:02d}", f"{100000 + n}")
+        os.makedirs(ruta_carpeta)
+        for k in range(archivos):
+            open(os.path.join(ruta_carpeta, f"FERD{100000 + n}_{k}.pdf"), 'wb').close()
+
+
+def recorrido_completo(ruta_raiz):
+    carpetas, pdfs = {}, {}
+    for dirpath, dirnames, filenames in os.walk(ruta_raiz):
+        for dirname in dirnames:
+            carpetas.setdefault(dirname, []).append(os.path.join(dirpath, dirname))
+        for filename in filenames:
+            if filename.lower().endswith('.pdf'):
+                pdfs.setdefault(os.path.splitext(filename)[0].lower(), []).append(os.path.join(dirpath, filename))
+    return carpetas, pdfs
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=5000)
+    parser.add_argument("--archivos", type=int, default=4, help="PDF por carpeta.")
+    parser.add_argument("--cambios", type=int, default=20, help="Carpetas nuevas antes de la última actualización.")
+    args = parser.parse_args()
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_indice_")
+    ruta_archivo = os.path.join(ruta_trabajo, "archivo")
+    # Las fechas recién escritas están dentro del margen de resolución: se anula para medir.
+    indice_busqueda.MARGEN_FECHA_RECIENTE_NS = 0
+    try:
+        generar_archivo(ruta_archivo, args.carpetas, args.archivos)
+        print(f"Archivo generado: {args.carpetas} carpetas x {args.archivos} PDF.\n")
+
+        _, segundos = cronometrar(lambda: recorrido_completo(ruta_archivo))
+        print(f"{'os.walk completo':<34} {segundos:>8.3f} s")
+
+        indice = IndiceBusqueda(ruta_archivo, os.path.join(ruta_trabajo, "indice.sqlite"))
+        for descripcion in ("Índice: construcción inicial", "Índice: actualización sin cambios"):
+            resumen, segundos = cronometrar(indice.actualizar)
+            print(f"{descripcion:<34} {segundos:>8.3f} s  ({resumen.revisadas} revisadas, {resumen.releidas} releídas)")
+
+        for n in range(args.cambios):
+            os.makedirs(os.path.join(ruta_archivo, f"20{n % 5}", f"mes{n % 12:02d}", f"nueva{n}"))
+        resumen, segundos = cronometrar(indice.actualizar)
+        print(f"{f'Índice: con {args.cambios} carpetas nuevas':<34} {segundos:>8.3f} s  ({resumen.revisadas} revisadas, {resumen.releidas} releídas)")
+
+        _, segundos = cronometrar(lambda: [indice.buscar_carpetas(str(100000 + n)) for n in range(0, args.carpetas, 10)])
+        print(f"{'Búsquedas (1 de cada 10 carpetas)':<34} {segundos:>8.3f} s")
+        indice.cerrar()
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/benchmark_instantanea_carpeta.py
+"""
+Cuenta las llamadas al sistema de archivos al recorrer una cuenta (raíz y subcarpetas).
+
+Compara el recorrido anterior de los workers (os.listdir y luego os.path.isdir o
+os.path.isfile por cada entrada) con gestor_archivos.InstantaneaCarpeta (un
+os.scandir por directorio). Con --latencia-ms cada llamada espera ese tiempo, para
+simular una unidad de red en la que cada consulta es un viaje al servidor.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_instantanea_carpeta.py --carpetas 300 --archivos 8 --latencia-ms 0.5
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from collections import Counter
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logica.core.gestor_archivos import InstantaneaCarpeta
+
+# En Windows DirEntry.stat() usa los datos del listado; en otros sistemas es un stat.
+_STAT_DE_ENTRADA_ES_LLAMADA = os.name != "nt"
+
+
+def generar_cuenta(ruta_raiz, carpetas, archivos):
+    for n in range(carpetas):
+        ruta_carpeta = os.path.join(ruta_raiz, f"{1000 + n}")
+        os.makedirs(ruta_carpeta)
+        for k in range(archivos):
+            with open(os.path.join(ruta_carpeta, f"soporte_{k}.pdf"), 'wb') as archivo:
+                archivo.write(b"%PDF-1.4\n")
+
+
+def recorrido_anterior(ruta_raiz):
+    subcarpetas = [os.path.join(ruta_raiz, d) for d in os.listdir(ruta_raiz) if os.path.isdir(os.path.join(ruta_raiz, d))]
+    archivos = 0
+    for ruta_carpeta in subcarpetas:
+        for nombre in os.listdir(ruta_carpeta):
+            if os.path.isfile(os.path.join(ruta_carpeta, nombre)):
+                archivos += 1
+    return archivos
+
+
+def recorrido_con_instantanea(ruta_raiz):
+    instantanea = InstantaneaCarpeta(ruta_raiz)
+    archivos = 0
+    for carpeta in instantanea.carpetas():
+        archivos += sum(not entrada.es_carpeta for entrada in instantanea.contenido(carpeta.nombre))
+    return archivos
+
+
+class _EntradaContada:
+    def __init__(self, entrada, contar):
+        self._entrada = entrada
+        self._contar = contar
+
+    def __getattr__(self, nombre):
+        return getattr(self._entrada, nombre)
+
+    def stat(self, **kwargs):
+        if _STAT_DE_ENTRADA_ES_LLAMADA:
+            self._contar("DirEntry.stat")
+        return self._entrada.stat(**kwargs)
+
+
+class _ScandirContado:
+    def __init__(self, iterador, contar):
+        self._iterador = iterador
+        self._contar = contar
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self._iterador.close()
+        return False
+
+    def __iter__(self):
+        return (_EntradaContada(entrada, self._contar) for entrada in self._iterador)
+
+
+def medir(recorrido, ruta_raiz, latencia):
+    """Ejecuta 'recorrido' contando (y retrasando) cada llamada. Devuelve (conteo, segundos, archivos)."""
+    conteo = Counter()
+
+    def contar(nombre):
+        conteo[nombre] += 1
+        if latencia:
+            time.sleep(latencia)
+
+    def envolver(nombre, funcion):
+        def envoltura(*args, **kwargs):
+            contar(nombre)
+            return funcion(*args, **kwargs)
+        return envoltura
+
+    scandir_original = os.scandir
+    parches = [
+        mock.patch("os.listdir", envolver("listdir", os.listdir)),
+        mock.patch("os.path.isdir", envolver("isdir", os.path.isdir)),
+        mock.patch("os.path.isfile", envolver("isfile", os.path.isfile)),
+        mock.patch("os.scandir", envolver("scandir", lambda ruta: _ScandirContado(scandir_original(ruta), contar))),
+    ]
+    for parche in parches:
+        parche.start()
+    try:
+        inicio = time.perf_counter()
+        archivos = recorrido(ruta_raiz)
+        return conteo, time.perf_counter() - inicio, archivos
+    finally:
+        for parche in parches:
+            parche.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=300)
+    parser.add_argument("--archivos", type=int, default=8, help="Archivos por carpeta.")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Retraso simulado por llamada.")
+    args = parser.parse_args()
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_instantanea_")
+    try:
+        generar_cuenta(ruta_trabajo, args.carpetas, args.archivos)
+        print(f"Cuenta generada: {args.carpetas} carpetas x {args.archivos} archivos; latencia {args.latencia_ms} ms/llamada.")
+        print(f"\n{'Recorrido':<12} {'Llamadas':>9} {'Tiempo (s)':>11}  Detalle")
+        for nombre, recorrido in (("anterior", recorrido_anterior), ("instantánea", recorrido_con_instantanea)):
+            conteo, segundos, archivos = medir(recorrido, ruta_trabajo, args.latencia_ms / 1000)
+            assert archivos == args.carpetas * args.archivos
+            detalle = ", ".join(f"{llamada}={cantidad}" for llamada, cantidad in sorted(conteo.items()))
+            print(f"{nombre:<12} {sum(conteo.values()):>9} {segundos:>11.3f}  {detalle}")
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
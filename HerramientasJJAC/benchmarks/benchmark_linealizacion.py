@@ -0,0 +1,82 @@
+# benchmarks/benchmark_linealizacion.py
+"""
+Mide el costo de linealizar los PDF unidos en la ruta de escritura de Unir Soportes.
+
+Une un corpus generado con el motor por defecto y después linealiza cada resultado
+con optimizador_salida.linealizar_pdf. Reporta el tiempo de la unión, el tiempo
+adicional de la linealización, el aumento de tamaño y cuántos bytes hay que descargar
+antes de poder mostrar la primera página: el archivo completo si no está linealizado,
+o hasta el final de la primera página (/E del diccionario de linealización) si lo está.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_linealizacion.py --carpetas 5 --paginas 60
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_motores_fusion import generar_corpus
+from logica.core.motores_fusion import MOTOR_POR_DEFECTO, obtener_motor
+from logica.core.optimizador_salida import LINEALIZACION_DISPONIBLE, linealizar_pdf
+
+_PATRON_FIN_PRIMERA_PAGINA = re.compile(rb"/Linearized\b.*?/E\s+(\d+)", re.DOTALL)
+
+
+def bytes_hasta_primera_pagina(ruta_pdf):
+    """Bytes que un visor debe descargar antes de mostrar la primera página."""
+    with open(ruta_pdf, 'rb') as archivo:
+        inicio = archivo.read(1024)
+    coincidencia = _PATRON_FIN_PRIMERA_PAGINA.search(inicio)
+    return int(coincidencia.group(1)) if coincidencia else os.path.getsize(ruta_pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=5)
+    parser.add_argument("--paginas", type=int, default=60, help="Páginas por cada soporte.")
+    parser.add_argument("--lado-imagen", type=int, default=800, help="Lado en píxeles de la imagen por página (0 = sin imagen).")
+    args = parser.parse_args()
+
+    if not LINEALIZACION_DISPONIBLE:
+        sys.exit("La linealización requiere pikepdf (pip install pikepdf).")
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_linealizacion_")
+    try:
+        print(f"Generando corpus: {args.carpetas} carpetas x 2 soportes x {args.paginas} páginas...")
+        generar_corpus(ruta_trabajo, args.carpetas, args.paginas, args.lado_imagen)
+
+        motor = obtener_motor(MOTOR_POR_DEFECTO)
+        tiempo_union = tiempo_linealizacion = 0.0
+        print(f"\n{'Carpeta':<8} {'Unido (MB)':>11} {'Aumento (KB)':>13} {'1.ª pág. antes (KB)':>20} {'1.ª pág. después (KB)':>22}")
+        for nombre_carpeta in sorted(os.listdir(ruta_trabajo)):
+            ruta_carpeta = os.path.join(ruta_trabajo, nombre_carpeta)
+            destino = os.path.join(ruta_carpeta, "destino.pdf")
+            fuentes = [os.path.join(ruta_carpeta, f"soporte_{k}.pdf") for k in range(2)]
+
+            inicio = time.perf_counter()
+            motor.fusionar(destino, fuentes)
+            tiempo_union += time.perf_counter() - inicio
+            antes = bytes_hasta_primera_pagina(destino)
+
+            inicio = time.perf_counter()
+            aumento = linealizar_pdf(destino)
+            tiempo_linealizacion += time.perf_counter() - inicio
+            despues = bytes_hasta_primera_pagina(destino)
+
+            print(f"{nombre_carpeta:<8} {os.path.getsize(destino) / (1024 * 1024):>11.2f} {aumento / 1024:>13.1f} "
+                  f"{antes / 1024:>20.0f} {despues / 1024:>22.0f}")
+
+        print(f"\nUnión: {tiempo_union:.2f} s; linealización: {tiempo_linealizacion:.2f} s "
+              f"(+{100 * tiempo_linealizacion / tiempo_union:.0f} % sobre la unión, motor {MOTOR_POR_DEFECTO}).")
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
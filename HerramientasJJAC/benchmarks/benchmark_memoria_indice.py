@@ -0,0 +1,97 @@
+# benchmarks/benchmark_memoria_indice.py
+"""
+Reporta los bytes por archivo indexado de la Estrategia B de Buscar Soportes NU.
+
+Genera un archivo histórico con rutas largas (año / mes / cuenta / factura) y compara
+el índice en memoria que construía la Estrategia B (dict de nombres en minúsculas a
+listas de rutas completas, medido con tracemalloc) con el índice persistente
+indice_busqueda.IndiceBusqueda (tamaño de la base de datos en disco; en memoria solo
+queda la caché de páginas de SQLite, que es acotada). Comprueba además que ambos
+devuelven lo mismo para una muestra de nombres.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_memoria_indice.py --carpetas 20000 --archivos 5
+"""
+import os
+import sys
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logica.core.indice_busqueda import IndiceBusqueda
+
+MESES = ("ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO",
+         "JULIO", "AGOSTO", "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE")
+
+
+def generar_archivo(ruta_raiz, carpetas, archivos):
+    for n in range(carpetas):
+        ruta_carpeta = os.path.join(
+            ruta_raiz, f"20{20 + n % 5}", MESES[n // 5 % 12], f"CUENTA DE COBRO {n // 60:05d} ASEGURADORA", f"{100000 + n}"
+        )
+        os.makedirs(ruta_carpeta)
+        for k in range(archivos):
+            open(os.path.join(ruta_carpeta, f"FERD{100000 + n}_soporte_{k}.pdf"), 'wb').close()
+
+
+def indice_en_memoria(ruta_raiz):
+    """El índice de la Estrategia B antes del índice persistente."""
+    indice_archivos = {}
+    for dirpath, _, filenames in os.walk(ruta_raiz):
+        for filename in filenames:
+            if filename.lower().endswith('.pdf'):
+                nombre_sin_ext, _ = os.path.splitext(filename)
+                indice_archivos.setdefault(nombre_sin_ext.lower(), []).append(os.path.join(dirpath, filename))
+    return indice_archivos
+
+
+def bytes_por_tabla(ruta_bd):
+    """{tabla o índice: bytes}, si SQLite se compiló con la tabla virtual dbstat."""
+    conexion = sqlite3.connect(ruta_bd)
+    try:
+        return dict(conexion.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC"))
+    except sqlite3.Error:
+        return {}
+    finally:
+        conexion.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=20000)
+    parser.add_argument("--archivos", type=int, default=5, help="PDF por carpeta.")
+    args = parser.parse_args()
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_memoria_indice_")
+    ruta_archivo = os.path.join(ruta_trabajo, "archivo")
+    try:
+        generar_archivo(ruta_archivo, args.carpetas, args.archivos)
+        total = args.carpetas * args.archivos
+        print(f"Archivo generado: {args.carpetas} carpetas x {args.archivos} PDF = {total} archivos.\n")
+
+        tracemalloc.start()
+        referencia = indice_en_memoria(ruta_archivo)
+        en_memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'dict en memoria (antes)':<30} {en_memoria / total:>8.0f} bytes/archivo  ({en_memoria / 2**20:.1f} MB)")
+
+        ruta_bd = os.path.join(ruta_trabajo, "indice.sqlite")
+        indice = IndiceBusqueda(ruta_archivo, ruta_bd)
+        indice.actualizar()
+        for nombre in list(referencia)[::max(1, len(referencia) // 500)]:
+            assert sorted(indice.buscar_pdf(nombre)) == sorted(referencia[nombre]), nombre
+        indice.cerrar()
+        en_disco = os.path.getsize(ruta_bd)
+        print(f"{'IndiceBusqueda (en disco)':<30} {en_disco / total:>8.0f} bytes/archivo  ({en_disco / 2**20:.1f} MB)")
+        for nombre, tamano in bytes_por_tabla(ruta_bd).items():
+            print(f"    {nombre:<26} {tamano / total:>8.1f} bytes/archivo")
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
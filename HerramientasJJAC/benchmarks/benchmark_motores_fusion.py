@@ -0,0 +1,135 @@
+# benchmarks/benchmark_motores_fusion.py
+"""
+Compara los motores de unión de logica.core.motores_fusion sobre un corpus generado.
+
+Cada motor se mide en un proceso aparte (para que el pico de memoria de uno no
+contamine al otro) y se reporta el tiempo total, el pico de memoria residente y el
+tamaño total de los PDF resultantes.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_motores_fusion.py --carpetas 20 --paginas 30
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logica.core.motores_fusion import MOTORES, obtener_motor
+
+
+def _pico_memoria_mb():
+    """Pico de memoria residente del proceso actual en MB, o None si no se puede medir."""
+    try:
+        import resource
+    except ImportError:
+        return _pico_memoria_mb_windows()
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB y macOS en bytes.
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _pico_memoria_mb_windows():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ContadoresMemoria(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        contadores = ContadoresMemoria()
+        contadores.cb = ctypes.sizeof(contadores)
+        proceso = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+            return None
+        return contadores.PeakWorkingSetSize / (1024 * 1024)
+    except (ImportError, AttributeError, OSError):
+        return None
+
+
+def _crear_pdf(ruta, titulo, paginas, lado_imagen):
+    """PDF con texto y una imagen de ruido por página, parecido a un soporte escaneado."""
+    documento = fitz.open()
+    for i in range(paginas):
+        pagina = documento.new_page()
+        pagina.insert_text((72, 72), f"{titulo} - página {i + 1}")
+        if lado_imagen:
+            # Ruido en escala de grises: se comprime tan mal como un escaneo real.
+            pixmap = fitz.Pixmap(fitz.csGRAY, lado_imagen, lado_imagen, os.urandom(lado_imagen * lado_imagen), False)
+            pagina.insert_image(fitz.Rect(72, 100, 520, 548), pixmap=pixmap)
+    documento.save(ruta, deflate=True)
+    documento.close()
+
+
+def generar_corpus(ruta_base, carpetas, paginas, lado_imagen):
+    """Crea 'carpetas' carpetas, cada una con un destino y dos fuentes de 'paginas' páginas."""
+    for n in range(carpetas):
+        ruta_carpeta = os.path.join(ruta_base, f"{1000 + n}")
+        os.makedirs(ruta_carpeta)
+        _crear_pdf(os.path.join(ruta_carpeta, "destino.pdf"), f"Respuesta {n}", 2, 0)
+        for k in range(2):
+            _crear_pdf(os.path.join(ruta_carpeta, f"soporte_{k}.pdf"), f"Soporte {n}-{k}", paginas, lado_imagen)
+
+
+def _medir_motor(nombre_motor, ruta_corpus, incremental, cola):
+    motor = obtener_motor(nombre_motor)
+    inicio = time.perf_counter()
+    tamano_total = 0
+    for nombre_carpeta in sorted(os.listdir(ruta_corpus)):
+        ruta_carpeta = os.path.join(ruta_corpus, nombre_carpeta)
+        destino = os.path.join(ruta_carpeta, "destino.pdf")
+        fuentes = [os.path.join(ruta_carpeta, f"soporte_{k}.pdf") for k in range(2)]
+        motor.fusionar(destino, fuentes, incremental=incremental)
+        tamano_total += os.path.getsize(destino)
+    cola.put((time.perf_counter() - inicio, _pico_memoria_mb(), tamano_total))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=10)
+    parser.add_argument("--paginas", type=int, default=20, help="Páginas por cada soporte.")
+    parser.add_argument("--lado-imagen", type=int, default=600, help="Lado en píxeles de la imagen por página (0 = sin imagen).")
+    parser.add_argument("--incremental", action="store_true", help="Mide la escritura incremental.")
+    args = parser.parse_args()
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_motores_")
+    try:
+        ruta_original = os.path.join(ruta_trabajo, "original")
+        print(f"Generando corpus: {args.carpetas} carpetas x 2 soportes x {args.paginas} páginas...")
+        generar_corpus(ruta_original, args.carpetas, args.paginas, args.lado_imagen)
+
+        contexto = multiprocessing.get_context("spawn")
+        print(f"\n{'Motor':<10} {'Tiempo (s)':>11} {'Pico RSS (MB)':>14} {'Salida (MB)':>12}")
+        for nombre_motor in MOTORES:
+            ruta_corpus = os.path.join(ruta_trabajo, nombre_motor)
+            shutil.copytree(ruta_original, ruta_corpus)
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_medir_motor, args=(nombre_motor, ruta_corpus, args.incremental, cola))
+            proceso.start()
+            tiempo, pico, tamano = cola.get()
+            proceso.join()
+            pico_texto = f"{pico:.1f}" if pico is not None else "n/d"
+            print(f"{nombre_motor:<10} {tiempo:>11.2f} {pico_texto:>14} {tamano / (1024 * 1024):>12.2f}")
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
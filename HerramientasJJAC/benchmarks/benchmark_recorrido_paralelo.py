@@ -0,0 +1,89 @@
+# benchmarks/benchmark_recorrido_paralelo.py
+"""
+Mide el recorrido paralelo de carpetas frente a os.walk en un árbol con latencia simulada.
+
+Genera un árbol local y hace que cada os.scandir, os.stat y os.lstat espere
+--latencia-ms (como un viaje al servidor en una unidad de red). Compara os.walk con
+recorrido_paralelo.recorrer_arbol (ordenado y sin orden) y la construcción y la
+actualización del índice de los buscadores con 1 hilo y con --hilos hilos.
+
+Uso (desde la carpeta HerramientasJJAC):
+    python benchmarks/benchmark_recorrido_paralelo.py --carpetas 2000 --latencia-ms 2 --hilos 8
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_indice_busqueda import generar_archivo
+from logica.core import indice_busqueda
+from logica.core.indice_busqueda import IndiceBusqueda
+from logica.core.recorrido_paralelo import recorrer_arbol
+
+
+def con_latencia(latencia):
+    """Parches que agregan 'latencia' segundos a cada llamada que consulta el disco."""
+    def envolver(funcion):
+        def envoltura(*args, **kwargs):
+            time.sleep(latencia)
+            return funcion(*args, **kwargs)
+        return envoltura
+    return [mock.patch(f"os.{nombre}", envolver(getattr(os, nombre))) for nombre in ("scandir", "stat", "lstat")]
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carpetas", type=int, default=2000)
+    parser.add_argument("--archivos", type=int, default=2, help="PDF por carpeta.")
+    parser.add_argument("--latencia-ms", type=float, default=2.0, help="Retraso simulado por llamada.")
+    parser.add_argument("--hilos", type=int, default=8)
+    args = parser.parse_args()
+
+    ruta_trabajo = tempfile.mkdtemp(prefix="bench_recorrido_")
+    ruta_archivo = os.path.join(ruta_trabajo, "archivo")
+    # Las fechas recién escritas están dentro del margen de resolución: se anula para medir.
+    indice_busqueda.MARGEN_FECHA_RECIENTE_NS = 0
+    try:
+        generar_archivo(ruta_archivo, args.carpetas, args.archivos)
+        print(f"Árbol generado: {args.carpetas} carpetas x {args.archivos} PDF; latencia {args.latencia_ms} ms/llamada.\n")
+
+        parches = con_latencia(args.latencia_ms / 1000)
+        for parche in parches:
+            parche.start()
+        try:
+            referencia, base = cronometrar(lambda: list(os.walk(ruta_archivo)))
+            print(f"{'os.walk':<46} {base:>8.2f} s")
+            for ordenado in (True, False):
+                resultado, segundos = cronometrar(lambda: list(recorrer_arbol(ruta_archivo, args.hilos, ordenado)))
+                assert (resultado == referencia) if ordenado else (sorted(resultado) == sorted(referencia))
+                descripcion = f"recorrer_arbol, {args.hilos} hilos, {'ordenado' if ordenado else 'sin orden'}"
+                print(f"{descripcion:<46} {segundos:>8.2f} s  (x{base / segundos:.1f})")
+
+            for hilos in (1, args.hilos):
+                ruta_bd = os.path.join(ruta_trabajo, f"indice_{hilos}.sqlite")
+                indice = IndiceBusqueda(ruta_archivo, ruta_bd)
+                _, construccion = cronometrar(lambda: indice.actualizar(hilos=hilos))
+                _, actualizacion = cronometrar(lambda: indice.actualizar(hilos=hilos))
+                indice.cerrar()
+                print(f"{f'Índice, {hilos} hilo(s): construcción':<46} {construccion:>8.2f} s")
+                print(f"{f'Índice, {hilos} hilo(s): actualización sin cambios':<46} {actualizacion:>8.2f} s")
+        finally:
+            for parche in parches:
+                parche.stop()
+    finally:
+        shutil.rmtree(ruta_trabajo, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
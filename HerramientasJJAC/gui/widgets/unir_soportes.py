@@ -1,9 +1,14 @@
 # gui/widget_unir_soportes.py
+import os
 import sys
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QFrame, QLabel, QLineEdit, QPushButton, QHBoxLayout, 
-                               QFileDialog, QMessageBox, QProgressBar, QDialog, QScrollArea, QGridLayout, QGroupBox, QTextEdit)
+                               QFileDialog, QMessageBox, QProgressBar, QDialog, QScrollArea, QGridLayout, QGroupBox, QTextEdit,
+                               QSpinBox, QCheckBox, QComboBox)
 from PySide6.QtCore import Qt, QThread
 from logica.workers.unir_soportes_logic import UnirSoportesWorker
+from logica.core.motores_fusion import MOTORES, MOTOR_POR_DEFECTO
+from logica.core.optimizador_salida import LINEALIZACION_DISPONIBLE, describir_tamano
+from logica.core.triaje_pdf import NOMBRE_INFORME_CUARENTENA
 from gui.common.componentes_comunes import SelectorCarpeta
 
 class ResultadosDialog(QDialog):
@@ -41,6 +46,45 @@ class ResultadosDialog(QDialog):
             for item in resultados['fallidos']:
                 html_content += f"✖ {item['carpeta']}: {item['razon']}<br>"
             html_content += '</div>'
+
+        # Resumen de la optimización de salida
+        ahorrado = describir_tamano(resultados.get('bytes_ahorrados', 0))
+        if ahorrado:
+            html_content += '<h2 style="font-size: 16px; font-weight: bold; color: #3498db;">OPTIMIZACIÓN</h2>'
+            html_content += f'<div style="color: #ecf0f1;">Espacio ahorrado en total: {ahorrado}<br></div>'
+
+        if resultados.get('paginas_omitidas'):
+            html_content += '<h2 style="font-size: 16px; font-weight: bold; color: #3498db;">PÁGINAS REPETIDAS</h2>'
+            html_content += f'<div style="color: #ecf0f1;">Páginas omitidas en total: {resultados["paginas_omitidas"]}<br></div>'
+
+        # Carpetas que más memoria necesitaron
+        if resultados.get('memoria_por_carpeta'):
+            mayores = sorted(resultados['memoria_por_carpeta'], key=lambda item: item['pico_bytes'], reverse=True)
+            html_content += '<h2 style="font-size: 16px; font-weight: bold; color: #3498db;">MEMORIA (pico por carpeta)</h2>'
+            html_content += '<div style="color: #ecf0f1;">'
+            for item in mayores[:5]:
+                html_content += f"{item['carpeta']}: {item['pico_bytes'] / (1024 * 1024):.0f} MB<br>"
+            html_content += '</div>'
+
+        # Resumen de la revisión previa
+        if 'triaje' in resultados:
+            triaje = resultados['triaje']
+            html_content += '<h2 style="font-size: 16px; font-weight: bold; color: #3498db;">REVISIÓN PREVIA</h2>'
+            html_content += '<div style="color: #ecf0f1;">'
+            html_content += f"PDFs revisados: {triaje['revisados']}<br>"
+            html_content += f"En cuarentena: {triaje['en_cuarentena']}<br>"
+            html_content += f"Reparados: {triaje['reparados']}<br>"
+            html_content += '</div>'
+
+        # Resumen del modo plan
+        if 'plan' in resultados:
+            plan = resultados['plan']
+            html_content += '<h2 style="font-size: 16px; font-weight: bold; color: #3498db;">PLAN (no se modificó ningún archivo)</h2>'
+            html_content += '<div style="color: #ecf0f1;">'
+            html_content += f"Carpetas a unir: {plan['carpetas_a_unir']}<br>"
+            html_content += f"Páginas resultantes: {plan['paginas']}<br>"
+            html_content += f"Tamaño estimado: {plan['bytes'] / (1024 * 1024):.2f} MB<br>"
+            html_content += '</div>'
         
         # Asegurarse de que el fondo del QTextEdit coincida con el tema oscuro
         resultados_texto.setStyleSheet("background-color: #2c3e50; color: #ecf0f1; border: 1px solid #34495e;")
@@ -106,16 +150,160 @@ class UnirSoportesWidget(QWidget):
         layout_modo.addWidget(self.boton_aseguradoras)
         layout_modo.addWidget(self.boton_adres)
         layout_principal.addWidget(group_modo)
+
+        # 3. Grupo de Opciones
+        group_opciones = QGroupBox("3. Opciones")
+        layout_opciones = QGridLayout(group_opciones)
+
+        self.spin_procesos = QSpinBox()
+        self.spin_procesos.setRange(1, os.cpu_count() or 1)
+        self.spin_procesos.setValue(1)
+        self.spin_procesos.setToolTip("Con más de 1 proceso las carpetas se unen en paralelo usando varios núcleos.")
+        layout_opciones.addWidget(QLabel("Procesos en paralelo:"), 0, 0)
+        layout_opciones.addWidget(self.spin_procesos, 0, 1)
+
+        self.check_cache_huellas = QCheckBox("Recordar páginas ya verificadas (caché en la carpeta raíz)")
+        self.check_cache_huellas.setChecked(True)
+        self.check_cache_huellas.setToolTip("Evita volver a leer el texto de los PDFs que no cambiaron desde la última ejecución.")
+        layout_opciones.addWidget(self.check_cache_huellas, 1, 0, 1, 2)
+
+        self.check_incremental = QCheckBox("Anexar al final del PDF sin reescribirlo (actualización incremental)")
+        self.check_incremental.setToolTip("Solo se escriben las páginas nuevas; útil con respuestas muy grandes o en red.")
+        layout_opciones.addWidget(self.check_incremental, 2, 0, 1, 2)
+
+        self.check_reanudar = QCheckBox("Reanudar: omitir carpetas ya procesadas cuyos archivos no cambiaron")
+        self.check_reanudar.setToolTip("Usa la bitácora guardada en la carpeta raíz por ejecuciones anteriores.")
+        layout_opciones.addWidget(self.check_reanudar, 3, 0, 1, 2)
+
+        self.combo_motor = QComboBox()
+        self.combo_motor.addItems(list(MOTORES))
+        self.combo_motor.setCurrentText(MOTOR_POR_DEFECTO)
+        self.combo_motor.setToolTip("pymupdf copia documentos completos y suele ser más rápido con soportes escaneados grandes.")
+        layout_opciones.addWidget(QLabel("Motor de unión:"), 4, 0)
+        layout_opciones.addWidget(self.combo_motor, 4, 1)
+
+        self.check_optimizar = QCheckBox("Optimizar el PDF unido (deduplicar fuentes/imágenes y comprimir objetos)")
+        self.check_optimizar.setToolTip("Reescribe el resultado completo; reduce el tamaño cuando los soportes repiten logos o fuentes.")
+        layout_opciones.addWidget(self.check_optimizar, 5, 0, 1, 2)
+
+        # Perfil de salida: solo actúa si el PDF unido supera el tamaño máximo.
+        self.spin_limite_mb = QSpinBox()
+        self.spin_limite_mb.setRange(0, 2000)
+        self.spin_limite_mb.setSuffix(" MB")
+        self.spin_limite_mb.setSpecialValueText("Sin límite")
+        self.spin_limite_mb.setToolTip("Si el PDF unido pesa más, se reducen sus imágenes a la resolución y calidad indicadas.")
+        self.spin_dpi = QSpinBox()
+        self.spin_dpi.setRange(72, 600)
+        self.spin_dpi.setValue(150)
+        self.spin_dpi.setSuffix(" dpi")
+        self.spin_calidad_jpeg = QSpinBox()
+        self.spin_calidad_jpeg.setRange(10, 100)
+        self.spin_calidad_jpeg.setValue(75)
+        self.spin_calidad_jpeg.setPrefix("JPEG ")
+        layout_perfil = QHBoxLayout()
+        layout_perfil.addWidget(self.spin_limite_mb)
+        layout_perfil.addWidget(self.spin_dpi)
+        layout_perfil.addWidget(self.spin_calidad_jpeg)
+        layout_opciones.addWidget(QLabel("Tamaño máximo del PDF:"), 6, 0)
+        layout_opciones.addLayout(layout_perfil, 6, 1)
+
+        self.spin_memoria_mb = QSpinBox()
+        self.spin_memoria_mb.setRange(0, 65536)
+        self.spin_memoria_mb.setSingleStep(256)
+        self.spin_memoria_mb.setSuffix(" MB")
+        self.spin_memoria_mb.setSpecialValueText("Sin límite")
+        self.spin_memoria_mb.setToolTip(
+            "Une los soportes por tramos (con PyMuPDF, anexando al final del PDF) para no superar esta memoria."
+        )
+        layout_opciones.addWidget(QLabel("Memoria máxima por carpeta:"), 7, 0)
+        layout_opciones.addWidget(self.spin_memoria_mb, 7, 1)
+
+        self.spin_precarga_mb = QSpinBox()
+        self.spin_precarga_mb.setRange(0, 4096)
+        self.spin_precarga_mb.setSingleStep(64)
+        self.spin_precarga_mb.setSuffix(" MB")
+        self.spin_precarga_mb.setSpecialValueText("Desactivada")
+        self.spin_precarga_mb.setToolTip(
+            "Con 1 proceso, lee en segundo plano los PDFs de las carpetas siguientes mientras se une la actual. "
+            "Útil cuando la cuenta está en una unidad de red."
+        )
+        layout_opciones.addWidget(QLabel("Precarga de carpetas siguientes:"), 8, 0)
+        layout_opciones.addWidget(self.spin_precarga_mb, 8, 1)
+
+        self.spin_limite_tiempo = QSpinBox()
+        self.spin_limite_tiempo.setRange(0, 3600)
+        self.spin_limite_tiempo.setSingleStep(30)
+        self.spin_limite_tiempo.setSuffix(" s")
+        self.spin_limite_tiempo.setSpecialValueText("Sin límite")
+        self.spin_limite_tiempo.setToolTip(
+            "Procesa cada carpeta en un proceso aparte y la da por fallida si tarda más; "
+            "evita que un PDF dañado detenga toda la cuenta."
+        )
+        layout_opciones.addWidget(QLabel("Tiempo máximo por carpeta:"), 9, 0)
+        layout_opciones.addWidget(self.spin_limite_tiempo, 9, 1)
+
+        self.check_triaje = QCheckBox("Revisar todos los PDFs antes de unir (cuarentena de dañados o cifrados)")
+        self.check_triaje.setToolTip(
+            "Las carpetas con algún PDF ilegible o con contraseña no se unen; el detalle queda en "
+            f"{NOMBRE_INFORME_CUARENTENA} en la carpeta raíz."
+        )
+        layout_opciones.addWidget(self.check_triaje, 10, 0, 1, 2)
+
+        self.check_reparar = QCheckBox("Intentar reparar los PDFs dañados (se guarda una copia del original)")
+        self.check_reparar.setEnabled(False)
+        self.check_triaje.toggled.connect(self.check_reparar.setEnabled)
+        layout_opciones.addWidget(self.check_reparar, 11, 0, 1, 2)
+
+        self.check_deduplicar = QCheckBox("Omitir páginas repetidas (ya presentes en el PDF o en otro soporte)")
+        self.check_deduplicar.setToolTip(
+            "Compara el contenido y los recursos de cada página; las páginas en blanco nunca se omiten."
+        )
+        layout_opciones.addWidget(self.check_deduplicar, 12, 0, 1, 2)
+
+        self.spin_dividir_mb = QSpinBox()
+        self.spin_dividir_mb.setRange(0, 2048)
+        self.spin_dividir_mb.setSuffix(" MB")
+        self.spin_dividir_mb.setSpecialValueText("Sin dividir")
+        self.spin_dividir_mb.setToolTip(
+            "Además del PDF unido, genera '<nombre>_parte1.pdf', '<nombre>_parte2.pdf'... de este tamaño "
+            "máximo, para plataformas que limitan el tamaño de cada archivo."
+        )
+        layout_opciones.addWidget(QLabel("Dividir en partes de hasta:"), 13, 0)
+        layout_opciones.addWidget(self.spin_dividir_mb, 13, 1)
+
+        self.check_linealizar = QCheckBox("Linealizar el PDF unido (vista rápida en el navegador)")
+        if LINEALIZACION_DISPONIBLE:
+            self.check_linealizar.setToolTip(
+                "La primera página se muestra sin descargar el archivo completo. "
+                "Volver a unir en modo incremental anula la linealización."
+            )
+        else:
+            self.check_linealizar.setEnabled(False)
+            self.check_linealizar.setToolTip("Requiere pikepdf (pip install pikepdf).")
+        layout_opciones.addWidget(self.check_linealizar, 14, 0, 1, 2)
+        layout_principal.addWidget(group_opciones)
         
-        # 4. Botón de Proceso
+        # 4. Botones de Proceso
+        layout_botones = QHBoxLayout()
         self.boton_procesar = QPushButton("Iniciar Proceso de Unión")
         self.boton_procesar.setObjectName("BotonPrincipal")
         self.boton_procesar.setFixedHeight(40)
-        self.boton_procesar.clicked.connect(self.iniciar_procesamiento)
-        layout_principal.addWidget(self.boton_procesar)
+        self.boton_procesar.clicked.connect(lambda: self.iniciar_procesamiento())
+        self.boton_planificar = QPushButton("Planificar (sin modificar)")
+        self.boton_planificar.setFixedHeight(40)
+        self.boton_planificar.setToolTip("Clasifica las carpetas y calcula páginas y tamaños esperados sin unir nada.")
+        self.boton_planificar.clicked.connect(lambda: self.iniciar_procesamiento(solo_planificar=True))
+        self.boton_cancelar = QPushButton("Cancelar")
+        self.boton_cancelar.setFixedHeight(40)
+        self.boton_cancelar.setEnabled(False)
+        self.boton_cancelar.clicked.connect(self.cancelar_procesamiento)
+        layout_botones.addWidget(self.boton_procesar)
+        layout_botones.addWidget(self.boton_planificar)
+        layout_botones.addWidget(self.boton_cancelar)
+        layout_principal.addLayout(layout_botones)
         
         # 5. Grupo de Progreso
-        frame_progreso = QGroupBox("3. Progreso")
+        frame_progreso = QGroupBox("4. Progreso")
         layout_progreso = QVBoxLayout(frame_progreso)
         self.label_progreso = QLabel("Esperando para iniciar...")
         self.barra_progreso = QProgressBar()
@@ -141,7 +329,7 @@ class UnirSoportesWidget(QWidget):
             self.boton_adres.setChecked(True)
             self.boton_aseguradoras.setChecked(False)
 
-    def iniciar_procesamiento(self):
+    def iniciar_procesamiento(self, solo_planificar=False):
         if self.worker_thread and self.worker_thread.isRunning():
             QMessageBox.warning(self, "Proceso en curso", "Ya hay un proceso en ejecución.")
             return
@@ -150,19 +338,53 @@ class UnirSoportesWidget(QWidget):
             return
 
         self.boton_procesar.setEnabled(False)
-        self.boton_procesar.setText("Procesando...")
+        self.boton_planificar.setEnabled(False)
+        self.boton_procesar.setText("Planificando..." if solo_planificar else "Procesando...")
+        self.boton_cancelar.setEnabled(True)
         self.barra_progreso.setValue(0)
 
+        opciones = self.obtener_opciones()
+
         self.worker_thread = QThread()
-        self.worker = UnirSoportesWorker(self.ruta_seleccionada, self.modo_procesamiento)
+        self.worker = UnirSoportesWorker(self.ruta_seleccionada, self.modo_procesamiento, opciones)
         self.worker.moveToThread(self.worker_thread)
 
         self.worker.progreso_actualizado.connect(self.actualizar_progreso)
         self.worker.proceso_finalizado.connect(self.proceso_finalizado)
-        self.worker_thread.started.connect(self.worker.ejecutar)
+        self.worker_thread.started.connect(self.worker.planificar if solo_planificar else self.worker.ejecutar)
 
         self.worker_thread.start()
 
+    def obtener_opciones(self):
+        """Recoge las opciones de ejecución seleccionadas en la interfaz."""
+        return {
+            'procesos': self.spin_procesos.value(),
+            'usar_cache_huellas': self.check_cache_huellas.isChecked(),
+            'escritura_incremental': self.check_incremental.isChecked(),
+            'reanudar': self.check_reanudar.isChecked(),
+            'motor_fusion': self.combo_motor.currentText(),
+            'optimizar_salida': self.check_optimizar.isChecked(),
+            'perfil_salida': {
+                'limite_mb': self.spin_limite_mb.value(),
+                'dpi': self.spin_dpi.value(),
+                'calidad_jpeg': self.spin_calidad_jpeg.value(),
+            },
+            'memoria_maxima_mb': self.spin_memoria_mb.value(),
+            'precarga_mb': self.spin_precarga_mb.value(),
+            'limite_tiempo_s': self.spin_limite_tiempo.value(),
+            'triaje': self.check_triaje.isChecked(),
+            'reparar_pdfs': self.check_triaje.isChecked() and self.check_reparar.isChecked(),
+            'deduplicar_paginas': self.check_deduplicar.isChecked(),
+            'dividir_mb': self.spin_dividir_mb.value(),
+            'linealizar_salida': self.check_linealizar.isChecked(),
+        }
+
+    def cancelar_procesamiento(self):
+        if self.worker and self.worker_thread and self.worker_thread.isRunning():
+            self.worker.cancelar()
+            self.boton_cancelar.setEnabled(False)
+            self.label_progreso.setText("Cancelando... esperando a que terminen las carpetas en curso.")
+
     def actualizar_progreso(self, nombre_carpeta, porcentaje):
         self.label_progreso.setText(f"Procesando: {nombre_carpeta}...")
         self.barra_progreso.setValue(int(porcentaje))
@@ -170,7 +392,9 @@ class UnirSoportesWidget(QWidget):
     def proceso_finalizado(self, resultados):
         self.label_progreso.setText("Proceso finalizado. Listo para empezar de nuevo.")
         self.boton_procesar.setEnabled(True)
+        self.boton_planificar.setEnabled(True)
         self.boton_procesar.setText("Iniciar Proceso de Unión")
+        self.boton_cancelar.setEnabled(False)
 
         self.worker_thread.quit()
         self.worker_thread.wait()
@@ -0,0 +1,120 @@
+# logica/core/bitacora_ejecucion.py
+import os
+import json
+from datetime import datetime
+
+from logica.core.motores_fusion import SUFIJO_TEMPORAL
+
+NOMBRE_ARCHIVO_BITACORA = ".bitacora_unir_soportes.jsonl"
+
+# Marcador que se deja dentro de una carpeta mientras se escribe su PDF destino.
+# Si el programa se interrumpe, su presencia indica que el destino pudo quedar a medias.
+NOMBRE_MARCADOR_EN_CURSO = ".unir_soportes_en_curso.json"
+
+
+def firmas_carpeta(ruta_carpeta):
+    """Devuelve {nombre: [tamaño, mtime_ns]} de los PDFs de una carpeta."""
+    firmas = {}
+    with os.scandir(ruta_carpeta) as entradas:
+        for entrada in entradas:
+            if entrada.name.lower().endswith('.pdf') and entrada.is_file():
+                estado = entrada.stat()
+                firmas[entrada.name] = [estado.st_size, estado.st_mtime_ns]
+    return firmas
+
+
+class BitacoraEjecucion:
+    """
+    Bitácora de solo anexado (una línea JSON por carpeta terminada) que permite
+    reanudar una ejecución de Unir Soportes sin repetir las carpetas ya resueltas.
+    """
+
+    def __init__(self, ruta_archivo):
+        self.ruta_archivo = ruta_archivo
+
+    @classmethod
+    def para_cuenta(cls, ruta_carpeta_raiz):
+        return cls(os.path.join(ruta_carpeta_raiz, NOMBRE_ARCHIVO_BITACORA))
+
+    def registrar(self, carpeta, modo, resultado, razon, firmas):
+        """Anexa el resultado de una carpeta y lo fuerza a disco."""
+        entrada = {
+            'carpeta': carpeta,
+            'modo': modo,
+            'resultado': resultado,
+            'razon': razon,
+            'firmas': firmas,
+            'momento': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(self.ruta_archivo, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def cargar(self):
+        """Devuelve la última entrada registrada para cada carpeta."""
+        ultimas = {}
+        if not os.path.isfile(self.ruta_archivo):
+            return ultimas
+        with open(self.ruta_archivo, 'r', encoding='utf-8') as archivo:
+            for linea in archivo:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Una línea cortada por una caída a mitad de escritura se ignora.
+                    continue
+                ultimas[entrada['carpeta']] = entrada
+        return ultimas
+
+
+def marcar_escritura_en_curso(ruta_carpeta, ruta_destino, incremental):
+    """Deja constancia, antes de tocarlo, del estado original del PDF destino."""
+    marcador = {
+        'destino': os.path.basename(ruta_destino),
+        'tamano_previo': os.path.getsize(ruta_destino),
+        'incremental': incremental,
+    }
+    with open(os.path.join(ruta_carpeta, NOMBRE_MARCADOR_EN_CURSO), 'w', encoding='utf-8') as archivo:
+        json.dump(marcador, archivo)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+
+
+def desmarcar_escritura_en_curso(ruta_carpeta):
+    try:
+        os.remove(os.path.join(ruta_carpeta, NOMBRE_MARCADOR_EN_CURSO))
+    except FileNotFoundError:
+        pass
+
+
+def reparar_escritura_interrumpida(ruta_carpeta):
+    """
+    Si la carpeta quedó con una escritura a medias, devuelve el destino a su estado
+    original. Devuelve un mensaje describiendo la reparación, o None si no hizo falta.
+    """
+    ruta_marcador = os.path.join(ruta_carpeta, NOMBRE_MARCADOR_EN_CURSO)
+    if not os.path.isfile(ruta_marcador):
+        return None
+
+    try:
+        with open(ruta_marcador, 'r', encoding='utf-8') as archivo:
+            marcador = json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        marcador = {}
+
+    mensaje = "Se detectó una unión interrumpida en una ejecución anterior."
+    ruta_destino = os.path.join(ruta_carpeta, marcador.get('destino', ''))
+    if marcador.get('incremental') and os.path.isfile(ruta_destino):
+        # Lo anexado a medias queda después del tamaño original: basta con recortarlo.
+        tamano_previo = marcador['tamano_previo']
+        if os.path.getsize(ruta_destino) > tamano_previo:
+            with open(ruta_destino, 'r+b') as archivo:
+                archivo.truncate(tamano_previo)
+            mensaje += f" Se restauró '{marcador['destino']}' a su versión original."
+    # En reescritura completa el destino se reemplaza de forma atómica; solo puede quedar el temporal.
+    ruta_temporal = ruta_destino + SUFIJO_TEMPORAL
+    if os.path.isfile(ruta_temporal):
+        os.remove(ruta_temporal)
+
+    os.remove(ruta_marcador)
+    return mensaje
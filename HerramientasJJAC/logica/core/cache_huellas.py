@@ -0,0 +1,163 @@
+# logica/core/cache_huellas.py
+import os
+import sqlite3
+import time
+
+NOMBRE_ARCHIVO_CACHE = ".huellas_unir_soportes.sqlite"
+
+# Tope del contenido guardado (suma de las listas de huellas). Al superarlo se
+# descartan las entradas usadas hace más tiempo hasta bajar al 90 % del tope.
+LIMITE_BYTES_POR_DEFECTO = 32 * 1024 * 1024
+
+# Clases de huella que guarda la caché, cada una en su propia tabla: las del texto de
+# cada página, las perceptuales de su imagen (ver logica.core.huella_visual) y las de
+# su contenido y recursos (ver logica.core.deduplicador_paginas).
+TIPO_TEXTO = "texto"
+TIPO_VISUAL = "visual"
+TIPO_CONTENIDO = "contenido"
+_TABLAS = {TIPO_TEXTO: "huellas", TIPO_VISUAL: "huellas_visuales", TIPO_CONTENIDO: "huellas_contenido"}
+
+
+def firma_archivo(ruta):
+    """Devuelve (tamaño, mtime en ns) del archivo; identifica una versión concreta de él."""
+    estado = os.stat(ruta)
+    return estado.st_size, estado.st_mtime_ns
+
+
+class CacheHuellasPaginas:
+    """
+    Caché persistente en SQLite de las huellas del texto normalizado de cada página de un PDF.
+
+    Cada entrada se identifica por la ruta del archivo (relativa a la carpeta de la caché)
+    y solo es válida mientras el tamaño y la fecha de modificación del archivo no cambien.
+    Las huellas se guardan como una lista ordenada por página; las páginas cuya huella no
+    se conoce se marcan con procesador_pdf.HUELLA_DESCONOCIDA. El tope de tamaño se
+    aplica por separado a cada tipo de huella.
+
+    Las lecturas no escriben: la fecha de último uso de lo leído se anota en memoria y se
+    guarda en una sola transacción con registrar_usos (o con el siguiente 'guardar', o
+    al cerrar). El tamaño ocupado se lleva como un total acumulado por tabla, que se
+    recalcula con la base de datos antes de desalojar (otros procesos pueden escribir
+    en la misma caché).
+    """
+
+    def __init__(self, ruta_bd, limite_bytes=LIMITE_BYTES_POR_DEFECTO):
+        self.ruta_bd = ruta_bd
+        self.ruta_base = os.path.dirname(os.path.abspath(ruta_bd))
+        self.limite_bytes = limite_bytes
+        # Sin WAL: la caché suele vivir en una carpeta compartida y WAL no funciona sobre SMB.
+        self._conexion = sqlite3.connect(ruta_bd, timeout=30)
+        for tabla in _TABLAS.values():
+            self._conexion.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabla} ("
+                " ruta TEXT PRIMARY KEY,"
+                " tamano INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " huellas TEXT NOT NULL,"
+                " ultimo_uso REAL NOT NULL)"
+            )
+            self._conexion.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_uso ON {tabla} (ultimo_uso)")
+        self._conexion.commit()
+        # Por tabla: {clave: último uso} pendiente de guardar y total de bytes ocupados.
+        self._usos = {tabla: {} for tabla in _TABLAS.values()}
+        self._totales = {}
+
+    @classmethod
+    def para_cuenta(cls, ruta_carpeta_raiz, **kwargs):
+        """Abre (o crea) la caché ubicada en la raíz de una cuenta de cobro."""
+        return cls(os.path.join(ruta_carpeta_raiz, NOMBRE_ARCHIVO_CACHE), **kwargs)
+
+    def _clave(self, ruta):
+        ruta_absoluta = os.path.abspath(ruta)
+        try:
+            return os.path.relpath(ruta_absoluta, self.ruta_base)
+        except ValueError:
+            # En Windows no hay ruta relativa entre unidades distintas.
+            return ruta_absoluta
+
+    def obtener(self, ruta, tipo=TIPO_TEXTO):
+        """Devuelve la lista de huellas del archivo, o None si no hay una entrada vigente."""
+        tabla = _TABLAS[tipo]
+        try:
+            tamano, mtime_ns = firma_archivo(ruta)
+            clave = self._clave(ruta)
+            fila = self._conexion.execute(
+                f"SELECT tamano, mtime_ns, huellas FROM {tabla} WHERE ruta = ?", (clave,)
+            ).fetchone()
+            if not fila or fila[0] != tamano or fila[1] != mtime_ns:
+                return None
+            self._usos[tabla][clave] = time.time()
+            return fila[2].split(",")
+        except (OSError, sqlite3.Error):
+            return None
+
+    def guardar(self, ruta, huellas, firma=None, tipo=TIPO_TEXTO):
+        """
+        Guarda las huellas de un archivo. 'firma' debe tomarse antes de leer el archivo;
+        si no se indica se usa la firma actual.
+        """
+        tabla = _TABLAS[tipo]
+        try:
+            tamano, mtime_ns = firma or firma_archivo(ruta)
+            clave, texto = self._clave(ruta), ",".join(huellas)
+            total = self._total(tabla)
+            with self._conexion:
+                anterior = self._conexion.execute(f"SELECT LENGTH(huellas) FROM {tabla} WHERE ruta = ?", (clave,)).fetchone()
+                self._conexion.execute(
+                    f"INSERT OR REPLACE INTO {tabla} (ruta, tamano, mtime_ns, huellas, ultimo_uso) VALUES (?, ?, ?, ?, ?)",
+                    (clave, tamano, mtime_ns, texto, time.time())
+                )
+                self._usos[tabla].pop(clave, None)
+                self._guardar_usos()
+            self._totales[tabla] = total + len(texto) - (anterior[0] if anterior else 0)
+            if self._totales[tabla] > self.limite_bytes:
+                self._desalojar(tabla)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def registrar_usos(self):
+        """Guarda en una transacción la fecha de último uso de lo leído desde la última vez."""
+        try:
+            with self._conexion:
+                self._guardar_usos()
+        except sqlite3.Error:
+            pass
+
+    def _guardar_usos(self):
+        for tabla, usos in self._usos.items():
+            if usos:
+                self._conexion.executemany(
+                    f"UPDATE {tabla} SET ultimo_uso = ? WHERE ruta = ?", [(uso, clave) for clave, uso in usos.items()]
+                )
+                usos.clear()
+
+    def _total(self, tabla):
+        """Bytes que ocupan las huellas de la tabla; se suman en la base de datos solo la primera vez."""
+        if tabla not in self._totales:
+            self._totales[tabla] = self._conexion.execute(
+                f"SELECT COALESCE(SUM(LENGTH(huellas)), 0) FROM {tabla}"
+            ).fetchone()[0]
+        return self._totales[tabla]
+
+    def _desalojar(self, tabla):
+        """Política LRU: si se supera el tope, borra las entradas menos usadas recientemente."""
+        del self._totales[tabla]
+        total = self._total(tabla)
+        if total <= self.limite_bytes:
+            return
+
+        objetivo = int(self.limite_bytes * 0.9)
+        a_borrar = []
+        for clave, largo in self._conexion.execute(f"SELECT ruta, LENGTH(huellas) FROM {tabla} ORDER BY ultimo_uso"):
+            if total <= objetivo:
+                break
+            a_borrar.append((clave,))
+            total -= largo
+
+        with self._conexion:
+            self._conexion.executemany(f"DELETE FROM {tabla} WHERE ruta = ?", a_borrar)
+        self._totales[tabla] = total
+
+    def cerrar(self):
+        self.registrar_usos()
+        self._conexion.close()
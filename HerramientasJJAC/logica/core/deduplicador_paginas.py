@@ -0,0 +1,115 @@
+# logica/core/deduplicador_paginas.py
+import hashlib
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+from logica.core.cache_huellas import TIPO_CONTENIDO
+
+# Huella de una página sin contenido (en blanco): nunca se considera repetida, porque
+# las páginas en blanco de separación suelen ser intencionales.
+HUELLA_PAGINA_VACIA = "-"
+
+# Claves de un stream que describen su codificación; se ignoran porque se resume el
+# contenido ya decodificado (un motor puede recomprimir al copiar).
+_CLAVES_CODIFICACION = ("/Length", "/Filter", "/DecodeParms")
+
+
+def _datos_stream(stream):
+    try:
+        return stream.get_data()
+    except Exception:
+        # Filtros que pypdf no sabe decodificar (p. ej. JBIG2): se usan los datos tal cual.
+        return stream._data
+
+
+def _resumen_objeto(objeto, memo, en_curso):
+    """
+    Resumen (bytes) del contenido de un objeto PDF, independiente de los números de
+    objeto: dos copias del mismo recurso en archivos distintos dan el mismo resumen.
+    'memo' guarda el resumen de cada objeto indirecto ya visto en el documento.
+    """
+    if isinstance(objeto, IndirectObject):
+        clave = (objeto.idnum, objeto.generation)
+        if clave in memo:
+            return memo[clave]
+        if clave in en_curso:
+            return b"ciclo"
+        en_curso.add(clave)
+        memo[clave] = _resumen_objeto(objeto.get_object(), memo, en_curso)
+        en_curso.discard(clave)
+        return memo[clave]
+
+    resumen = hashlib.blake2b(digest_size=16)
+    if isinstance(objeto, StreamObject):
+        resumen.update(b"stream")
+        for clave in sorted(k for k in objeto if k not in _CLAVES_CODIFICACION):
+            resumen.update(clave.encode() + _resumen_objeto(objeto[clave], memo, en_curso))
+        resumen.update(hashlib.blake2b(_datos_stream(objeto), digest_size=16).digest())
+    elif isinstance(objeto, DictionaryObject):
+        resumen.update(b"dict")
+        for clave in sorted(k for k in objeto if k != "/Parent"):
+            resumen.update(clave.encode() + _resumen_objeto(objeto[clave], memo, en_curso))
+    elif isinstance(objeto, ArrayObject):
+        resumen.update(b"array")
+        for elemento in objeto:
+            resumen.update(_resumen_objeto(elemento, memo, en_curso))
+    else:
+        resumen.update(repr(objeto).encode())
+    return resumen.digest()
+
+
+def huellas_contenido(lector):
+    """
+    Huella de cada página de un PdfReader: su stream de contenido decodificado, sus
+    recursos (fuentes, imágenes...), su tamaño y su rotación. Las páginas sin contenido
+    quedan con HUELLA_PAGINA_VACIA.
+    """
+    memo = {}
+    huellas = []
+    for pagina in lector.pages:
+        contenido = pagina.get_contents()
+        datos = contenido.get_data() if contenido is not None else b""
+        if not datos.strip():
+            huellas.append(HUELLA_PAGINA_VACIA)
+            continue
+        resumen = hashlib.blake2b(datos, digest_size=16)
+        resumen.update(_resumen_objeto(pagina.get("/Resources", DictionaryObject()), memo, set()))
+        resumen.update(repr([float(v) for v in pagina.mediabox]).encode())
+        resumen.update(str(pagina.get("/Rotate", 0)).encode())
+        huellas.append(resumen.hexdigest())
+    return huellas
+
+
+def _huellas_archivo(ruta, sesion, cache):
+    huellas = cache.obtener(ruta, tipo=TIPO_CONTENIDO) if cache is not None else None
+    if huellas is None:
+        firma = sesion.firma(ruta)
+        huellas = huellas_contenido(sesion.lector(ruta))
+        if cache is not None:
+            cache.guardar(ruta, huellas, firma, tipo=TIPO_CONTENIDO)
+    return huellas
+
+
+def seleccionar_paginas_nuevas(rutas_base, rutas_fuentes, sesion, cache=None):
+    """
+    Decide qué páginas de cada fuente hay que anexar: se omiten las que ya están en
+    'rutas_base' (el destino y lo que se le antepone) o en una página anterior de las
+    fuentes. Las páginas de 'rutas_base' se conservan todas.
+
+    Devuelve (seleccion, huellas): seleccion = {ruta: [índices de página a anexar]} para
+    cada fuente, y huellas = {ruta: huellas de todas sus páginas}.
+    """
+    huellas = {}
+    presentes = set()
+    for ruta in rutas_base:
+        huellas[ruta] = _huellas_archivo(ruta, sesion, cache)
+        presentes.update(huellas[ruta])
+
+    seleccion = {}
+    for ruta in rutas_fuentes:
+        huellas[ruta] = _huellas_archivo(ruta, sesion, cache)
+        seleccion[ruta] = []
+        for indice, huella in enumerate(huellas[ruta]):
+            if huella == HUELLA_PAGINA_VACIA or huella not in presentes:
+                seleccion[ruta].append(indice)
+                presentes.add(huella)
+    return seleccion, huellas
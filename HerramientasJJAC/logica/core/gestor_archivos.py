@@ -1,14 +1,88 @@
 # logica/gestor_archivos.py
 import os
+from collections import namedtuple
+
+# Entrada de un directorio. 'es_enlace' indica un enlace simbólico (si apunta a una
+# carpeta, 'es_carpeta' también es verdadero). 'tamano' y 'mtime_ns' son None si no se
+# tomó su estado.
+EntradaCarpeta = namedtuple("EntradaCarpeta", "nombre ruta es_carpeta es_enlace tamano mtime_ns")
+
+# En Windows el tamaño y la fecha llegan con el propio listado (FindNextFile), así que
+# se toman siempre; en los demás sistemas cuestan un stat por entrada y solo se toman
+# si se piden.
+_ESTADO_INCLUIDO_EN_LISTADO = os.name == "nt"
+
+
+def leer_entradas(ruta_directorio, con_estado=False):
+    """
+    Lista un directorio con una sola llamada a os.scandir. El tipo de cada entrada sale
+    del propio listado, sin un stat por archivo. Las entradas que desaparecen mientras
+    se lista (o enlaces rotos, si se pide el estado) se omiten.
+    """
+    tomar_estado = con_estado or _ESTADO_INCLUIDO_EN_LISTADO
+    entradas = []
+    with os.scandir(ruta_directorio) as iterador:
+        for entrada in iterador:
+            try:
+                es_carpeta = entrada.is_dir()
+                es_enlace = entrada.is_symlink()
+                estado = entrada.stat() if tomar_estado else None
+            except OSError:
+                continue
+            tamano, mtime_ns = (estado.st_size, estado.st_mtime_ns) if estado else (None, None)
+            entradas.append(EntradaCarpeta(entrada.name, entrada.path, es_carpeta, es_enlace, tamano, mtime_ns))
+    return entradas
+
+
+class InstantaneaCarpeta:
+    """
+    Contenido de una carpeta (por ejemplo, la raíz de una cuenta) y de sus subcarpetas,
+    leído con os.scandir: un listado por directorio y ninguna consulta adicional por
+    entrada, a diferencia de os.listdir seguido de os.path.isdir/isfile, que en una
+    unidad de red cuesta un viaje al servidor por archivo.
+
+    Cada subcarpeta se lee la primera vez que se pide (ver 'contenido') y se recuerda.
+    Una instantánea no se entera de los cambios posteriores: quien renombra o mueve
+    archivos debe tomar una nueva para la siguiente pasada.
+    """
+
+    def __init__(self, ruta_raiz, con_estado=False):
+        self.ruta_raiz = ruta_raiz
+        self.con_estado = con_estado
+        try:
+            self.entradas = leer_entradas(ruta_raiz, con_estado)
+        except (FileNotFoundError, NotADirectoryError):
+            self.entradas = []
+        self._subcarpetas = {}
+
+    def carpetas(self):
+        return [entrada for entrada in self.entradas if entrada.es_carpeta]
+
+    def archivos(self):
+        return [entrada for entrada in self.entradas if not entrada.es_carpeta]
+
+    def contenido(self, nombre_subcarpeta):
+        """Entradas de una subcarpeta de la raíz. Lanza OSError si no se puede leer."""
+        if nombre_subcarpeta not in self._subcarpetas:
+            self._subcarpetas[nombre_subcarpeta] = leer_entradas(
+                os.path.join(self.ruta_raiz, nombre_subcarpeta), self.con_estado
+            )
+        return self._subcarpetas[nombre_subcarpeta]
+
+    def archivos_pdf(self, nombre_subcarpeta):
+        """Nombres de los archivos PDF de una subcarpeta de la raíz."""
+        return [entrada.nombre for entrada in self.contenido(nombre_subcarpeta)
+                if not entrada.es_carpeta and entrada.nombre.lower().endswith('.pdf')]
+
 
 def listar_subdirectorios(ruta_raiz):
     """Devuelve una lista de rutas completas a subdirectorios."""
-    if not os.path.isdir(ruta_raiz):
-        return []
-    return [os.path.join(ruta_raiz, d) for d in os.listdir(ruta_raiz) if os.path.isdir(os.path.join(ruta_raiz, d))]
+    return [entrada.ruta for entrada in InstantaneaCarpeta(ruta_raiz).carpetas()]
 
 def obtener_archivos_pdf(ruta_directorio):
     """Devuelve una lista de nombres de archivos PDF en un directorio."""
-    if not os.path.isdir(ruta_directorio):
+    try:
+        entradas = leer_entradas(ruta_directorio)
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    return [f for f in os.listdir(ruta_directorio) if f.lower().endswith('.pdf')]
+    return [entrada.nombre for entrada in entradas if not entrada.es_carpeta and entrada.nombre.lower().endswith('.pdf')]
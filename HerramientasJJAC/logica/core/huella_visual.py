@@ -0,0 +1,155 @@
+# logica/core/huella_visual.py
+import hashlib
+import fitz  # PyMuPDF
+
+from logica.core.cache_huellas import TIPO_VISUAL, firma_archivo
+
+# Lado de la cuadrícula del dHash: 16x16 comparaciones = huellas de 256 bits. Con 8x8
+# (64 bits) dos cartas distintas hechas con la misma plantilla quedan demasiado cerca.
+LADO_HASH = 16
+UMBRAL_HAMMING_POR_DEFECTO = 10
+
+# Páginas sin contraste (en blanco) no dicen nada de su contenido y no se comparan.
+CONTRASTE_MINIMO = 16
+
+# Marca de una página sin huella (sin contraste o no calculada).
+HUELLA_VISUAL_VACIA = "?"
+
+# Ancho aproximado de la miniatura que se renderiza antes de reducirla a la cuadrícula.
+_ANCHO_MINIATURA = (LADO_HASH + 1) * 4
+
+
+def _cuadricula_gris(pagina, ancho_render, columnas, filas):
+    """Renderiza la página en gris con el ancho indicado y la promedia en columnas x filas celdas."""
+    escala = ancho_render / max(pagina.rect.width, 1)
+    miniatura = pagina.get_pixmap(matrix=fitz.Matrix(escala, escala), colorspace=fitz.csGRAY, alpha=False)
+    ancho, alto, muestras, paso = miniatura.width, miniatura.height, miniatura.samples, miniatura.stride
+
+    celdas = []
+    for f in range(filas):
+        y0, y1 = f * alto // filas, max((f + 1) * alto // filas, f * alto // filas + 1)
+        fila = []
+        for c in range(columnas):
+            x0, x1 = c * ancho // columnas, max((c + 1) * ancho // columnas, c * ancho // columnas + 1)
+            suma = sum(sum(muestras[y * paso + x0:y * paso + x1]) for y in range(y0, min(y1, alto)))
+            fila.append(suma / ((x1 - x0) * (y1 - y0)))
+        celdas.append(fila)
+    return celdas
+
+
+def huella_visual_pagina(pagina):
+    """
+    dHash de la página: cada bit indica si una celda de la miniatura es más clara que su
+    vecina de la derecha. Es estable frente a re-escaneos, recompresión y cambios de
+    resolución. Devuelve un texto hexadecimal, o HUELLA_VISUAL_VACIA si la página no
+    tiene contraste.
+    """
+    celdas = _cuadricula_gris(pagina, _ANCHO_MINIATURA, LADO_HASH + 1, LADO_HASH)
+    valores = [valor for fila in celdas for valor in fila]
+    if max(valores) - min(valores) < CONTRASTE_MINIMO:
+        return HUELLA_VISUAL_VACIA
+
+    bits = 0
+    for fila in celdas:
+        for c in range(LADO_HASH):
+            bits = (bits << 1) | (fila[c] > fila[c + 1])
+    return f"{bits:0{LADO_HASH * LADO_HASH // 4}x}"
+
+
+def distancia_hamming(huella_a, huella_b):
+    return bin(int(huella_a, 16) ^ int(huella_b, 16)).count("1")
+
+
+def _firma_contenido(pagina):
+    """
+    Resumen del contenido de la página (su stream de dibujo y los datos de sus imágenes).
+
+    El dHash no distingue dos cartas hechas con la misma plantilla que solo cambian en un
+    número, así que cada coincidencia se confirma con esta firma. Al unir, las páginas
+    se copian sin recodificar sus imágenes, de modo que la firma se conserva; en cambio,
+    una página cuyas imágenes se recomprimieron (optimizador_salida.ajustar_a_limite)
+    ya no coincide, aunque su dHash sí. Esas salidas se reconocen por su marcador de
+    unión (ver marcador_fusion).
+    """
+    documento = pagina.parent
+    resumen = hashlib.blake2b(pagina.read_contents(), digest_size=16)
+    for imagen in pagina.get_images(full=True):
+        resumen.update(documento.xref_stream(imagen[0]) or b"")
+    return resumen.digest()
+
+
+def _huellas_de_paginas(documento, indices, conocidas):
+    """Completa en 'conocidas' (lista por página, con None si falta) las huellas de 'indices'."""
+    for i in indices:
+        if conocidas[i] is None:
+            conocidas[i] = huella_visual_pagina(documento[i])
+    return conocidas
+
+
+def _leer_cache(cache, ruta, total_paginas):
+    if cache is None:
+        return [None] * total_paginas
+    huellas = cache.obtener(ruta, tipo=TIPO_VISUAL)
+    if huellas is None or len(huellas) != total_paginas:
+        return [None] * total_paginas
+    # En la caché, lo no calculado y lo vacío se guardan igual; se recalcula por si acaso.
+    return [None if huella == HUELLA_VISUAL_VACIA else huella for huella in huellas]
+
+
+def _guardar_cache(cache, ruta, huellas, firma):
+    if cache is not None:
+        cache.guardar(ruta, [huella or HUELLA_VISUAL_VACIA for huella in huellas], firma, tipo=TIPO_VISUAL)
+
+
+def verificar_por_huella_visual(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar=2, paginas_extremo=20,
+                                umbral=UMBRAL_HAMMING_POR_DEFECTO, cache=None, sesion=None):
+    """
+    Verificación para fuentes escaneadas sin capa de texto: True si cada una de las
+    primeras páginas con contenido del 'fuente' tiene una página del 'destino' cuya
+    huella visual está a 'umbral' bits o menos y con el mismo contenido (ver
+    _firma_contenido).
+
+    Solo se miran las 'paginas_extremo' últimas páginas del destino (donde quedan los
+    anexos) y las primeras (donde el modo ADRES antepone la respuesta), de modo que el
+    costo no depende del largo total del destino.
+
+    Con una 'sesion' (SesionDocumentos) los PDF se abren desde los datos ya leídos.
+    """
+    if sesion is not None:
+        firma_fuente, firma_destino = sesion.firma(ruta_pdf_fuente), sesion.firma(ruta_pdf_destino)
+        abrir = lambda ruta: fitz.open(stream=sesion.datos(ruta), filetype="pdf")
+    else:
+        firma_fuente, firma_destino = firma_archivo(ruta_pdf_fuente), firma_archivo(ruta_pdf_destino)
+        abrir = fitz.open
+    with abrir(ruta_pdf_fuente) as fuente, abrir(ruta_pdf_destino) as destino:
+        huellas_fuente = _leer_cache(cache, ruta_pdf_fuente, fuente.page_count)
+        _huellas_de_paginas(fuente, range(min(paginas_a_verificar, fuente.page_count)), huellas_fuente)
+        _guardar_cache(cache, ruta_pdf_fuente, huellas_fuente, firma_fuente)
+
+        # Páginas del fuente que falta encontrar: (índice, huella).
+        pendientes = [(i, huella) for i, huella in enumerate(huellas_fuente[:paginas_a_verificar])
+                      if huella and huella != HUELLA_VISUAL_VACIA]
+        if not pendientes:
+            return False
+
+        total = destino.page_count
+        huellas_destino = _leer_cache(cache, ruta_pdf_destino, total)
+        # Primero la cola y luego el inicio, sin repetir páginas si el destino es corto.
+        indices = list(range(total - 1, max(total - paginas_extremo, 0) - 1, -1))
+        en_cola = set(indices)
+        indices += [i for i in range(min(paginas_extremo, total)) if i not in en_cola]
+
+        for i in indices:
+            _huellas_de_paginas(destino, [i], huellas_destino)
+            huella = huellas_destino[i]
+            if huella == HUELLA_VISUAL_VACIA:
+                continue
+            pendientes = [
+                (j, buscada) for j, buscada in pendientes
+                if distancia_hamming(buscada, huella) > umbral
+                or _firma_contenido(fuente[j]) != _firma_contenido(destino[i])
+            ]
+            if not pendientes:
+                break
+        _guardar_cache(cache, ruta_pdf_destino, huellas_destino, firma_destino)
+    return not pendientes
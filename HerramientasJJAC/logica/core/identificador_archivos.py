@@ -1,21 +1,120 @@
 # logica/identificador_archivos.py
 import re
 import os
-
-# --- PATRONES DE BÚSQUEDA PARA AMBOS MODOS ---
-
-# Patrones para Modo Aseguradoras
-PATRON_CARTA = re.compile(r"(?:[a-zA-Z0-9]+[_-])?([A-Z]+)[_-](\d+)[_-].*\.pdf", re.IGNORECASE)
-
-# Patrones compartidos (Respuesta)
-PATRON_RESPUESTA_VERIFICABLE = re.compile(r"([A-Z]+)_?(\d+)\.pdf", re.IGNORECASE)
-PATRON_RESPUESTA_GLOSA_REP = re.compile(r"GLOSA_REP\d*\.pdf", re.IGNORECASE)
-PATRON_RESPUESTA_GLOSA_NUEVO = re.compile(r"resp_glosa\.pdf", re.IGNORECASE)
-
-# Patrones específicos para Modo ADRES
-PATRON_ADRES_EPICRISIS = re.compile(r"\d+_[A-Z]+\d+_EPICRIS(?:IS)?\.pdf", re.IGNORECASE)
-PATRON_ADRES_FACOSTE = re.compile(r"\d+_[A-Z]+\d+_FACOSTE\.pdf", re.IGNORECASE)
-PATRON_ADRES_FACTURA = re.compile(r"\d+_[A-Z]+\d+_FACTURA\.pdf", re.IGNORECASE)
+from collections import namedtuple
+from functools import lru_cache
+
+# --- TIPOS DE ARCHIVO QUE RECONOCE clasificar_nombre ---
+
+TIPO_XML = "XML"
+# Respuestas glosa: 'resp_glosa.pdf', 'GLOSA_REP.pdf' o 'SERIE123.pdf' (verificable).
+TIPO_RESP_GLOSA = "RESP_GLOSA"
+TIPO_GLOSA_REP = "GLOSA_REP"
+TIPO_VERIFICABLE = "VERIFICABLE"
+# Documentos ADRES: '<radicado>_SERIE123_FACTURA...', '..._FACOSTE...', '..._EPICRISIS...'.
+TIPO_FACTURA = "FACTURA"
+TIPO_FACOSTE = "FACOSTE"
+TIPO_EPICRISIS = "EPICRISIS"
+TIPO_CARTA = "CARTA"
+TIPO_OTRO = "OTRO"
+
+TIPOS_RESPUESTA = (TIPO_RESP_GLOSA, TIPO_VERIFICABLE, TIPO_GLOSA_REP)
+
+# Series de factura de las respuestas, soportes y XML que se reparten por carpeta.
+SERIES_FACTURA = ("COEX", "FECR", "FERD", "FERR")
+_SERIES = "|".join(SERIES_FACTURA)
+
+# Un solo patrón clasifica el nombre: cada rama con nombre es un tipo y 'lastgroup' dice
+# cuál coincidió. El orden de las ramas es la prioridad cuando un nombre encaja en
+# varias. Antes de las ramas, dos búsquedas anticipadas, que no dependen del tipo, toman
+# el código de factura con que empieza el nombre ('FERD123 anexo.pdf') y el de la
+# factura que ancla la carpeta en los organizadores ('12345_FERD123_FACTURA...').
+PATRON_NOMBRE = re.compile(rf"""
+    (?:(?=(?P<serie_inicial>{_SERIES})(?P<numero_inicial>\d+)(?P<solo_codigo>(?:\.[^.]*)?\Z)?))?
+    (?:(?=\d{{4,}}_(?P<serie_ancla>[A-Z]+)(?P<numero_ancla>\d+)_FACTURA))?
+    (?:
+        (?P<{TIPO_XML}>.*?(?P<serie_xml>{_SERIES})(?P<numero_xml>\d+).*\.xml\Z)
+      | (?P<{TIPO_RESP_GLOSA}>resp_glosa\.pdf)
+      | (?P<{TIPO_GLOSA_REP}>GLOSA_REP\d*\.pdf)
+      | (?P<{TIPO_VERIFICABLE}>(?P<serie_verificable>[A-Z]+)_?(?P<numero_verificable>\d+)\.pdf)
+      | (?P<{TIPO_FACTURA}>\d+_(?P<serie_factura>[A-Z]+)(?P<numero_factura>\d+)_FACTURA\.pdf)
+      | (?P<{TIPO_FACOSTE}>\d+_[A-Z]+\d+_FACOSTE\.pdf)
+      | (?P<{TIPO_EPICRISIS}>\d+_[A-Z]+\d+_EPICRIS(?:IS)?\.pdf)
+      | (?P<{TIPO_CARTA}>.*?(?:[A-Z0-9]+[_-])?(?P<serie_carta>[A-Z]+)[_-](?P<numero_carta>\d+)[_-].*\.pdf)
+      | (?P<{TIPO_OTRO}>)
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+# Grupos con la serie y el número de cada tipo que los tiene.
+_GRUPOS_CODIGO = {
+    TIPO_XML: ("serie_xml", "numero_xml"),
+    TIPO_VERIFICABLE: ("serie_verificable", "numero_verificable"),
+    TIPO_FACTURA: ("serie_factura", "numero_factura"),
+    TIPO_CARTA: ("serie_carta", "numero_carta"),
+}
+
+PATRON_FACTURA = re.compile(r"([a-zA-Z]+)(\d+)")
+
+# Nombres distintos que se recuerdan; los de carpetas vecinas se repiten mucho.
+TAMANO_MEMORIA_NOMBRES = 65536
+
+
+class ArchivoClasificado(namedtuple("ArchivoClasificado", "tipo serie numero serie_inicial numero_inicial solo_codigo serie_ancla numero_ancla")):
+    """
+    Resultado de clasificar_nombre. 'serie' (en mayúsculas) y 'numero' son los del tipo
+    (None si el tipo no los tiene). 'serie_inicial' y 'numero_inicial' son el código de
+    factura con que empieza el nombre, si empieza por una de SERIES_FACTURA, y
+    'solo_codigo' indica que el nombre no tiene nada más que ese código y la extensión.
+    'serie_ancla' y 'numero_ancla' son los de la factura que ancla la carpeta en los
+    organizadores y en Traer Soportes ADRES: el nombre empieza por un radicado de al
+    menos 4 dígitos y 'SERIE123_FACTURA', con cualquier final ('..._FACTURA (1).pdf'
+    también cuenta). TIPO_FACTURA, en cambio, exige el nombre exacto '..._FACTURA.pdf'
+    y acepta cualquier radicado: es la factura que Unir Soportes ADRES deja quieta.
+    """
+    __slots__ = ()
+
+    @property
+    def codigo(self):
+        return f"{self.serie}_{self.numero}" if self.serie else None
+
+    @property
+    def codigo_inicial(self):
+        return f"{self.serie_inicial}_{self.numero_inicial}" if self.serie_inicial else None
+
+    @property
+    def codigo_ancla(self):
+        return f"{self.serie_ancla}_{self.numero_ancla}" if self.serie_ancla else None
+
+
+@lru_cache(maxsize=TAMANO_MEMORIA_NOMBRES)
+def clasificar_nombre(nombre_archivo):
+    """Clasifica un nombre de archivo (sin ruta) con PATRON_NOMBRE. Ver ArchivoClasificado."""
+    coincidencia = PATRON_NOMBRE.match(nombre_archivo)
+    tipo = coincidencia.lastgroup
+    serie = numero = None
+    if tipo in _GRUPOS_CODIGO:
+        grupo_serie, grupo_numero = _GRUPOS_CODIGO[tipo]
+        serie, numero = coincidencia.group(grupo_serie).upper(), coincidencia.group(grupo_numero)
+    # La carta debe repetir el separador alrededor del número: 'X_FERD_12_...' o 'X-FERD-12-...'.
+    if tipo == TIPO_CARTA and f"_{numero}_" not in nombre_archivo and f"-{numero}-" not in nombre_archivo:
+        tipo, serie, numero = TIPO_OTRO, None, None
+
+    serie_inicial, serie_ancla = coincidencia.group("serie_inicial"), coincidencia.group("serie_ancla")
+    return ArchivoClasificado(
+        tipo, serie, numero,
+        serie_inicial.upper() if serie_inicial else None,
+        coincidencia.group("numero_inicial"),
+        coincidencia.group("solo_codigo") is not None,
+        serie_ancla.upper() if serie_ancla else None,
+        coincidencia.group("numero_ancla"),
+    )
+
+
+@lru_cache(maxsize=TAMANO_MEMORIA_NOMBRES)
+def separar_factura(factura):
+    """'FERD123' -> ('FERD', '123'); None si el texto no empieza por serie y número."""
+    coincidencia = PATRON_FACTURA.match(factura)
+    return coincidencia.groups() if coincidencia else None
 
 
 def identificar_documentos_aseguradoras(archivos_pdf, ruta_carpeta):
@@ -25,58 +124,22 @@ def identificar_documentos_aseguradoras(archivos_pdf, ruta_carpeta):
         'respuesta_glosa': None,
         'soportes': []
     }
-    
-    archivos_reclamados = set()
 
-    # Primera pasada: Identificar Carta Glosa
-    for nombre_archivo in archivos_pdf:
-        if nombre_archivo in archivos_reclamados:
-            continue
-
-        match_carta = PATRON_CARTA.search(nombre_archivo)
-        if match_carta:
-            numero = match_carta.group(2)
-            if f"_{numero}_" in nombre_archivo or f"-{numero}-" in nombre_archivo:
-                if not resultados['carta_glosa']:
-                    resultados['carta_glosa'] = {
-                        'path': os.path.join(ruta_carpeta, nombre_archivo),
-                        'serie': match_carta.group(1).upper(),
-                        'numero': numero
-                    }
-                    archivos_reclamados.add(nombre_archivo)
-                    continue
-
-    # Ahora buscamos la respuesta, para no confundir con carta
+    # Se toma la primera Carta y la primera Respuesta; lo demás es soporte.
     for nombre_archivo in archivos_pdf:
-        if nombre_archivo in archivos_reclamados:
-            continue
-            
-        if PATRON_RESPUESTA_GLOSA_NUEVO.match(nombre_archivo):
-            if not resultados['respuesta_glosa']:
-                resultados['respuesta_glosa'] = {'path': os.path.join(ruta_carpeta, nombre_archivo), 'type': 'RESP_GLOSA'}
-                archivos_reclamados.add(nombre_archivo)
-                continue
-
-        match_resp_verificable = PATRON_RESPUESTA_VERIFICABLE.match(nombre_archivo)
-        if match_resp_verificable:
-            if not resultados['respuesta_glosa']:
-                resultados['respuesta_glosa'] = {
-                    'path': os.path.join(ruta_carpeta, nombre_archivo), 'type': 'VERIFICABLE',
-                    'serie': match_resp_verificable.group(1).upper(),
-                    'numero': match_resp_verificable.group(2)
-                }
-                archivos_reclamados.add(nombre_archivo)
-                continue
-
-        if PATRON_RESPUESTA_GLOSA_REP.match(nombre_archivo):
-            if not resultados['respuesta_glosa']:
-                resultados['respuesta_glosa'] = {'path': os.path.join(ruta_carpeta, nombre_archivo), 'type': 'GLOSA_REP'}
-                archivos_reclamados.add(nombre_archivo)
-                continue
-    
-    # Lo que no fue reclamado es un soporte
-    for nombre_archivo in archivos_pdf:
-        if nombre_archivo not in archivos_reclamados and nombre_archivo.lower().endswith('.pdf'):
+        clasificacion = clasificar_nombre(nombre_archivo)
+        tipo = clasificacion.tipo
+        if tipo == TIPO_CARTA and not resultados['carta_glosa']:
+            resultados['carta_glosa'] = {
+                'path': os.path.join(ruta_carpeta, nombre_archivo),
+                'serie': clasificacion.serie,
+                'numero': clasificacion.numero
+            }
+        elif tipo in TIPOS_RESPUESTA and not resultados['respuesta_glosa']:
+            resultados['respuesta_glosa'] = {'path': os.path.join(ruta_carpeta, nombre_archivo), 'type': tipo}
+            if tipo == TIPO_VERIFICABLE:
+                resultados['respuesta_glosa'].update(serie=clasificacion.serie, numero=clasificacion.numero)
+        elif nombre_archivo.lower().endswith('.pdf'):
             resultados['soportes'].append(os.path.join(ruta_carpeta, nombre_archivo))
 
     return resultados
@@ -90,28 +153,18 @@ def identificar_documentos_adres(archivos_pdf, ruta_carpeta):
         'soportes': [],
         'ignorados': [] # Para facturas y facostes
     }
-    
-    archivos_reclamados = set()
 
-    # PASO 1: Identificar archivos clave y los que se deben ignorar/dejar quietos
     for nombre_archivo in archivos_pdf:
-        if PATRON_ADRES_EPICRISIS.match(nombre_archivo) and not resultados['epicrisis']:
+        tipo = clasificar_nombre(nombre_archivo).tipo
+        if tipo == TIPO_EPICRISIS and not resultados['epicrisis']:
             resultados['epicrisis'] = {'path': os.path.join(ruta_carpeta, nombre_archivo)}
-            archivos_reclamados.add(nombre_archivo)
-
-        elif (PATRON_RESPUESTA_VERIFICABLE.match(nombre_archivo) or 
-              PATRON_RESPUESTA_GLOSA_REP.match(nombre_archivo)) and not resultados['respuesta_glosa']:
+        # En ADRES 'resp_glosa.pdf' no es una respuesta: se une como soporte.
+        elif tipo in (TIPO_VERIFICABLE, TIPO_GLOSA_REP) and not resultados['respuesta_glosa']:
             resultados['respuesta_glosa'] = {'path': os.path.join(ruta_carpeta, nombre_archivo)}
-            archivos_reclamados.add(nombre_archivo)
-            
-        elif PATRON_ADRES_FACOSTE.match(nombre_archivo) or PATRON_ADRES_FACTURA.match(nombre_archivo):
+        elif tipo in (TIPO_FACOSTE, TIPO_FACTURA):
+            # Las facturas y facostes se dejan quietos: nunca son soportes.
             resultados['ignorados'].append(os.path.join(ruta_carpeta, nombre_archivo))
-            # Importante: los añadimos a archivos_reclamados para que no se consideren "soportes"
-            archivos_reclamados.add(nombre_archivo)
-    
-    # PASO 2: Todo lo demás que sea PDF y no haya sido reclamado es un soporte
-    for nombre_archivo in archivos_pdf:
-        if nombre_archivo.lower().endswith('.pdf') and nombre_archivo not in archivos_reclamados:
+        elif nombre_archivo.lower().endswith('.pdf'):
             resultados['soportes'].append(os.path.join(ruta_carpeta, nombre_archivo))
-            
+
     return resultados
@@ -0,0 +1,310 @@
+# logica/core/indice_busqueda.py
+import os
+import stat
+import time
+import sqlite3
+import hashlib
+from collections import namedtuple
+
+from logica.core.gestor_archivos import leer_entradas
+from logica.core.recorrido_paralelo import HILOS_POR_DEFECTO, RecorridoParalelo
+
+# Cambiar si cambia el esquema: un índice de otra versión se descarta y se reconstruye.
+VERSION_ESQUEMA = 3
+
+# Un directorio modificado hace menos que esto se vuelve a listar en la próxima
+# actualización: en FAT y en algunos recursos SMB la fecha tiene una resolución de
+# hasta 2 s, y un cambio dentro de ese margen no movería la fecha guardada.
+MARGEN_FECHA_RECIENTE_NS = 2_000_000_000
+
+# Cada cuántas carpetas revisadas se confirma la transacción y se informa el avance.
+CARPETAS_POR_LOTE = 500
+
+CarpetaIndexada = namedtuple("CarpetaIndexada", "ruta mtime_ns")
+# 'fallidas': carpetas que no se pudieron consultar o listar (p. ej. por un corte de la
+# red); se conserva lo que el índice tenía de ellas y se reintentan la próxima vez.
+ResumenActualizacion = namedtuple("ResumenActualizacion", "revisadas releidas fallidas cancelada")
+
+# Resultado de _explorar para una carpeta que no se pudo consultar (distinto de no existir).
+_SIN_ACCESO = object()
+
+
+def carpeta_indices():
+    """Carpeta de datos locales (no compartida) donde se guardan los índices."""
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "HerramientasJJAC", "indices_busqueda")
+
+
+def clave_pdf(nombre_archivo):
+    """Clave de búsqueda de un PDF: su nombre sin extensión, en minúsculas (None si no es PDF)."""
+    if not nombre_archivo.lower().endswith('.pdf'):
+        return None
+    return os.path.splitext(nombre_archivo)[0].lower()
+
+
+def huella_clave(clave):
+    """
+    Entero de 48 bits (6 bytes en SQLite) que reemplaza a la clave de un PDF en la base de
+    datos. Dos claves pueden compartir huella: las búsquedas comparan después el nombre.
+    """
+    return int.from_bytes(hashlib.blake2b(clave.encode("utf-8"), digest_size=6).digest(), "big", signed=True)
+
+
+def fecha_carpeta(carpeta):
+    """mtime_ns de una CarpetaIndexada; si el índice no la tiene guardada, se consulta el disco."""
+    return carpeta.mtime_ns if carpeta.mtime_ns is not None else os.stat(carpeta.ruta).st_mtime_ns
+
+
+def _unir(ruta_relativa, nombre):
+    return os.path.join(ruta_relativa, nombre) if ruta_relativa else nombre
+
+
+class IndiceBusqueda:
+    """
+    Índice persistente en SQLite de las carpetas y los archivos que hay bajo una carpeta
+    de búsqueda, con la fecha de modificación de cada carpeta al listarla. Los PDF se
+    pueden buscar por nombre; los demás archivos solo se guardan para 'archivos_de'.
+
+    'actualizar' no recorre todo el árbol: consulta la fecha de cada carpeta conocida
+    (varias a la vez) y solo vuelve a listar las que cambiaron (agregar, quitar o
+    renombrar una entrada cambia la fecha de su carpeta). Así, tras la primera
+    construcción, una búsqueda cuesta una consulta de estado por carpeta en lugar de un
+    listado completo.
+
+    Como os.walk, no entra en enlaces simbólicos a carpetas, aunque sí los indexa.
+
+    El índice es compacto: cada carpeta guarda solo su nombre y el id de su padre (el
+    prefijo de las rutas no se repite) y los PDF se buscan por la huella entera de su
+    clave (ver huella_clave) en lugar de por la clave en texto. Las rutas se reconstruyen
+    al responder una búsqueda.
+    """
+
+    def __init__(self, ruta_raiz, ruta_bd):
+        self.ruta_raiz = os.path.abspath(ruta_raiz)
+        self.ruta_bd = ruta_bd
+        # El índice vive en el disco local: WAL permite leerlo mientras se actualiza.
+        self._conexion = sqlite3.connect(ruta_bd, timeout=30)
+        if ruta_bd != ":memory:":
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        # Rutas relativas ya reconstruidas ({id: ruta}); se vacía al actualizar.
+        self._rutas = {}
+        if self._conexion.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+            self._crear_esquema()
+
+    @classmethod
+    def para_raiz(cls, ruta_raiz):
+        """
+        Abre (o crea) el índice de una carpeta de búsqueda en la carpeta de datos locales.
+        Si no se puede usar, se trabaja con un índice en memoria que se construye completo.
+        """
+        clave = hashlib.sha1(os.path.normcase(os.path.abspath(ruta_raiz)).encode("utf-8")).hexdigest()[:20]
+        try:
+            os.makedirs(carpeta_indices(), exist_ok=True)
+            return cls(ruta_raiz, os.path.join(carpeta_indices(), f"indice_{clave}.sqlite"))
+        except (OSError, sqlite3.Error):
+            return cls(ruta_raiz, ":memory:")
+
+    def _crear_esquema(self):
+        with self._conexion:
+            self._conexion.execute("DROP TABLE IF EXISTS archivos_pdf")
+            self._conexion.execute("DROP TABLE IF EXISTS archivos")
+            self._conexion.execute("DROP TABLE IF EXISTS carpetas")
+            # La raíz es la única carpeta sin padre (y sin nombre). mtime_ns NULL: la carpeta
+            # aún no se ha listado (o hay que volver a listarla).
+            self._conexion.execute(
+                "CREATE TABLE carpetas ("
+                " id INTEGER PRIMARY KEY,"
+                " padre INTEGER REFERENCES carpetas(id) ON DELETE CASCADE,"
+                " nombre TEXT,"
+                " mtime_ns INTEGER)"
+            )
+            self._conexion.execute("CREATE UNIQUE INDEX idx_carpetas_padre ON carpetas (padre, nombre)")
+            self._conexion.execute("CREATE INDEX idx_carpetas_nombre ON carpetas (nombre)")
+            self._conexion.execute(
+                "CREATE TABLE archivos ("
+                " carpeta INTEGER NOT NULL REFERENCES carpetas(id) ON DELETE CASCADE,"
+                " nombre TEXT NOT NULL,"
+                " clave INTEGER,"
+                " mtime_ns INTEGER)"
+            )
+            # 'clave' (huella_clave de clave_pdf) solo la tienen los PDF: el índice parcial
+            # los deja solo a ellos.
+            self._conexion.execute("CREATE INDEX idx_archivos_carpeta ON archivos (carpeta)")
+            self._conexion.execute("CREATE INDEX idx_archivos_clave ON archivos (clave) WHERE clave IS NOT NULL")
+            self._conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+
+    def _ruta_absoluta(self, ruta_relativa):
+        return os.path.join(self.ruta_raiz, ruta_relativa) if ruta_relativa else self.ruta_raiz
+
+    def _ruta_relativa(self, id_carpeta):
+        if id_carpeta not in self._rutas:
+            padre, nombre = self._conexion.execute("SELECT padre, nombre FROM carpetas WHERE id = ?", (id_carpeta,)).fetchone()
+            self._rutas[id_carpeta] = "" if padre is None else os.path.join(self._ruta_relativa(padre), nombre)
+        return self._rutas[id_carpeta]
+
+    def _subcarpetas(self, id_carpeta):
+        """{nombre: (id, mtime_ns)} de las subcarpetas de una carpeta."""
+        filas = self._conexion.execute("SELECT nombre, id, mtime_ns FROM carpetas WHERE padre = ?", (id_carpeta,))
+        return {nombre: (id_hija, mtime_ns) for nombre, id_hija, mtime_ns in filas}
+
+    def actualizar(self, cancelado=None, progreso=None, hilos=HILOS_POR_DEFECTO):
+        """
+        Pone el índice al día con el disco, consultando 'hilos' carpetas a la vez (ver
+        recorrido_paralelo). 'cancelado' es una función sin argumentos que detiene la
+        actualización si devuelve True (lo revisado hasta ahí queda guardado); 'progreso'
+        recibe el número de carpetas revisadas cada CARPETAS_POR_LOTE.
+
+        Lanza OSError si no se puede consultar o listar la raíz (p. ej. la unidad de red no
+        responde): el índice queda como estaba. Solo se borra del índice una carpeta que
+        el sistema informa como inexistente, nunca una que falla por otro motivo.
+        """
+        self._rutas.clear()
+        fila_raiz = self._conexion.execute("SELECT id, mtime_ns FROM carpetas WHERE padre IS NULL").fetchone()
+        if fila_raiz is None:
+            with self._conexion:
+                cursor = self._conexion.execute("INSERT INTO carpetas (padre, nombre, mtime_ns) VALUES (NULL, NULL, NULL)")
+            fila_raiz = (cursor.lastrowid, None)
+
+        revisadas = releidas = fallidas = 0
+        try:
+            # La base de datos solo se toca desde este hilo; los del recorrido solo leen el disco.
+            with RecorridoParalelo(self._explorar, hilos) as recorrido:
+                recorrido.agregar((fila_raiz[0], "", fila_raiz[1]))
+                for (id_carpeta, ruta, mtime_guardado), (estado, entradas) in recorrido:
+                    if cancelado and cancelado():
+                        return ResumenActualizacion(revisadas, releidas, fallidas, True)
+                    if estado is _SIN_ACCESO:
+                        fallidas += 1
+                        continue
+                    if estado is None:
+                        # La carpeta ya no existe: se borra con todo su contenido (en cascada).
+                        self._conexion.execute("DELETE FROM carpetas WHERE id = ?", (id_carpeta,))
+                        continue
+
+                    revisadas += 1
+                    if entradas is None:
+                        for nombre, (id_hija, mtime_hija) in self._subcarpetas(id_carpeta).items():
+                            recorrido.agregar((id_hija, _unir(ruta, nombre), mtime_hija))
+                    else:
+                        self._guardar_listado(id_carpeta, ruta, estado, entradas, recorrido.agregar)
+                        releidas += 1
+
+                    if revisadas % CARPETAS_POR_LOTE == 0:
+                        self._conexion.commit()
+                        if progreso:
+                            progreso(revisadas)
+        finally:
+            self._conexion.commit()
+        return ResumenActualizacion(revisadas, releidas, fallidas, False)
+
+    def _explorar(self, tarea):
+        """
+        En un hilo del recorrido: (estado, entradas) de una carpeta. 'estado' es None si ya
+        no existe y _SIN_ACCESO si no se pudo consultar o listar; 'entradas' es None si la
+        carpeta no cambió. Los errores de la raíz se propagan (ver 'actualizar').
+        """
+        _, ruta, mtime_guardado = tarea
+        ruta_absoluta = self._ruta_absoluta(ruta)
+        try:
+            # La raíz puede ser un enlace; las demás carpetas no se siguen.
+            estado = os.stat(ruta_absoluta) if not ruta else os.lstat(ruta_absoluta)
+            if estado.st_mtime_ns == mtime_guardado:
+                return estado, None
+            if stat.S_ISLNK(estado.st_mode):
+                return estado, []
+            return estado, leer_entradas(ruta_absoluta)
+        except (FileNotFoundError, NotADirectoryError):
+            if not ruta:
+                raise
+            return None, None
+        except OSError:
+            if not ruta:
+                raise
+            return _SIN_ACCESO, None
+
+    def _guardar_listado(self, id_carpeta, ruta, estado, entradas, agregar):
+        """Guarda el nuevo listado de una carpeta y pasa sus subcarpetas a 'agregar'."""
+        conocidas = self._subcarpetas(id_carpeta)
+        actuales = {entrada.nombre for entrada in entradas if entrada.es_carpeta}
+        self._conexion.executemany(
+            "DELETE FROM carpetas WHERE id = ?", [(id_hija,) for nombre, (id_hija, _) in conocidas.items() if nombre not in actuales]
+        )
+        for nombre in sorted(actuales):
+            if nombre in conocidas:
+                id_hija, mtime_hija = conocidas[nombre]
+            else:
+                cursor = self._conexion.execute(
+                    "INSERT INTO carpetas (padre, nombre, mtime_ns) VALUES (?, ?, NULL)", (id_carpeta, nombre)
+                )
+                id_hija, mtime_hija = cursor.lastrowid, None
+            agregar((id_hija, _unir(ruta, nombre), mtime_hija))
+
+        self._conexion.execute("DELETE FROM archivos WHERE carpeta = ?", (id_carpeta,))
+        filas = []
+        for entrada in entradas:
+            if not entrada.es_carpeta:
+                clave = clave_pdf(entrada.nombre)
+                filas.append((id_carpeta, entrada.nombre, huella_clave(clave) if clave is not None else None, entrada.mtime_ns))
+        self._conexion.executemany("INSERT INTO archivos (carpeta, nombre, clave, mtime_ns) VALUES (?, ?, ?, ?)", filas)
+        reciente = time.time_ns() - estado.st_mtime_ns < MARGEN_FECHA_RECIENTE_NS
+        self._conexion.execute(
+            "UPDATE carpetas SET mtime_ns = ? WHERE id = ?", (None if reciente else estado.st_mtime_ns, id_carpeta)
+        )
+
+    def _carpetas(self, condicion, parametros):
+        filas = self._conexion.execute(f"SELECT id, mtime_ns FROM carpetas WHERE {condicion}", parametros).fetchall()
+        carpetas = [CarpetaIndexada(self._ruta_absoluta(self._ruta_relativa(id_carpeta)), mtime_ns) for id_carpeta, mtime_ns in filas]
+        return sorted(carpetas)
+
+    def buscar_carpetas(self, nombre):
+        """Carpetas (sin contar la raíz) que se llaman exactamente 'nombre', en orden de ruta."""
+        return self._carpetas("nombre = ?", (nombre,))
+
+    def buscar_carpetas_por_prefijo(self, prefijo):
+        """Carpetas (sin contar la raíz) cuyo nombre empieza por 'prefijo', en orden de ruta."""
+        return self._carpetas("nombre >= ? AND nombre < ?", (prefijo, prefijo + "\U0010ffff"))
+
+    def buscar_pdf(self, nombre_sin_extension):
+        """Rutas de los PDF que se llaman así (sin distinguir mayúsculas), en orden de ruta."""
+        clave = nombre_sin_extension.lower()
+        filas = self._conexion.execute(
+            "SELECT carpeta, nombre FROM archivos WHERE clave = ?", (huella_clave(clave),)
+        ).fetchall()
+        return sorted(
+            os.path.join(self._ruta_absoluta(self._ruta_relativa(id_carpeta)), nombre)
+            for id_carpeta, nombre in filas if clave_pdf(nombre) == clave
+        )
+
+    def archivos_de(self, ruta_carpeta):
+        """
+        Nombres de los archivos (no carpetas) de una carpeta devuelta por una búsqueda,
+        tomados del listado que hizo la última actualización. Si esa carpeta está
+        pendiente de volver a listarse (o no está en el índice), se lista el disco.
+        """
+        fila = self._conexion.execute("SELECT id, mtime_ns FROM carpetas WHERE padre IS NULL").fetchone()
+        ruta = os.path.relpath(ruta_carpeta, self.ruta_raiz)
+        for nombre in ruta.split(os.sep) if ruta != os.curdir else []:
+            if fila is None:
+                break
+            fila = self._conexion.execute(
+                "SELECT id, mtime_ns FROM carpetas WHERE padre = ? AND nombre = ?", (fila[0], nombre)
+            ).fetchone()
+        if fila is None or fila[1] is None:
+            return [entrada.nombre for entrada in leer_entradas(ruta_carpeta) if not entrada.es_carpeta]
+        return [nombre for (nombre,) in self._conexion.execute("SELECT nombre FROM archivos WHERE carpeta = ?", (fila[0],))]
+
+    def contar(self):
+        """
+        (nombres de carpeta distintos, nombres de PDF distintos) del índice. Los PDF se
+        cuentan por huella: con 48 bits, una coincidencia entre claves es despreciable.
+        """
+        return (
+            self._conexion.execute("SELECT COUNT(DISTINCT nombre) FROM carpetas").fetchone()[0],
+            self._conexion.execute("SELECT COUNT(DISTINCT clave) FROM archivos").fetchone()[0],
+        )
+
+    def cerrar(self):
+        self._conexion.close()
@@ -0,0 +1,84 @@
+# logica/core/marcador_fusion.py
+import os
+import json
+import hashlib
+import pypdf
+
+# Entrada del diccionario Info del PDF unido donde se registra qué se le anexó.
+CLAVE_MARCADOR = "/UnirSoportes"
+VERSION_MARCADOR = 1
+
+
+def _sha256_archivo(ruta):
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def construir_marcador(fuentes_anteriores, rutas_anexadas, paginas_anexadas, paginas_total, sesion=None):
+    """
+    Texto JSON del marcador: las fuentes anexadas (nombre, tamaño, sha256 y páginas),
+    precedidas por las que ya registraba un marcador vigente, y el total de páginas del
+    resultado, que permite detectar si el archivo se modificó después de la unión.
+    Con una 'sesion' (SesionDocumentos) el sha256 se calcula sobre los datos ya leídos.
+    """
+    sha256_de = sesion.sha256 if sesion is not None else _sha256_archivo
+    fuentes = list(fuentes_anteriores)
+    for ruta, paginas in zip(rutas_anexadas, paginas_anexadas):
+        fuentes.append({
+            'nombre': os.path.basename(ruta),
+            'tamano': os.path.getsize(ruta),
+            'sha256': sha256_de(ruta),
+            'paginas': paginas,
+        })
+    return json.dumps({'version': VERSION_MARCADOR, 'fuentes': fuentes, 'paginas_total': paginas_total},
+                      ensure_ascii=False)
+
+
+def leer_marcador(ruta_pdf):
+    """
+    Lee el marcador y el número de páginas del PDF consultando solo el trailer, el
+    diccionario Info y la raíz del árbol de páginas (/Count), sin analizar las páginas.
+    Devuelve (marcador, paginas); marcador es None si no hay uno válido.
+    """
+    try:
+        with open(ruta_pdf, 'rb') as archivo:
+            # Con un archivo abierto pypdf lee bajo demanda en lugar de cargarlo completo.
+            lector = pypdf.PdfReader(archivo)
+            paginas = int(lector.trailer['/Root']['/Pages']['/Count'])
+            info = lector.trailer.get('/Info')
+            valor = info.get_object().get(CLAVE_MARCADOR) if info is not None else None
+            if valor is None:
+                return None, paginas
+            marcador = json.loads(str(valor))
+    except Exception:
+        return None, None
+
+    if not isinstance(marcador, dict) or marcador.get('version') != VERSION_MARCADOR:
+        return None, paginas
+    return marcador, paginas
+
+
+def marcador_vigente(marcador, paginas):
+    """Un marcador solo vale si el archivo conserva el número de páginas con que se escribió."""
+    return marcador is not None and marcador.get('paginas_total') == paginas
+
+
+def marcador_confirma_fusion(ruta_pdf_destino, ruta_pdf_fuente, sesion=None):
+    """
+    True si el marcador vigente del destino registra una fuente idéntica (mismo tamaño y
+    sha256) a 'ruta_pdf_fuente'. Un False no es concluyente: puede no haber marcador, o
+    estar desactualizado, y entonces hay que verificar por contenido.
+    """
+    marcador, paginas = leer_marcador(ruta_pdf_destino)
+    if not marcador_vigente(marcador, paginas):
+        return False
+
+    tamano = os.path.getsize(ruta_pdf_fuente)
+    candidatas = [fuente for fuente in marcador['fuentes'] if fuente.get('tamano') == tamano]
+    if not candidatas:
+        return False
+    sha256 = sesion.sha256(ruta_pdf_fuente) if sesion is not None else _sha256_archivo(ruta_pdf_fuente)
+    return any(fuente.get('sha256') == sha256 for fuente in candidatas)
@@ -0,0 +1,81 @@
+# logica/core/memoria_proceso.py
+import os
+import sys
+import threading
+
+# Cada cuánto (en segundos) se muestrea la memoria mientras se mide un pico.
+INTERVALO_MUESTREO = 0.02
+
+
+def _memoria_residente_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class ContadoresMemoria(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    contadores = ContadoresMemoria()
+    contadores.cb = ctypes.sizeof(contadores)
+    proceso = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+        return None
+    return contadores.WorkingSetSize
+
+
+def memoria_residente():
+    """Memoria residente (RSS) actual del proceso en bytes, o None si no se puede medir."""
+    try:
+        if sys.platform == "win32":
+            return _memoria_residente_windows()
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (ImportError, AttributeError, OSError, ValueError):
+        return None
+
+
+class MedidorPicoMemoria:
+    """
+    Mide el pico de memoria residente del proceso mientras dura un bloque 'with',
+    muestreándola desde un hilo. A diferencia del máximo que lleva el sistema
+    (ru_maxrss, PeakWorkingSetSize), sirve para medir cada carpeta por separado.
+    """
+
+    def __init__(self, intervalo=INTERVALO_MUESTREO):
+        self.intervalo = intervalo
+        self.pico = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _muestrear(self):
+        medida = memoria_residente()
+        if medida is not None and (self.pico is None or medida > self.pico):
+            self.pico = medida
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self._muestrear()
+
+    def __enter__(self):
+        self._muestrear()
+        if self.pico is not None:
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        self._muestrear()
+        return False
@@ -0,0 +1,256 @@
+# logica/core/motores_fusion.py
+import os
+import pypdf
+import fitz  # PyMuPDF
+
+from logica.core.sesion_documentos import SesionDocumentos
+
+# Sufijo del archivo temporal usado al reescribir un PDF por completo.
+SUFIJO_TEMPORAL = ".tmp_unir"
+
+MOTOR_POR_DEFECTO = "pypdf"
+
+
+class _SalidaIncremental:
+    """
+    Flujo de salida para un PdfWriter en modo incremental. pypdf escribe primero el
+    documento original completo y luego la actualización; como el original ya está en
+    disco, esos bytes se omiten y solo se añade la actualización al final del archivo.
+    """
+
+    def __init__(self, archivo, tamano_original):
+        self._archivo = archivo
+        self._por_omitir = tamano_original
+
+    def write(self, datos):
+        if self._por_omitir:
+            omitidos = min(len(datos), self._por_omitir)
+            self._por_omitir -= omitidos
+            datos = datos[omitidos:]
+        if datos:
+            self._archivo.write(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._archivo.tell() - self._por_omitir
+
+    def flush(self):
+        self._archivo.flush()
+
+
+def _escribir_incremental(escritor, ruta_pdf_destino, tamano_original):
+    """
+    Añade al final del destino los objetos nuevos y una nueva tabla xref/trailer.
+    Si algo falla, el archivo se recorta a su tamaño original.
+    """
+    with open(ruta_pdf_destino, 'r+b') as archivo:
+        archivo.seek(tamano_original)
+        archivo.truncate()
+        if tamano_original:
+            archivo.seek(tamano_original - 1)
+            termina_en_salto = archivo.read(1) in (b"\n", b"\r")
+        else:
+            termina_en_salto = True
+        try:
+            if not termina_en_salto:
+                archivo.write(b"\n")
+            escritor.write(_SalidaIncremental(archivo, tamano_original))
+        except Exception:
+            archivo.truncate(tamano_original)
+            raise
+
+
+def _anexar_paginas(escritor, lector, posicion=None, indices=None):
+    """
+    Añade las páginas del lector (o solo las de 'indices') al escritor, al final o desde
+    'posicion'. Devuelve cuántas se añadieron.
+    """
+    if indices is None:
+        indices = range(len(lector.pages))
+    for i, indice in enumerate(indices):
+        if posicion is None:
+            escritor.add_page(lector.pages[indice])
+        else:
+            escritor.insert_page(lector.pages[indice], posicion + i)
+    return len(indices)
+
+
+def _escribir_atomico(guardar, ruta):
+    """
+    Escribe el PDF completo en un temporal junto al destino (llamando a guardar(ruta_temporal))
+    y luego lo reemplaza, de modo que una interrupción nunca deja el destino a medio escribir.
+    """
+    ruta_temporal = ruta + SUFIJO_TEMPORAL
+    try:
+        guardar(ruta_temporal)
+        with open(ruta_temporal, 'rb+') as archivo_salida:
+            os.fsync(archivo_salida.fileno())
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+
+class MotorFusion:
+    """
+    Interfaz de un motor de unión. 'fusionar' deja en 'ruta_pdf_destino' las páginas de
+    'rutas_pdf_previas', las del propio destino y las de 'rutas_pdf_fuentes', en ese orden,
+    y devuelve cuántas páginas aportó cada archivo (en ese mismo orden).
+
+    Si se indica 'info_extra', se llama justo antes de escribir con esa misma lista de
+    páginas y las entradas que devuelve ({"/Clave": texto}) se agregan al diccionario
+    Info del resultado.
+
+    'seleccion' ({ruta: [índices]}) limita las páginas que se anexan de cada fuente; en
+    ese caso lo devuelto para la fuente es el número de páginas anexadas.
+
+    Los archivos se leen a través de 'sesion' (SesionDocumentos), de modo que los que ya
+    se abrieron para verificarlos no se vuelven a leer ni a analizar. Cada archivo se
+    descarta de la sesión en cuanto sus páginas se copian.
+    """
+    nombre = None
+
+    def fusionar(self, ruta_pdf_destino, rutas_pdf_fuentes, rutas_pdf_previas=(), incremental=False, info_extra=None,
+                 sesion=None, seleccion=None):
+        raise NotImplementedError
+
+
+class MotorPypdf(MotorFusion):
+    """Copia página a página con pypdf.PdfWriter."""
+    nombre = "pypdf"
+
+    def fusionar(self, ruta_pdf_destino, rutas_pdf_fuentes, rutas_pdf_previas=(), incremental=False, info_extra=None,
+                 sesion=None, seleccion=None):
+        seleccion = seleccion or {}
+        if sesion is None:
+            sesion = SesionDocumentos()
+        if incremental:
+            tamano_original = len(sesion.datos(ruta_pdf_destino))
+            escritor = pypdf.PdfWriter(sesion.lector(ruta_pdf_destino), incremental=True)
+            paginas_destino = len(escritor.pages)
+            posicion = 0
+        else:
+            escritor = pypdf.PdfWriter()
+            posicion = None
+
+        paginas_por_ruta = []
+        for ruta in rutas_pdf_previas:
+            paginas = _anexar_paginas(escritor, sesion.lector(ruta), posicion)
+            sesion.olvidar(ruta)
+            paginas_por_ruta.append(paginas)
+            if posicion is not None:
+                posicion += paginas
+
+        if incremental:
+            paginas_por_ruta.append(paginas_destino)
+        else:
+            paginas_por_ruta.append(_anexar_paginas(escritor, sesion.lector(ruta_pdf_destino)))
+
+        for ruta in rutas_pdf_fuentes:
+            paginas_por_ruta.append(_anexar_paginas(escritor, sesion.lector(ruta), indices=seleccion.get(ruta)))
+            sesion.olvidar(ruta)
+
+        if info_extra is not None:
+            escritor.add_metadata(info_extra(paginas_por_ruta))
+
+        if incremental:
+            _escribir_incremental(escritor, ruta_pdf_destino, tamano_original)
+        else:
+            _escribir_atomico(escritor.write, ruta_pdf_destino)
+        return paginas_por_ruta
+
+
+class MotorPyMuPDF(MotorFusion):
+    """
+    Copia documentos enteros con Document.insert_pdf de PyMuPDF, que trabaja sobre los
+    objetos ya comprimidos en lugar de reconstruir cada página en Python.
+    """
+    nombre = "pymupdf"
+
+    def fusionar(self, ruta_pdf_destino, rutas_pdf_fuentes, rutas_pdf_previas=(), incremental=False, info_extra=None,
+                 sesion=None, seleccion=None):
+        seleccion = seleccion or {}
+        if sesion is None:
+            sesion = SesionDocumentos()
+
+        def anexar(ruta, indices=None, **opciones):
+            if indices is not None and not indices:
+                sesion.olvidar(ruta)
+                return 0
+            with fitz.open(stream=sesion.datos(ruta), filetype="pdf") as fuente:
+                if indices is not None:
+                    fuente.select(indices)
+                documento.insert_pdf(fuente, **opciones)
+                paginas = fuente.page_count
+            sesion.olvidar(ruta)
+            return paginas
+
+        paginas_por_ruta = []
+        if incremental:
+            tamano_original = os.path.getsize(ruta_pdf_destino)
+            documento = fitz.open(ruta_pdf_destino)
+        else:
+            documento = fitz.open()
+
+        try:
+            if incremental and not documento.can_save_incrementally():
+                raise ValueError(
+                    f"'{os.path.basename(ruta_pdf_destino)}' está dañado y no admite actualización incremental."
+                )
+
+            posicion = 0
+            for ruta in rutas_pdf_previas:
+                paginas = anexar(ruta, start_at=posicion if incremental else -1)
+                paginas_por_ruta.append(paginas)
+                posicion += paginas
+
+            if incremental:
+                paginas_por_ruta.append(documento.page_count - posicion)
+            else:
+                paginas_por_ruta.append(anexar(ruta_pdf_destino))
+
+            for ruta in rutas_pdf_fuentes:
+                paginas_por_ruta.append(anexar(ruta, seleccion.get(ruta)))
+
+            if info_extra is not None:
+                _agregar_info_fitz(documento, info_extra(paginas_por_ruta))
+
+            if incremental:
+                try:
+                    documento.saveIncr()
+                except Exception:
+                    documento.close()
+                    with open(ruta_pdf_destino, 'r+b') as archivo:
+                        archivo.truncate(tamano_original)
+                    raise
+            else:
+                _escribir_atomico(lambda ruta: documento.save(ruta, garbage=1, deflate=True), ruta_pdf_destino)
+        finally:
+            if not documento.is_closed:
+                documento.close()
+        return paginas_por_ruta
+
+
+def _agregar_info_fitz(documento, entradas):
+    """Agrega entradas arbitrarias al diccionario Info (set_metadata solo admite las estándar)."""
+    tipo, valor = documento.xref_get_key(-1, "Info")
+    if tipo == "xref":
+        xref_info = int(valor.split()[0])
+    else:
+        xref_info = documento.get_new_xref()
+        documento.update_object(xref_info, "<<>>")
+        documento.xref_set_key(-1, "Info", f"{xref_info} 0 R")
+    for clave, texto in entradas.items():
+        documento.xref_set_key(xref_info, clave.lstrip("/"), fitz.get_pdf_str(texto))
+
+
+MOTORES = {motor.nombre: motor for motor in (MotorPypdf, MotorPyMuPDF)}
+
+
+def obtener_motor(nombre):
+    """Devuelve una instancia del motor de unión registrado con ese nombre."""
+    try:
+        return MOTORES[nombre]()
+    except KeyError:
+        raise ValueError(f"Motor de unión desconocido: '{nombre}'. Disponibles: {', '.join(MOTORES)}")
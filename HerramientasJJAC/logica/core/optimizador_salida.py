@@ -0,0 +1,233 @@
+# logica/core/optimizador_salida.py
+import os
+import re
+import fitz  # PyMuPDF
+
+try:
+    import pikepdf  # Opcional: solo se usa para linealizar (MuPDF ya no lo soporta).
+except ImportError:
+    pikepdf = None
+
+from logica.core.motores_fusion import SUFIJO_TEMPORAL, _escribir_atomico
+from logica.core.cache_huellas import TIPO_TEXTO, TIPO_VISUAL, TIPO_CONTENIDO
+
+LINEALIZACION_DISPONIBLE = pikepdf is not None
+
+# Perfil de salida para ajustar un PDF a un tamaño máximo. 'limite_mb' = 0 lo desactiva.
+PERFIL_SALIDA_POR_DEFECTO = {
+    'limite_mb': 0,
+    'dpi': 150,
+    'calidad_jpeg': 75,
+}
+
+# Nombre de cada parte al dividir un PDF: '<nombre>_parte1.pdf', '<nombre>_parte2.pdf'...
+# (Unir Soportes no tiene en cuenta las partes de su propio destino: ver patron_partes).
+FORMATO_PARTE = "{base}_parte{numero}.pdf"
+
+# Holgura sobre el tamaño estimado de cada parte: la estructura del archivo (xref,
+# trailer, árbol de páginas) no se cuenta página a página.
+_MARGEN_PARTE = 0.97
+_BYTES_FIJOS_PARTE = 2048
+_BYTES_POR_PAGINA = 200
+
+_PATRON_REFERENCIA = re.compile(r"(\d+) 0 R")
+_PATRON_PARENT = re.compile(r"/Parent\s+\d+ 0 R")
+
+
+def describir_tamano(num_bytes):
+    """'1.25 MB' desde 1 MB; por debajo, en KB ('37 KB'). Cadena vacía si no llega a medio KB."""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.2f} MB"
+    kilobytes = round(num_bytes / 1024)
+    return f"{kilobytes} KB" if kilobytes else ""
+
+
+def _reemplazar_si_menor(ruta_pdf, transformar, cache=None):
+    """
+    Abre el PDF, aplica transformar(documento) (que debe guardarlo en la ruta recibida)
+    escribiendo en un temporal, y reemplaza el original solo si el resultado es más
+    pequeño. Las huellas de la caché se conservan: el texto no cambia y el dHash de las
+    huellas visuales tolera la recompresión de imágenes. La verificación visual, que
+    además compara los bytes de las imágenes (ver huella_visual._firma_contenido), deja
+    de reconocer las páginas recomprimidas; el marcador de unión, que sobrevive a la
+    reescritura, sigue confirmando la unión.
+    Devuelve los bytes ahorrados.
+    """
+    tamano_original = os.path.getsize(ruta_pdf)
+    huellas = {}
+    if cache is not None:
+        huellas = {tipo: cache.obtener(ruta_pdf, tipo=tipo) for tipo in (TIPO_TEXTO, TIPO_VISUAL)}
+
+    ruta_temporal = ruta_pdf + SUFIJO_TEMPORAL
+    try:
+        with fitz.open(ruta_pdf) as documento:
+            transformar(documento, ruta_temporal)
+        ahorro = tamano_original - os.path.getsize(ruta_temporal)
+        if ahorro <= 0:
+            os.remove(ruta_temporal)
+            return 0
+        with open(ruta_temporal, 'rb+') as archivo:
+            os.fsync(archivo.fileno())
+        os.replace(ruta_temporal, ruta_pdf)
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+    for tipo, huellas_tipo in huellas.items():
+        if huellas_tipo is not None:
+            cache.guardar(ruta_pdf, huellas_tipo, tipo=tipo)
+    return ahorro
+
+
+def optimizar_pdf(ruta_pdf, cache=None):
+    """
+    Reescribe un PDF ya unido para reducir su tamaño sin perder calidad:
+    - garbage=4 elimina objetos sin uso y fusiona los objetos idénticos (fuentes, logos,
+      perfiles ICC que cada soporte traía por su cuenta), comparando también sus streams.
+    - use_objstms=1 empaqueta los objetos que no son streams en object streams comprimidos.
+    - deflate=True comprime los streams que venían sin comprimir.
+
+    Devuelve los bytes ahorrados (0 si no se logró reducirlo).
+    """
+    def guardar(documento, ruta_salida):
+        documento.save(ruta_salida, garbage=4, deflate=True, use_objstms=1)
+
+    return _reemplazar_si_menor(ruta_pdf, guardar, cache)
+
+
+def ajustar_a_limite(ruta_pdf, limite_bytes, dpi=150, calidad_jpeg=75, cache=None):
+    """
+    Si el PDF supera 'limite_bytes', reduce las imágenes que superan 'dpi' a esa
+    resolución y las recomprime como JPEG con 'calidad_jpeg'. Las imágenes bitonales
+    (escaneos en blanco y negro, normalmente CCITT/JBIG2) se dejan como están porque
+    en JPEG ocuparían más. Si el PDF ya cabe en el límite no se toca.
+
+    Devuelve (bytes ahorrados, True si el resultado cabe en el límite).
+    """
+    if os.path.getsize(ruta_pdf) <= limite_bytes:
+        return 0, True
+
+    def guardar(documento, ruta_salida):
+        # Se deja un margen para no recomprimir imágenes que apenas superan la resolución objetivo.
+        documento.rewrite_images(
+            dpi_threshold=int(dpi * 1.1), dpi_target=dpi, quality=calidad_jpeg, bitonal=False
+        )
+        documento.save(ruta_salida, garbage=4, deflate=True, use_objstms=1)
+
+    ahorro = _reemplazar_si_menor(ruta_pdf, guardar, cache)
+    return ahorro, os.path.getsize(ruta_pdf) <= limite_bytes
+
+
+def linealizar_pdf(ruta_pdf, cache=None):
+    """
+    Reescribe el PDF linealizado ("vista rápida en la web"): la primera página y lo que
+    necesita quedan al comienzo del archivo, con una tabla de sugerencias, y un visor en
+    el navegador puede mostrarla sin descargar el archivo completo. Los streams se copian
+    tal cual, así que las huellas de la caché se conservan.
+
+    Una escritura incremental posterior (al volver a unir) anula la linealización.
+    Requiere pikepdf; lanza RuntimeError si no está instalado.
+    Devuelve el aumento de tamaño en bytes (la tabla de sugerencias ocupa algo).
+    """
+    if pikepdf is None:
+        raise RuntimeError("para linealizar se necesita pikepdf (pip install pikepdf)")
+    tamano_original = os.path.getsize(ruta_pdf)
+    huellas = {}
+    if cache is not None:
+        huellas = {tipo: cache.obtener(ruta_pdf, tipo=tipo) for tipo in (TIPO_TEXTO, TIPO_VISUAL, TIPO_CONTENIDO)}
+
+    def guardar(ruta_salida):
+        # El original se cierra antes de reemplazarlo (en Windows no se puede reemplazar abierto).
+        with pikepdf.open(ruta_pdf) as documento:
+            documento.save(ruta_salida, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.preserve)
+
+    _escribir_atomico(guardar, ruta_pdf)
+
+    for tipo, huellas_tipo in huellas.items():
+        if huellas_tipo is not None:
+            cache.guardar(ruta_pdf, huellas_tipo, tipo=tipo)
+    return os.path.getsize(ruta_pdf) - tamano_original
+
+
+def _objetos_de_pagina(documento, pagina, tamanos):
+    """
+    Objetos (xref) que necesita la página —su contenido, recursos, anotaciones— sin
+    subir al árbol de páginas ni entrar en otras páginas. Registra en 'tamanos' lo que
+    ocupa cada uno.
+    """
+    objetos = set()
+    pendientes = [int(x) for x in _PATRON_REFERENCIA.findall(_PATRON_PARENT.sub("", documento.xref_object(pagina.xref)))]
+    while pendientes:
+        xref = pendientes.pop()
+        if xref in objetos or xref == pagina.xref:
+            continue
+        if documento.xref_get_key(xref, "Type")[1] in ("/Page", "/Pages"):
+            continue
+        objetos.add(xref)
+        definicion = _PATRON_PARENT.sub("", documento.xref_object(xref))
+        if xref not in tamanos:
+            tamanos[xref] = len(definicion)
+            if documento.xref_is_stream(xref):
+                tamanos[xref] += len(documento.xref_stream_raw(xref))
+        pendientes.extend(int(x) for x in _PATRON_REFERENCIA.findall(definicion))
+    return objetos
+
+
+def patron_partes(ruta_pdf):
+    """Patrón (para fullmatch) de los nombres de las partes de 'ruta_pdf' (ver FORMATO_PARTE)."""
+    base = os.path.splitext(os.path.basename(ruta_pdf))[0]
+    return re.compile(re.escape(base) + r"_parte\d+\.pdf", re.IGNORECASE)
+
+
+def dividir_pdf(ruta_pdf, limite_bytes):
+    """
+    Divide el PDF en partes consecutivas ('<nombre>_parteN.pdf', junto al original, que
+    se conserva) de menos de 'limite_bytes' cada una. El corte se decide mientras se
+    recorren las páginas, sumando lo que ocupan los objetos que cada página agrega a la
+    parte (los recursos compartidos, como fuentes o logos, se cuentan una vez por
+    parte); cada parte se escribe una sola vez. Las partes de una división anterior se
+    reemplazan.
+
+    Devuelve las rutas de las partes y cuántas superan el límite (solo ocurre si una
+    página sola ya lo supera). Si el PDF ya cabe en el límite no se divide: ([], 0).
+    """
+    carpeta = os.path.dirname(ruta_pdf)
+    base = os.path.splitext(os.path.basename(ruta_pdf))[0]
+    presupuesto = limite_bytes * _MARGEN_PARTE - _BYTES_FIJOS_PARTE
+
+    patron_anteriores = patron_partes(ruta_pdf)
+    for nombre in os.listdir(carpeta):
+        if patron_anteriores.fullmatch(nombre):
+            os.remove(os.path.join(carpeta, nombre))
+    if os.path.getsize(ruta_pdf) <= limite_bytes:
+        return [], 0
+
+    with fitz.open(ruta_pdf) as documento:
+        tramos = []  # (primera página, última página) de cada parte
+        tamanos = {}
+        inicio, ocupado, objetos_parte = 0, 0, set()
+        for numero in range(documento.page_count):
+            objetos = _objetos_de_pagina(documento, documento[numero], tamanos)
+            nuevos = objetos - objetos_parte
+            tamano_pagina = sum(tamanos[xref] for xref in nuevos) + _BYTES_POR_PAGINA
+            if numero > inicio and ocupado + tamano_pagina > presupuesto:
+                tramos.append((inicio, numero - 1))
+                inicio, objetos_parte = numero, set()
+                nuevos = objetos
+                tamano_pagina = sum(tamanos[xref] for xref in nuevos) + _BYTES_POR_PAGINA
+                ocupado = 0
+            objetos_parte |= nuevos
+            ocupado += tamano_pagina
+        tramos.append((inicio, documento.page_count - 1))
+
+        rutas_partes = []
+        excedidas = 0
+        for numero, (desde, hasta) in enumerate(tramos, start=1):
+            ruta_parte = os.path.join(carpeta, FORMATO_PARTE.format(base=base, numero=numero))
+            with fitz.open() as parte:
+                parte.insert_pdf(documento, from_page=desde, to_page=hasta)
+                _escribir_atomico(lambda ruta: parte.save(ruta, garbage=3, deflate=True), ruta_parte)
+            rutas_partes.append(ruta_parte)
+            excedidas += os.path.getsize(ruta_parte) > limite_bytes
+    return rutas_partes, excedidas
@@ -0,0 +1,126 @@
+# logica/core/precarga_carpetas.py
+import os
+import threading
+
+CARPETAS_ADELANTE_POR_DEFECTO = 2
+
+
+def _pdfs_de_carpeta(ruta_carpeta):
+    """[(ruta, tamaño)] de los PDFs de una carpeta, en orden alfabético."""
+    with os.scandir(ruta_carpeta) as entradas:
+        pdfs = [(os.path.abspath(entrada.path), entrada.stat().st_size)
+                for entrada in entradas if entrada.name.lower().endswith('.pdf') and entrada.is_file()]
+    return sorted(pdfs)
+
+
+def _leer(ruta):
+    with open(ruta, 'rb') as archivo:
+        estado = os.fstat(archivo.fileno())
+        return archivo.read(), (estado.st_size, estado.st_mtime_ns)
+
+
+class PrecargaCarpetas:
+    """
+    Lee en un hilo de fondo los PDFs de las carpetas que siguen a la que se está
+    procesando, para que la latencia de la red se solape con la verificación y la unión.
+
+    Se precargan como mucho 'carpetas_adelante' carpetas por delante de la actual y
+    'bytes_maximos' bytes en total; los archivos que solos superan ese límite se dejan
+    para leerlos al procesar su carpeta. Las carpetas deben tomarse en el mismo orden
+    en que se recibieron (ver 'tomar').
+
+    Uso:
+        with PrecargaCarpetas(rutas, bytes_maximos=...) as precarga:
+            for ruta in rutas:
+                sesion = SesionDocumentos(precarga.tomar(ruta))
+    """
+
+    def __init__(self, rutas_carpetas, bytes_maximos, carpetas_adelante=CARPETAS_ADELANTE_POR_DEFECTO):
+        self._rutas = list(rutas_carpetas)
+        self._indices = {ruta: i for i, ruta in enumerate(self._rutas)}
+        self.bytes_maximos = bytes_maximos
+        self.carpetas_adelante = carpetas_adelante
+        self._condicion = threading.Condition()
+        self._precargados = {}  # índice de carpeta -> {ruta: (datos, firma)}
+        self._bytes = 0
+        self._actual = -1
+        self._detenido = False
+        self._hilo = threading.Thread(target=self._precargar, daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.detener()
+        return False
+
+    def detener(self):
+        with self._condicion:
+            self._detenido = True
+            self._precargados.clear()
+            self._bytes = 0
+            self._condicion.notify_all()
+        if self._hilo.is_alive():
+            self._hilo.join()
+
+    def tomar(self, ruta_carpeta):
+        """
+        Marca 'ruta_carpeta' como la carpeta en proceso y devuelve lo precargado de ella,
+        {ruta absoluta: (datos, (tamaño, mtime_ns))}, que puede estar incompleto o vacío.
+        Lo precargado de carpetas anteriores que no se tomaron se descarta.
+        """
+        indice = self._indices[ruta_carpeta]
+        precargados = {}
+        with self._condicion:
+            self._actual = indice
+            for anterior in [i for i in self._precargados if i <= indice]:
+                archivos = self._precargados.pop(anterior)
+                self._bytes -= sum(len(datos) for datos, _ in archivos.values())
+                if anterior == indice:
+                    precargados = archivos
+            self._condicion.notify_all()
+        return precargados
+
+    def _esperar(self, condicion):
+        """Espera (con el candado tomado) a que se cumpla 'condicion' o se detenga la precarga."""
+        self._condicion.wait_for(lambda: self._detenido or condicion())
+        return not self._detenido
+
+    def _precargar(self):
+        # La primera carpeta se lee al procesarla: no hay nada con qué solapar su lectura.
+        for indice in range(1, len(self._rutas)):
+            with self._condicion:
+                if not self._esperar(lambda: indice <= self._actual + self.carpetas_adelante):
+                    return
+                if indice <= self._actual:
+                    continue
+            try:
+                archivos = _pdfs_de_carpeta(self._rutas[indice])
+            except OSError:
+                continue
+
+            for ruta, tamano in archivos:
+                if tamano > self.bytes_maximos:
+                    continue
+                with self._condicion:
+                    if not self._esperar(lambda: indice <= self._actual
+                                         or self._bytes + tamano <= self.bytes_maximos):
+                        return
+                    if indice <= self._actual:
+                        break
+                    # Se reserva el espacio antes de leer, fuera del candado.
+                    self._bytes += tamano
+                try:
+                    datos, firma = _leer(ruta)
+                except OSError:
+                    datos = None
+                with self._condicion:
+                    if self._detenido:
+                        return
+                    self._bytes -= tamano
+                    if indice <= self._actual:
+                        break
+                    if datos is not None:
+                        self._precargados.setdefault(indice, {})[ruta] = (datos, firma)
+                        self._bytes += len(datos)
@@ -1,72 +1,349 @@
 # logica/procesador_pdf.py
+import hashlib
+import zlib
 import pypdf
 import os
 
-def _obtener_texto_de_pagina(pagina):
-    """Extrae y limpia el texto de una página PDF."""
-    try:
-        texto = pagina.extract_text()
-        # Normalizamos el texto para una mejor comparación:
-        # eliminamos espacios en blanco extra y saltos de línea.
-        return " ".join(texto.split())
-    except Exception:
-        # Si la extracción de texto falla, retornamos una cadena vacía.
-        return ""
+from logica.core.sesion_documentos import SesionDocumentos
+from logica.core.motores_fusion import obtener_motor, MOTOR_POR_DEFECTO, MotorPyMuPDF
+from logica.core.huella_visual import verificar_por_huella_visual
+from logica.core import marcador_fusion
+from logica.core.cache_huellas import TIPO_CONTENIDO
+from logica.core.deduplicador_paginas import seleccionar_paginas_nuevas
+
+# Marca para las páginas cuya huella no se conoce en la caché de huellas.
+HUELLA_DESCONOCIDA = "?"
+
+# Palabras por shingle en la verificación de contenido y parámetros del hash rodante.
+TAMANO_SHINGLE = 8
+_BASE_RODANTE = 1_000_003
+_MODULO_RODANTE = (1 << 61) - 1
+
+# Memoria que ocupa, en proporción a su tamaño en disco, un PDF mientras se copia al
+# destino: sus datos leídos más los objetos ya copiados que esperan a escribirse.
+FACTOR_MEMORIA_FUENTE = 3
+
+def _huella_pagina(texto):
+    """Huella estable del texto normalizado de una página, acompañada de su longitud."""
+    resumen = hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+    return f"{resumen}:{len(texto)}"
+
+def _hashes_palabras(texto):
+    """Convierte el texto normalizado de una página en la secuencia de hashes de sus palabras."""
+    if not texto:
+        return []
+    return [zlib.crc32(palabra.encode('utf-8')) for palabra in texto.split(" ")]
+
+def _hashes_rodantes(secuencia, tamano):
+    """Hash rodante (Rabin-Karp) de cada ventana de 'tamano' palabras consecutivas."""
+    if len(secuencia) < tamano:
+        return
+    potencia = pow(_BASE_RODANTE, tamano - 1, _MODULO_RODANTE)
+    valor = 0
+    for hash_palabra in secuencia[:tamano]:
+        valor = (valor * _BASE_RODANTE + hash_palabra) % _MODULO_RODANTE
+    yield valor
+    for i in range(tamano, len(secuencia)):
+        valor = ((valor - secuencia[i - tamano] * potencia) * _BASE_RODANTE + secuencia[i]) % _MODULO_RODANTE
+        yield valor
+
+class _IndiceShingles:
+    """
+    Índice de los shingles de las páginas del 'fuente'. Una página del fuente se
+    considera contenida en el destino cuando todos sus shingles aparecen en él, que es
+    lo mismo que pedía la antigua búsqueda de subcadena sobre el texto normalizado.
+    """
+
+    def __init__(self, textos_fuente):
+        secuencias = [_hashes_palabras(texto) for texto in textos_fuente]
+        # Páginas muy cortas usan ventanas más pequeñas para seguir siendo comparables.
+        self.tamano = min([TAMANO_SHINGLE] + [len(secuencia) for secuencia in secuencias])
+        self._pendientes = [set(_hashes_rodantes(secuencia, self.tamano)) for secuencia in secuencias]
+        self._paginas_por_shingle = {}
+        for i, shingles in enumerate(self._pendientes):
+            for shingle in shingles:
+                self._paginas_por_shingle.setdefault(shingle, []).append(i)
+
+    def registrar(self, secuencia):
+        """Marca los shingles del destino vistos en 'secuencia'. True si alguna página del fuente quedó completa."""
+        for shingle in _hashes_rodantes(secuencia, self.tamano):
+            for i in self._paginas_por_shingle.get(shingle, ()):
+                pendientes = self._pendientes[i]
+                pendientes.discard(shingle)
+                if not pendientes:
+                    return True
+        return False
+
+def _largo_huella(huella):
+    return int(huella.rsplit(":", 1)[1])
+
+def _huellas_fuente(ruta_pdf_fuente, paginas_a_verificar, cache, sesion):
+    """
+    Devuelve las huellas de las primeras páginas del 'fuente', leyéndolas de la caché
+    o extrayendo su texto (y guardándolas) si no están disponibles.
+    """
+    huellas = cache.obtener(ruta_pdf_fuente)
+    if huellas is not None:
+        primeras = huellas[:paginas_a_verificar]
+        if HUELLA_DESCONOCIDA not in primeras:
+            return primeras
+
+    total_paginas = len(sesion.lector(ruta_pdf_fuente).pages)
+    primeras = [_huella_pagina(sesion.texto_pagina(ruta_pdf_fuente, i))
+                for i in range(min(paginas_a_verificar, total_paginas))]
+    cache.guardar(ruta_pdf_fuente, primeras + [HUELLA_DESCONOCIDA] * (total_paginas - len(primeras)),
+                  sesion.firma(ruta_pdf_fuente))
+    return primeras
+
+def _verificar_por_huellas(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar, min_caracteres, cache, sesion):
+    """
+    Verificación rápida con la caché: True si alguna de las primeras páginas del 'fuente'
+    coincide exactamente con una página conocida del 'destino'. Un False no es concluyente.
+    """
+    huellas_destino = cache.obtener(ruta_pdf_destino)
+    if not huellas_destino:
+        return False
+
+    conocidas = set(huellas_destino)
+    conocidas.discard(HUELLA_DESCONOCIDA)
+    for huella in _huellas_fuente(ruta_pdf_fuente, paginas_a_verificar, cache, sesion):
+        if _largo_huella(huella) > min_caracteres and huella in conocidas:
+            return True
+    return False
+
+def _fuente_sin_texto_en_cache(ruta_pdf_fuente, paginas_a_verificar, min_caracteres, cache):
+    """True si la caché ya sabe que las primeras páginas del 'fuente' no tienen texto útil."""
+    huellas = cache.obtener(ruta_pdf_fuente)
+    if not huellas:
+        return False
+    primeras = huellas[:paginas_a_verificar]
+    return HUELLA_DESCONOCIDA not in primeras and all(_largo_huella(h) <= min_caracteres for h in primeras)
+
+def huellas_tras_fusion(huellas_conocidas, rutas_en_orden, paginas_por_ruta, seleccion=None):
+    """
+    Arma la lista de huellas del PDF resultante de unir 'rutas_en_orden', reutilizando
+    lo que la caché conocía de cada archivo ('huellas_conocidas', leído antes de
+    sobrescribir el destino). 'seleccion' ({ruta: [índices]}) indica las páginas que se
+    anexaron de cada archivo cuando no fueron todas.
+    """
+    huellas = []
+    seleccion = seleccion or {}
+    for ruta, paginas in zip(rutas_en_orden, paginas_por_ruta):
+        conocidas = huellas_conocidas.get(ruta)
+        if conocidas is not None and ruta in seleccion:
+            conocidas = [conocidas[i] for i in seleccion[ruta] if i < len(conocidas)]
+        if conocidas is None or len(conocidas) != paginas:
+            conocidas = [HUELLA_DESCONOCIDA] * paginas
+        huellas.extend(conocidas)
+    return huellas
 
-def verificar_fusion_por_contenido(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar=2, min_caracteres=50):
+def verificar_fusion_por_contenido(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar=2, min_caracteres=50, cache=None,
+                                   sesion=None):
     """
     Verifica si el contenido del 'fuente' ya está en el 'destino' comparando texto.
+
+    Primero se busca cada página del 'fuente' como página idéntica del 'destino' (una
+    búsqueda en un conjunto de huellas). Si no aparece, se comprueba que todos sus
+    shingles (ventanas de palabras) estén presentes en el destino, lo que detecta el
+    texto aunque haya quedado repartido entre páginas. El destino se recorre de la
+    última página a la primera y página a página, sin unir todo su texto en memoria.
+
+    Si el 'fuente' no tiene texto (una carta escaneada), se compara su imagen con la
+    de las páginas de los extremos del destino mediante huellas perceptuales
+    (ver logica.core.huella_visual).
     
     Args:
         ruta_pdf_destino (str): Ruta al PDF de respuesta glosa.
         ruta_pdf_fuente (str): Ruta al PDF de carta glosa.
         paginas_a_verificar (int): Cuántas de las primeras páginas del 'fuente' se verificarán.
         min_caracteres (int): Longitud mínima de texto para considerar una coincidencia válida.
+        cache (CacheHuellasPaginas, opcional): Caché de huellas por página. Si el destino no
+            cambió desde la última ejecución, se evita volver a extraer su texto.
+        sesion (SesionDocumentos, opcional): Documentos ya abiertos de la carpeta. Los PDF y el
+            texto de sus páginas quedan en ella para reutilizarlos al unir.
 
     Returns:
         bool: True si el contenido ya parece estar fusionado, False en caso contrario.
     """
+    if sesion is None:
+        sesion = SesionDocumentos()
     try:
-        with open(ruta_pdf_destino, 'rb') as f_destino, open(ruta_pdf_fuente, 'rb') as f_fuente:
-            lector_destino = pypdf.PdfReader(f_destino)
-            lector_fuente = pypdf.PdfReader(f_fuente)
-            
-            texto_completo_destino = " ".join([_obtener_texto_de_pagina(pagina) for pagina in lector_destino.pages])
+        if cache is not None:
+            if _verificar_por_huellas(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar, min_caracteres, cache,
+                                      sesion):
+                return True
+            if _fuente_sin_texto_en_cache(ruta_pdf_fuente, paginas_a_verificar, min_caracteres, cache):
+                return verificar_por_huella_visual(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar, cache=cache,
+                                                   sesion=sesion)
+
+        total_paginas_fuente = len(sesion.lector(ruta_pdf_fuente).pages)
+        textos_fuente = [sesion.texto_pagina(ruta_pdf_fuente, i)
+                         for i in range(min(paginas_a_verificar, total_paginas_fuente))]
+        if cache is not None:
+            huellas_fuente = [_huella_pagina(texto) for texto in textos_fuente]
+            huellas_fuente += [HUELLA_DESCONOCIDA] * (total_paginas_fuente - len(huellas_fuente))
+            cache.guardar(ruta_pdf_fuente, huellas_fuente, sesion.firma(ruta_pdf_fuente))
+
+        textos_validos = [texto for texto in textos_fuente if texto and len(texto) > min_caracteres]
+        if not textos_validos:
+            return verificar_por_huella_visual(ruta_pdf_destino, ruta_pdf_fuente, paginas_a_verificar, cache=cache,
+                                               sesion=sesion)
+
+        paginas_fuente = {_huella_pagina(texto) for texto in textos_validos}
+        indice = _IndiceShingles(textos_validos)
+
+        total_paginas_destino = len(sesion.lector(ruta_pdf_destino).pages)
+        huellas_destino = [HUELLA_DESCONOCIDA] * total_paginas_destino
+        encontrado = False
+        # Primeras palabras de la página siguiente, para formar los shingles que cruzan el salto de página.
+        cabeza = []
+        for i in reversed(range(total_paginas_destino)):
+            texto = sesion.texto_pagina(ruta_pdf_destino, i)
+            huellas_destino[i] = _huella_pagina(texto)
+            if huellas_destino[i] in paginas_fuente:
+                encontrado = True
+                break
 
-            if not texto_completo_destino.strip():
-                return False
+            secuencia = _hashes_palabras(texto) + cabeza
+            if indice.registrar(secuencia):
+                encontrado = True
+                break
+            cabeza = secuencia[:indice.tamano - 1]
 
-            for i in range(min(paginas_a_verificar, len(lector_fuente.pages))):
-                texto_pagina_fuente = _obtener_texto_de_pagina(lector_fuente.pages[i])
+        if cache is not None:
+            cache.guardar(ruta_pdf_destino, huellas_destino, sesion.firma(ruta_pdf_destino))
 
-                if texto_pagina_fuente and len(texto_pagina_fuente) > min_caracteres:
-                    if texto_pagina_fuente in texto_completo_destino:
-                        return True
-            
-            return False
+        return encontrado
 
     except Exception as e:
         print(f"Advertencia: Ocurrió un error durante la verificación de contenido de PDF: {e}. Se procederá a unir por seguridad.")
         return False
 
-def fusionar_pdfs_en_destino(ruta_pdf_destino, rutas_pdf_fuentes):
+def fusionar_pdfs_en_destino(ruta_pdf_destino, rutas_pdf_fuentes, cache=None, rutas_pdf_previas=(), incremental=False,
+                             motor=MOTOR_POR_DEFECTO, sesion=None, deduplicar=False):
+    """
+    Une una lista de PDFs (fuentes) a un PDF existente (destino) con el motor de unión
+    indicado (ver logica.core.motores_fusion). Las páginas de 'rutas_pdf_previas'
+    (si las hay) quedan antes de las del destino.
+
+    Por defecto el archivo destino es SOBRESCRITO por completo (a través de un temporal
+    que lo reemplaza al final). Con incremental=True se escribe una actualización
+    incremental: las páginas nuevas y una nueva xref/trailer se añaden al final del
+    archivo existente, así que lo escrito depende solo de lo que se agrega y no del
+    tamaño del destino.
+
+    En el diccionario Info del resultado se deja un marcador (ver logica.core.marcador_fusion)
+    con las fuentes anexadas, que permite reconocer la unión sin leer las páginas.
+
+    Si se indica una caché de huellas, se registran las huellas ya conocidas del
+    resultado para que la próxima verificación no tenga que extraer su texto.
+
+    Con una 'sesion' (SesionDocumentos) se reutilizan los documentos que ya se abrieron
+    al verificar; el destino se descarta de ella después de escribirlo.
+
+    Con deduplicar=True no se anexan las páginas de las fuentes que ya están en el
+    resultado (mismo contenido y recursos, ver logica.core.deduplicador_paginas).
+
+    Devuelve el número de páginas omitidas por repetidas.
     """
-    Une una lista de PDFs (fuentes) a un PDF existente (destino) usando PdfWriter.
-    El archivo destino es SOBRESCRITO.
+    if sesion is None:
+        sesion = SesionDocumentos()
+    rutas_en_orden = list(rutas_pdf_previas) + [ruta_pdf_destino] + list(rutas_pdf_fuentes)
+    if cache is not None:
+        # Se leen antes de escribir: después, la firma del destino ya no coincide.
+        huellas_conocidas = {ruta: cache.obtener(ruta) for ruta in rutas_en_orden}
+
+    # Si el destino ya tenía un marcador vigente, sus fuentes se conservan en el nuevo.
+    marcador_previo, paginas_previas = marcador_fusion.leer_marcador(ruta_pdf_destino)
+    fuentes_anteriores = marcador_previo['fuentes'] if marcador_fusion.marcador_vigente(marcador_previo, paginas_previas) else []
+    indice_destino = len(rutas_pdf_previas)
+
+    def info_extra(paginas_por_ruta):
+        paginas_anexadas = paginas_por_ruta[:indice_destino] + paginas_por_ruta[indice_destino + 1:]
+        marcador = marcador_fusion.construir_marcador(
+            fuentes_anteriores, list(rutas_pdf_previas) + list(rutas_pdf_fuentes),
+            paginas_anexadas, sum(paginas_por_ruta), sesion=sesion
+        )
+        return {marcador_fusion.CLAVE_MARCADOR: marcador}
+
+    seleccion, huellas_contenido = None, {}
+    if deduplicar:
+        seleccion, huellas_contenido = seleccionar_paginas_nuevas(
+            list(rutas_pdf_previas) + [ruta_pdf_destino], rutas_pdf_fuentes, sesion, cache
+        )
+
+    paginas_por_ruta = obtener_motor(motor).fusionar(
+        ruta_pdf_destino, rutas_pdf_fuentes, rutas_pdf_previas, incremental, info_extra=info_extra, sesion=sesion,
+        seleccion=seleccion
+    )
+    sesion.olvidar(ruta_pdf_destino)
+
+    if cache is not None:
+        huellas = huellas_tras_fusion(huellas_conocidas, rutas_en_orden, paginas_por_ruta, seleccion)
+        cache.guardar(ruta_pdf_destino, huellas)
+        if deduplicar:
+            huellas = huellas_tras_fusion(huellas_contenido, rutas_en_orden, paginas_por_ruta, seleccion)
+            cache.guardar(ruta_pdf_destino, huellas, tipo=TIPO_CONTENIDO)
+
+    if not deduplicar:
+        return 0
+    return sum(len(huellas_contenido[ruta]) - len(seleccion[ruta]) for ruta in rutas_pdf_fuentes)
+
+def dividir_en_tramos(rutas_pdf, memoria_maxima, memoria_inicial=0):
+    """
+    Agrupa las rutas, en orden, en tramos cuya memoria estimada al unirlos no supera
+    'memoria_maxima' bytes. 'memoria_inicial' es lo que ya ocupa el primer tramo. Un
+    archivo que por sí solo supera el límite queda en un tramo propio.
     """
-    escritor = pypdf.PdfWriter()
+    tramos, tramo, ocupado = [], [], memoria_inicial
+    for ruta in rutas_pdf:
+        memoria = os.path.getsize(ruta) * FACTOR_MEMORIA_FUENTE
+        if tramo and ocupado + memoria > memoria_maxima:
+            tramos.append(tramo)
+            tramo, ocupado = [], 0
+        tramo.append(ruta)
+        ocupado += memoria
+    tramos.append(tramo)
+    return tramos
 
-    lector_destino = pypdf.PdfReader(ruta_pdf_destino)
-    for pagina in lector_destino.pages:
-        escritor.add_page(pagina)
+def fusionar_pdfs_por_tramos(ruta_pdf_destino, rutas_pdf_fuentes, memoria_maxima, cache=None, rutas_pdf_previas=(),
+                             sesion=None, deduplicar=False):
+    """
+    Une como fusionar_pdfs_en_destino pero con la memoria acotada a 'memoria_maxima'
+    bytes: las fuentes se anexan por tramos (ver dividir_en_tramos), cada uno en una
+    actualización incremental propia, y cada fuente se libera en cuanto sus páginas
+    se copian. Se usa el motor PyMuPDF porque abre el destino sin cargarlo en memoria;
+    el PdfWriter incremental de pypdf lee todos los objetos del original.
 
-    for ruta in rutas_pdf_fuentes:
-        lector_fuente = pypdf.PdfReader(ruta)
-        for pagina in lector_fuente.pages:
-            escritor.add_page(pagina)
+    El destino crece en varias escrituras incrementales, así que una interrupción puede
+    dejar solo algunos tramos anexados: quien llama debe marcar la escritura en curso
+    (con el tamaño previo al primer tramo) para poder deshacerla por completo.
 
-    with open(ruta_pdf_destino, 'wb') as archivo_salida:
-        escritor.write(archivo_salida)
+    Devuelve (número de tramos escritos, páginas omitidas por repetidas).
+    """
+    if sesion is not None:
+        # Lo que la sesión guardó del destino al verificar no cuenta en el límite: se libera.
+        sesion.olvidar(ruta_pdf_destino)
+    memoria_previas = sum(os.path.getsize(ruta) for ruta in rutas_pdf_previas) * FACTOR_MEMORIA_FUENTE
+    tramos = dividir_en_tramos(rutas_pdf_fuentes, memoria_maxima, memoria_previas)
+    omitidas = 0
+    for i, tramo in enumerate(tramos):
+        omitidas += fusionar_pdfs_en_destino(
+            ruta_pdf_destino, tramo, cache=cache, rutas_pdf_previas=rutas_pdf_previas if i == 0 else (),
+            incremental=True, motor=MotorPyMuPDF.nombre, sesion=sesion, deduplicar=deduplicar
+        )
+    return len(tramos), omitidas
+
+def contar_paginas_rapido(ruta_pdf):
+    """
+    Devuelve el número de páginas leyendo solo el /Count de la raíz del árbol de páginas.
+    A diferencia de obtener_cantidad_paginas_pdf no carga el archivo completo ni recorre
+    el árbol. Lanza una excepción si el PDF no se puede leer.
+    """
+    with open(ruta_pdf, 'rb') as f:
+        # Con un archivo abierto pypdf solo lee la xref y los objetos que se le piden.
+        lector = pypdf.PdfReader(f)
+        return int(lector.trailer['/Root']['/Pages']['/Count'])
 
 def obtener_cantidad_paginas_pdf(ruta_pdf):
     """Devuelve el número de páginas de un archivo PDF."""
@@ -0,0 +1,98 @@
+# logica/core/proceso_aislado.py
+import time
+
+
+def _bucle_hijo(funcion, conexion):
+    """Atiende encargos hasta recibir None o perder la conexión con el proceso padre."""
+    while True:
+        try:
+            argumentos = conexion.recv()
+        except EOFError:
+            return
+        if argumentos is None:
+            return
+        try:
+            conexion.send((True, funcion(*argumentos)))
+        except Exception as e:
+            conexion.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ProcesoAislado:
+    """
+    Proceso hijo reutilizable que ejecuta funcion(*argumentos) para cada encargo.
+
+    A diferencia de un ProcessPoolExecutor, un encargo que se demora demasiado se puede
+    cortar matando el proceso ('matar'); el siguiente encargo arranca uno nuevo.
+    'funcion' debe poder importarse desde el proceso hijo (nivel de módulo).
+    """
+
+    def __init__(self, funcion, contexto):
+        self._funcion = funcion
+        self._contexto = contexto
+        self._proceso = None
+        self._conexion = None
+        self.encargo = None
+        self.inicio = None
+
+    @property
+    def conexion(self):
+        """Extremo del padre; sirve para esperar con multiprocessing.connection.wait."""
+        return self._conexion
+
+    @property
+    def ocupado(self):
+        return self.encargo is not None
+
+    def _iniciar(self):
+        self._conexion, extremo_hijo = self._contexto.Pipe()
+        self._proceso = self._contexto.Process(target=_bucle_hijo, args=(self._funcion, extremo_hijo), daemon=True)
+        self._proceso.start()
+        extremo_hijo.close()
+
+    def enviar(self, encargo, *argumentos):
+        """Encarga funcion(*argumentos); 'encargo' identifica el trabajo para quien llama."""
+        if self._proceso is None or not self._proceso.is_alive():
+            self._iniciar()
+        self._conexion.send(argumentos)
+        self.encargo = encargo
+        self.inicio = time.monotonic()
+
+    def recibir(self):
+        """
+        Devuelve el resultado del encargo en curso. Lanza RuntimeError si la función
+        falló o si el proceso hijo terminó de forma inesperada.
+        """
+        try:
+            correcto, valor = self._conexion.recv()
+        except (EOFError, OSError):
+            self.matar()
+            raise RuntimeError("El proceso de trabajo terminó de forma inesperada.")
+        finally:
+            self.encargo = None
+        if not correcto:
+            raise RuntimeError(valor)
+        return valor
+
+    def transcurrido(self):
+        return time.monotonic() - self.inicio if self.ocupado else 0.0
+
+    def matar(self):
+        """Termina el proceso hijo de inmediato, abandonando el encargo en curso."""
+        if self._proceso is not None:
+            self._proceso.kill()
+            self._proceso.join()
+            self._conexion.close()
+        self._proceso = None
+        self._conexion = None
+        self.encargo = None
+
+    def cerrar(self, espera=5):
+        """Pide al proceso hijo que termine; si no lo hace a tiempo, lo mata."""
+        if self._proceso is None:
+            return
+        try:
+            self._conexion.send(None)
+        except OSError:
+            pass
+        self._proceso.join(espera)
+        self.matar()
@@ -0,0 +1,99 @@
+# logica/core/recorrido_paralelo.py
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from logica.core.gestor_archivos import leer_entradas
+
+# En un recurso de red cada listado espera un viaje al servidor; con varios hilos esas
+# esperas se solapan. Más hilos apenas ayudan y cargan al servidor de archivos.
+HILOS_POR_DEFECTO = 8
+
+
+class RecorridoParalelo:
+    """
+    Cola de trabajo de carpetas atendida por un grupo de hilos. Cada tarea agregada con
+    'agregar' se resuelve con 'explorar(tarea)' en un hilo del grupo, y al iterar se
+    obtienen los pares (tarea, resultado) en el hilo que consume, que decide qué
+    subcarpetas agregar a partir de cada resultado. Así el estado compartido (p. ej. una
+    conexión SQLite) solo se toca desde ese hilo.
+
+    Con ordenado=False los resultados salen según terminan. Con ordenado=True salen en
+    el orden de un recorrido secuencial de arriba abajo como el de os.walk: después de
+    cada resultado vienen las tareas que se agregaron al procesarlo (y sus
+    descendientes), antes que las hermanas pendientes. En ambos casos las tareas se
+    exploran en paralelo en cuanto se agregan.
+
+    Debe usarse como administrador de contexto: al salir (también si se deja de iterar a
+    la mitad) se descartan las tareas que no empezaron y se esperan las que están en curso.
+    """
+
+    def __init__(self, explorar, hilos=HILOS_POR_DEFECTO, ordenado=False):
+        self.explorar = explorar
+        self.ordenado = ordenado
+        self._grupo = ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="recorrido")
+        # Ordenado: pila de futuros (el siguiente es el último) y las tareas recién
+        # agregadas, que se apilan en orden inverso antes de tomar la siguiente.
+        self._pila = []
+        self._recien_agregadas = []
+        # Sin orden: los futuros terminados llegan a esta cola.
+        self._terminadas = queue.SimpleQueue()
+        self._pendientes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self._grupo.shutdown(wait=True, cancel_futures=True)
+        return False
+
+    def agregar(self, tarea):
+        futuro = self._grupo.submit(self.explorar, tarea)
+        futuro.tarea = tarea
+        if self.ordenado:
+            self._recien_agregadas.append(futuro)
+        else:
+            self._pendientes += 1
+            futuro.add_done_callback(self._terminadas.put)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.ordenado:
+            self._pila.extend(reversed(self._recien_agregadas))
+            self._recien_agregadas.clear()
+            if not self._pila:
+                raise StopIteration
+            futuro = self._pila.pop()
+        else:
+            if not self._pendientes:
+                raise StopIteration
+            futuro = self._terminadas.get()
+            self._pendientes -= 1
+        return futuro.tarea, futuro.result()
+
+
+def _listar(ruta_directorio):
+    try:
+        return leer_entradas(ruta_directorio)
+    except OSError:
+        return None
+
+
+def recorrer_arbol(ruta_raiz, hilos=HILOS_POR_DEFECTO, ordenado=True):
+    """
+    Equivalente de os.walk(ruta_raiz) (de arriba abajo, sin seguir enlaces a carpetas y
+    omitiendo las que no se pueden leer) que lista varias carpetas a la vez. Produce
+    (ruta, nombres_carpetas, nombres_archivos); con ordenado=True en el mismo orden que
+    os.walk. A diferencia de os.walk, modificar la lista de carpetas no poda el recorrido.
+    """
+    with RecorridoParalelo(_listar, hilos, ordenado) as recorrido:
+        recorrido.agregar(ruta_raiz)
+        for ruta, entradas in recorrido:
+            if entradas is None:
+                continue
+            carpetas = [entrada for entrada in entradas if entrada.es_carpeta]
+            for carpeta in carpetas:
+                if not carpeta.es_enlace:
+                    recorrido.agregar(carpeta.ruta)
+            yield ruta, [carpeta.nombre for carpeta in carpetas], [entrada.nombre for entrada in entradas if not entrada.es_carpeta]
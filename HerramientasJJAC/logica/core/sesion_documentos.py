@@ -0,0 +1,95 @@
+# logica/core/sesion_documentos.py
+import io
+import os
+import hashlib
+import pypdf
+
+
+def _obtener_texto_de_pagina(pagina):
+    """Extrae y limpia el texto de una página PDF."""
+    try:
+        texto = pagina.extract_text()
+        # Normalizamos el texto para una mejor comparación:
+        # eliminamos espacios en blanco extra y saltos de línea.
+        return " ".join(texto.split())
+    except Exception:
+        # Si la extracción de texto falla, retornamos una cadena vacía.
+        return ""
+
+
+class SesionDocumentos:
+    """
+    Documentos abiertos durante el procesamiento de una carpeta.
+
+    Cada PDF se lee del disco una sola vez y se analiza una sola vez: la verificación,
+    el marcador y la unión comparten el mismo PdfReader, el texto ya extraído de cada
+    página y el sha256 del archivo. Después de modificar un archivo hay que llamar a
+    'olvidar' para que no se sigan usando sus datos anteriores.
+
+    'precargados' ({ruta absoluta: (datos, (tamaño, mtime_ns))}, ver PrecargaCarpetas)
+    son archivos ya leídos por adelantado; se usan solo si el archivo no cambió desde
+    entonces.
+    """
+
+    def __init__(self, precargados=None):
+        self._precargados = dict(precargados or {})
+        self._datos = {}
+        self._firmas = {}
+        self._lectores = {}
+        self._textos = {}
+        self._sha256 = {}
+
+    @staticmethod
+    def _clave(ruta):
+        return os.path.abspath(ruta)
+
+    def datos(self, ruta):
+        """Contenido completo del archivo."""
+        clave = self._clave(ruta)
+        if clave not in self._datos and clave in self._precargados:
+            datos, firma = self._precargados.pop(clave)
+            estado = os.stat(clave)
+            if (estado.st_size, estado.st_mtime_ns) == firma:
+                self._datos[clave], self._firmas[clave] = datos, firma
+        if clave not in self._datos:
+            with open(clave, 'rb') as archivo:
+                estado = os.fstat(archivo.fileno())
+                self._datos[clave] = archivo.read()
+            self._firmas[clave] = (estado.st_size, estado.st_mtime_ns)
+        return self._datos[clave]
+
+    def firma(self, ruta):
+        """(tamaño, mtime en ns) del archivo en el momento en que se leyó."""
+        self.datos(ruta)
+        return self._firmas[self._clave(ruta)]
+
+    def lector(self, ruta):
+        clave = self._clave(ruta)
+        if clave not in self._lectores:
+            self._lectores[clave] = pypdf.PdfReader(io.BytesIO(self.datos(ruta)))
+        return self._lectores[clave]
+
+    def texto_pagina(self, ruta, indice):
+        """Texto normalizado de una página; se extrae una sola vez."""
+        clave = (self._clave(ruta), indice)
+        if clave not in self._textos:
+            self._textos[clave] = _obtener_texto_de_pagina(self.lector(ruta).pages[indice])
+        return self._textos[clave]
+
+    def sha256(self, ruta):
+        clave = self._clave(ruta)
+        if clave not in self._sha256:
+            self._sha256[clave] = hashlib.sha256(self.datos(ruta)).hexdigest()
+        return self._sha256[clave]
+
+    def olvidar(self, ruta):
+        """Descarta lo guardado de un archivo que acaba de modificarse."""
+        clave = self._clave(ruta)
+        for cache in (self._precargados, self._datos, self._firmas, self._lectores, self._sha256):
+            cache.pop(clave, None)
+        for clave_texto in [c for c in self._textos if c[0] == clave]:
+            del self._textos[clave_texto]
+
+    def cerrar(self):
+        for cache in (self._precargados, self._datos, self._firmas, self._lectores, self._textos, self._sha256):
+            cache.clear()
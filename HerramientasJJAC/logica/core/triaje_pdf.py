@@ -0,0 +1,207 @@
+# logica/core/triaje_pdf.py
+import os
+import re
+import json
+import multiprocessing
+from concurrent import futures
+from datetime import datetime
+
+import pypdf
+import fitz  # PyMuPDF
+
+from logica.core.motores_fusion import SUFIJO_TEMPORAL
+
+NOMBRE_INFORME_CUARENTENA = ".cuarentena_unir_soportes.json"
+
+# Copia del original que se conserva junto a un PDF reparado.
+SUFIJO_ORIGINAL_DANADO = ".original_danado"
+
+ESTADO_SANO = "sano"
+ESTADO_REPARADO = "reparado"
+# Se puede leer, pero su estructura tiene defectos (p. ej. la xref no está donde dice el trailer).
+ESTADO_ESTRUCTURA_DEFECTUOSA = "estructura_defectuosa"
+ESTADO_CIFRADO = "cifrado"
+ESTADO_DANADO = "danado"
+
+# Estados que dejan la carpeta fuera de la unión.
+ESTADOS_EN_CUARENTENA = (ESTADO_CIFRADO, ESTADO_DANADO)
+
+# Bytes del inicio y del final del archivo que se inspeccionan.
+_BYTES_CABECERA = 1024
+_BYTES_COLA = 2048
+
+_PATRON_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_PATRON_OBJETO = re.compile(rb"\s*\d+\s+\d+\s+obj")
+
+
+def _revisar_estructura(ruta):
+    """Revisa cabecera, marcador de fin y posición de la xref. Devuelve la lista de defectos."""
+    defectos = []
+    with open(ruta, 'rb') as archivo:
+        tamano = os.fstat(archivo.fileno()).st_size
+        if b"%PDF-" not in archivo.read(_BYTES_CABECERA):
+            return ["no tiene cabecera %PDF"]
+
+        archivo.seek(max(tamano - _BYTES_COLA, 0))
+        cola = archivo.read()
+        if b"%%EOF" not in cola:
+            defectos.append("le falta el marcador %%EOF (¿archivo truncado?)")
+        posiciones = _PATRON_STARTXREF.findall(cola)
+        if not posiciones:
+            defectos.append("no tiene startxref")
+        else:
+            posicion = int(posiciones[-1])
+            if posicion >= tamano:
+                defectos.append("startxref apunta fuera del archivo")
+            else:
+                archivo.seek(posicion)
+                inicio_xref = archivo.read(32)
+                # Puede ser una tabla clásica ('xref') o un objeto con un stream de referencias.
+                if not inicio_xref.lstrip().startswith(b"xref") and not _PATRON_OBJETO.match(inicio_xref):
+                    defectos.append("startxref no apunta a una tabla de referencias")
+    return defectos
+
+
+def _reparar(ruta):
+    """
+    Reescribe el PDF con PyMuPDF, que reconstruye la xref al abrir un archivo dañado.
+    El original se conserva con SUFIJO_ORIGINAL_DANADO. Devuelve el número de páginas.
+    """
+    ruta_temporal = ruta + SUFIJO_TEMPORAL
+    with fitz.open(ruta) as documento:
+        if documento.needs_pass or documento.page_count == 0:
+            raise ValueError("PyMuPDF tampoco pudo recuperar páginas")
+        paginas = documento.page_count
+        documento.save(ruta_temporal, garbage=3, deflate=True)
+    # Se comprueba que el resultado sí es legible antes de tocar el original.
+    with open(ruta_temporal, 'rb') as archivo:
+        if len(pypdf.PdfReader(archivo).pages) != paginas:
+            os.remove(ruta_temporal)
+            raise ValueError("la copia reparada no conserva las páginas")
+    os.replace(ruta, ruta + SUFIJO_ORIGINAL_DANADO)
+    os.replace(ruta_temporal, ruta)
+    return paginas
+
+
+def revisar_pdf(ruta, reparar=False):
+    """
+    Diagnostica un PDF sin modificarlo (salvo que se pida 'reparar'). Devuelve un dict
+    con 'ruta', 'estado' (ver ESTADO_*), 'razon' y 'paginas'.
+
+    Con reparar=True, los archivos ilegibles o con la estructura defectuosa se
+    reescriben con PyMuPDF; si la reparación funciona quedan en ESTADO_REPARADO.
+    """
+    informe = {'ruta': ruta, 'estado': ESTADO_SANO, 'razon': "", 'paginas': 0}
+    try:
+        defectos = _revisar_estructura(ruta)
+    except OSError as e:
+        informe.update(estado=ESTADO_DANADO, razon=f"No se pudo leer: {e}")
+        return informe
+
+    if defectos and defectos[0] == "no tiene cabecera %PDF":
+        informe.update(estado=ESTADO_DANADO, razon="No es un PDF: no tiene cabecera %PDF.")
+        return informe
+
+    try:
+        with open(ruta, 'rb') as archivo:
+            lector = pypdf.PdfReader(archivo)
+            if lector.is_encrypted:
+                informe.update(estado=ESTADO_CIFRADO, razon="Está protegido con contraseña.")
+                return informe
+            informe['paginas'] = len(lector.pages)
+        if not informe['paginas']:
+            raise ValueError("no tiene páginas")
+        if defectos:
+            informe.update(estado=ESTADO_ESTRUCTURA_DEFECTUOSA, razon=f"Se puede leer, pero {'; '.join(defectos)}.")
+    except Exception as e:
+        informe.update(estado=ESTADO_DANADO, razon=f"No se puede leer: {e}")
+
+    if reparar and informe['estado'] in (ESTADO_DANADO, ESTADO_ESTRUCTURA_DEFECTUOSA):
+        try:
+            informe['paginas'] = _reparar(ruta)
+            informe.update(estado=ESTADO_REPARADO, razon=f"Reparado con PyMuPDF ({informe['razon']})")
+        except Exception as e:
+            informe['razon'] += f" No se pudo reparar: {e}"
+    return informe
+
+
+def _pdfs_de_carpetas(rutas_carpetas):
+    """
+    Devuelve (rutas de los PDFs de las carpetas, {carpeta: informe}) con un informe
+    ESTADO_DANADO para cada carpeta que no se pudo listar (p. ej. se renombró o dejó de
+    ser accesible después de elegirla), para que se registre como fallida.
+    """
+    rutas, ilegibles = [], {}
+    for ruta_carpeta in rutas_carpetas:
+        try:
+            with os.scandir(ruta_carpeta) as entradas:
+                rutas.extend([entrada.path for entrada in entradas
+                              if entrada.name.lower().endswith('.pdf') and entrada.is_file()])
+        except OSError as e:
+            ilegibles[ruta_carpeta] = {
+                'ruta': ruta_carpeta, 'estado': ESTADO_DANADO, 'razon': f"No se pudo listar: {e}", 'paginas': 0
+            }
+    return sorted(rutas), ilegibles
+
+
+def triar_carpetas(rutas_carpetas, procesos=1, reparar=False, al_avanzar=None, cancelado=None):
+    """
+    Revisa (con revisar_pdf) todos los PDFs de 'rutas_carpetas', en un pool de
+    'procesos' procesos si es más de uno. 'al_avanzar(revisados, total)' se llama tras
+    cada archivo y 'cancelado()' permite interrumpir la revisión.
+
+    Devuelve {ruta de carpeta: [informes de sus PDFs]}. Una carpeta que no se pudo
+    listar tiene un único informe ESTADO_DANADO de la propia carpeta.
+    """
+    rutas, ilegibles = _pdfs_de_carpetas(rutas_carpetas)
+    informes = []
+    if procesos > 1 and len(rutas) > 1:
+        contexto = multiprocessing.get_context("spawn")
+        with futures.ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as ejecutor:
+            tareas = [ejecutor.submit(revisar_pdf, ruta, reparar) for ruta in rutas]
+            try:
+                for tarea in futures.as_completed(tareas):
+                    informes.append(tarea.result())
+                    if al_avanzar:
+                        al_avanzar(len(informes), len(rutas))
+                    if cancelado and cancelado():
+                        break
+            finally:
+                ejecutor.shutdown(wait=True, cancel_futures=True)
+    else:
+        for ruta in rutas:
+            if cancelado and cancelado():
+                break
+            informes.append(revisar_pdf(ruta, reparar))
+            if al_avanzar:
+                al_avanzar(len(informes), len(rutas))
+
+    por_carpeta = {ruta_carpeta: [] for ruta_carpeta in rutas_carpetas}
+    for informe in sorted(informes, key=lambda informe: informe['ruta']):
+        por_carpeta[os.path.dirname(informe['ruta'])].append(informe)
+    for ruta_carpeta, informe in ilegibles.items():
+        por_carpeta[ruta_carpeta].append(informe)
+    return por_carpeta
+
+
+def escribir_informe_cuarentena(ruta_carpeta_raiz, por_carpeta):
+    """
+    Guarda en la carpeta raíz un informe JSON con los PDFs que no están sanos (en
+    cuarentena, reparados o con defectos de estructura). Devuelve la ruta del informe.
+    """
+    problemas = [
+        {**informe, 'ruta': os.path.relpath(informe['ruta'], ruta_carpeta_raiz)}
+        for informes in por_carpeta.values() for informe in informes
+        if informe['estado'] != ESTADO_SANO
+    ]
+    contenido = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        # El informe de una carpeta que no se pudo listar no es de un PDF revisado.
+        'revisados': sum(informe['ruta'] != ruta_carpeta for ruta_carpeta, informes in por_carpeta.items() for informe in informes),
+        'en_cuarentena': [p for p in problemas if p['estado'] in ESTADOS_EN_CUARENTENA],
+        'otros': [p for p in problemas if p['estado'] not in ESTADOS_EN_CUARENTENA],
+    }
+    ruta_informe = os.path.join(ruta_carpeta_raiz, NOMBRE_INFORME_CUARENTENA)
+    with open(ruta_informe, 'w', encoding='utf-8') as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False, indent=2)
+    return ruta_informe
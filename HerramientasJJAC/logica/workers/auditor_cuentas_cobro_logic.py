@@ -6,6 +6,8 @@ from collections import Counter
 import shutil
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+
 HIGHLIGHT_COLOR_UNIQUE_FOUND = (0.7, 1, 0.7)  # Verde claro
 HIGHLIGHT_COLOR_REPETED_FOUND = (1, 1, 0.6)  # Amarillo claro
 
@@ -115,12 +117,10 @@ class AuditorCuentasCobroWorker(QObject):
     def _get_folders_info(self, path):
         folders_info = {}
         if not os.path.isdir(path): return None
-        for item_name in os.listdir(path):
-            full_path = os.path.join(path, item_name)
-            if os.path.isdir(full_path):
-                match = re.match(r"^\d+", item_name)
-                if match:
-                    folders_info[match.group(0)] = item_name
+        for entrada in InstantaneaCarpeta(path).carpetas():
+            match = re.match(r"^\d+", entrada.nombre)
+            if match:
+                folders_info[match.group(0)] = entrada.nombre
         return folders_info
 
     def _find_invoices_from_words(self, doc):
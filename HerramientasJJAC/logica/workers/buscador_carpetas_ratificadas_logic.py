@@ -4,6 +4,8 @@ import shutil
 import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.indice_busqueda import IndiceBusqueda
+
 class BuscadorCarpetasRatificadasWorker(QObject):
     progreso_actualizado = Signal(str, float)
     proceso_finalizado = Signal(dict)
@@ -26,15 +28,19 @@ class BuscadorCarpetasRatificadasWorker(QObject):
         try:
             self.progreso_actualizado.emit("Iniciando búsqueda...", 0)
 
-            for dirpath, dirnames, _ in os.walk(self.carpeta_busqueda):
-                if self.esta_cancelado: break
-                for dirname in list(dirnames):
-                    for codigo in self.codigos:
-                        if dirname.startswith(codigo):
-                            ruta_completa = os.path.join(dirpath, dirname)
-                            if codigo not in resultados['encontrados']:
-                                resultados['encontrados'][codigo] = []
-                            resultados['encontrados'][codigo].append(ruta_completa)
+            indice = IndiceBusqueda.para_raiz(self.carpeta_busqueda)
+            try:
+                indice.actualizar(
+                    cancelado=lambda: self.esta_cancelado,
+                    progreso=lambda revisadas: self.progreso_actualizado.emit(f"Actualizando índice... {revisadas} carpetas revisadas", 0)
+                )
+                for codigo in self.codigos:
+                    if self.esta_cancelado: break
+                    carpetas = indice.buscar_carpetas_por_prefijo(codigo)
+                    if carpetas:
+                        resultados['encontrados'][codigo] = [carpeta.ruta for carpeta in carpetas]
+            finally:
+                indice.cerrar()
             
             if self.esta_cancelado: return
 
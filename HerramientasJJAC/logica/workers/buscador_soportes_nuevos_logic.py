@@ -1,9 +1,11 @@
 # logica/workers/buscador_soportes_nuevos_logic.py
 import os
 import shutil
-import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.identificador_archivos import separar_factura
+from logica.core.indice_busqueda import IndiceBusqueda, fecha_carpeta
+
 # --- COLORES OPTIMIZADOS PARA DARK MODE ---
 COLOR_INFO = "#5DADE2"      # Azul claro
 COLOR_SUCCESS = "#2ECC71"   # Verde brillante
@@ -24,6 +26,7 @@ class BuscadorSoportesNuevosWorker(QObject):
         self.esta_cancelado = False
         self.exitos_lista = []
         self.fallos_lista = []
+        self.indice = None
 
     def _log(self, mensaje: str, color: str = COLOR_DEFAULT):
         self.log_generado.emit(f"<p style='color:{color}; margin-top:0; margin-bottom:0;'>{mensaje}</p>")
@@ -34,8 +37,12 @@ class BuscadorSoportesNuevosWorker(QObject):
         self._log(f"Directorio de Destino: {self.dir_destino}")
 
         try:
+            # --- FASE 0: ÍNDICE DEL DIRECTORIO DE BÚSQUEDA ---
+            self.indice = IndiceBusqueda.para_raiz(self.dir_busqueda)
+            self._actualizar_indice()
+
             # --- FASE 1: ESTRATEGIA A (Búsqueda por carpetas) ---
-            facturas_para_estrategia_b = self._ejecutar_estrategia_a()
+            facturas_para_estrategia_b = self._ejecutar_estrategia_a() if not self.esta_cancelado else []
 
             # --- FASE 2: ESTRATEGIA B (Búsqueda por archivos) ---
             if not self.esta_cancelado and facturas_para_estrategia_b:
@@ -43,6 +50,9 @@ class BuscadorSoportesNuevosWorker(QObject):
 
         except Exception as e:
             self._log(f"<b>ERROR CRÍTICO:</b> {e}", COLOR_ERROR)
+        finally:
+            if self.indice:
+                self.indice.cerrar()
         
         # --- RESUMEN FINAL ---
         self.progreso_actualizado.emit("Operación completada.", 100)
@@ -58,17 +68,24 @@ class BuscadorSoportesNuevosWorker(QObject):
         self._log("<br><b>✅ Operación completada.</b>", COLOR_SUCCESS)
         self.proceso_finalizado.emit()
 
+    def _actualizar_indice(self):
+        self._log("Actualizando índice del directorio de búsqueda... La primera vez puede tardar.", COLOR_INFO)
+        self.progreso_actualizado.emit("Actualizando índice...", 0)
+        resumen = self.indice.actualizar(
+            cancelado=lambda: self.esta_cancelado,
+            progreso=lambda revisadas: self.progreso_actualizado.emit(f"Actualizando índice... {revisadas} carpetas revisadas", 0)
+        )
+        if resumen.cancelada:
+            self._log("Actualización del índice cancelada.", COLOR_WARNING)
+            return
+        nombres_carpetas, nombres_pdf = self.indice.contar()
+        self._log(f"Índice al día: {resumen.revisadas} carpetas revisadas, {resumen.releidas} releídas.", COLOR_INFO)
+        if resumen.fallidas:
+            self._log(f"No se pudieron leer {resumen.fallidas} carpetas; se usa lo que el índice tenía de ellas.", COLOR_WARNING)
+        self._log(f"Se indexaron {nombres_carpetas} nombres de carpetas y {nombres_pdf} nombres de archivos PDF únicos.", COLOR_SUCCESS)
+
     def _ejecutar_estrategia_a(self):
         self._log("<br><b>--- FASE 1: Iniciando Estrategia A (Búsqueda por Carpetas) ---</b>", COLOR_INFO)
-        self._log("Creando índice de carpetas... Esto puede tardar un momento.", COLOR_INFO)
-        self.progreso_actualizado.emit("Escaneando directorios (Fase 1)...", 0)
-        
-        indice_carpetas = {}
-        for dirpath, dirnames, _ in os.walk(self.dir_busqueda):
-            for dirname in dirnames:
-                indice_carpetas.setdefault(dirname, []).append(os.path.join(dirpath, dirname))
-        
-        self._log(f"Se indexaron {len(indice_carpetas)} nombres de carpetas únicos.", COLOR_SUCCESS)
         
         facturas_no_encontradas = []
         total_facturas = len(self.facturas_con_serie)
@@ -83,28 +100,29 @@ class BuscadorSoportesNuevosWorker(QObject):
             self.progreso_actualizado.emit(f"Fase 1: {factura_limpia}", porcentaje)
             self._log(f"<br><b>Procesando (A): {factura_limpia}</b>", COLOR_INFO)
 
-            match = re.match(r'([a-zA-Z]+)(\d+)', factura_limpia)
-            if not match:
+            partes_factura = separar_factura(factura_limpia)
+            if not partes_factura:
                 self._log("-> Formato no válido.", COLOR_WARNING)
                 facturas_no_encontradas.append(factura_limpia)
                 continue
             
-            serie, numero_factura = match.groups()
+            serie, numero_factura = partes_factura
             self._log(f"-> Serie: '{serie}', Número: '{numero_factura}'")
 
-            rutas_encontradas = indice_carpetas.get(numero_factura)
+            carpetas_encontradas = self.indice.buscar_carpetas(numero_factura)
             
-            if not rutas_encontradas:
+            if not carpetas_encontradas:
                 self._log(f"-> No se encontró carpeta con el número '{numero_factura}'. Pasando a Estrategia B.", COLOR_WARNING)
                 facturas_no_encontradas.append(factura_limpia)
                 continue
             
-            carpeta_encontrada = rutas_encontradas[0]
-            if len(rutas_encontradas) > 1:
-                self._log(f"-> AVISO: Se encontraron {len(rutas_encontradas)} carpetas para '{numero_factura}'. Se usará la más reciente.", COLOR_WARNING)
-                carpeta_encontrada = max(rutas_encontradas, key=os.path.getmtime)
+            carpeta_encontrada = carpetas_encontradas[0].ruta
+            if len(carpetas_encontradas) > 1:
+                self._log(f"-> AVISO: Se encontraron {len(carpetas_encontradas)} carpetas para '{numero_factura}'. Se usará la más reciente.", COLOR_WARNING)
+                carpeta_encontrada = max(carpetas_encontradas, key=fecha_carpeta).ruta
 
-            archivos_en_carpeta = os.listdir(carpeta_encontrada)
+            # El listado sale del índice recién actualizado: la carpeta no se vuelve a leer.
+            archivos_en_carpeta = self.indice.archivos_de(carpeta_encontrada)
             if not any(serie.lower() in nombre_archivo.lower() for nombre_archivo in archivos_en_carpeta):
                 self._log(f"-> La serie '{serie}' no fue encontrada en los archivos de la carpeta. Pasando a Estrategia B.", COLOR_WARNING)
                 facturas_no_encontradas.append(factura_limpia)
@@ -114,24 +132,13 @@ class BuscadorSoportesNuevosWorker(QObject):
             self._log(f"-> Serie '{serie}' verificada. Copiando soportes.", COLOR_SUCCESS)
             
             ruta_destino_subcarpeta = os.path.join(self.dir_destino, numero_factura)
-            self._copiar_soportes_desde_carpeta(carpeta_encontrada, ruta_destino_subcarpeta, factura_limpia)
+            self._copiar_soportes_desde_carpeta(carpeta_encontrada, archivos_en_carpeta, ruta_destino_subcarpeta, factura_limpia)
             self.exitos_lista.append(f"{factura_limpia} (por carpeta)")
 
         return facturas_no_encontradas
 
     def _ejecutar_estrategia_b(self, facturas_a_buscar: list[str]):
         self._log("<br><b>--- FASE 2: Iniciando Estrategia B (Búsqueda por Archivos PDF) ---</b>", COLOR_INFO)
-        self._log("Creando índice de archivos... Esto puede tardar un momento.", COLOR_INFO)
-        self.progreso_actualizado.emit("Escaneando archivos (Fase 2)...", 50)
-
-        indice_archivos = {}
-        for dirpath, _, filenames in os.walk(self.dir_busqueda):
-            for filename in filenames:
-                if filename.lower().endswith('.pdf'):
-                    nombre_sin_ext, _ = os.path.splitext(filename)
-                    indice_archivos.setdefault(nombre_sin_ext.lower(), []).append(os.path.join(dirpath, filename))
-        
-        self._log(f"Se indexaron {len(indice_archivos)} nombres de archivos PDF únicos.", COLOR_SUCCESS)
         
         total_facturas_b = len(facturas_a_buscar)
         for i, factura_input in enumerate(facturas_a_buscar):
@@ -144,7 +151,7 @@ class BuscadorSoportesNuevosWorker(QObject):
             self.progreso_actualizado.emit(f"Fase 2: {factura_limpia}", porcentaje)
             self._log(f"<br><b>Procesando (B): {factura_limpia}</b>", COLOR_INFO)
 
-            rutas_encontradas = indice_archivos.get(factura_limpia.lower())
+            rutas_encontradas = self.indice.buscar_pdf(factura_limpia)
 
             if not rutas_encontradas:
                 self._log("-> No se encontró archivo PDF con ese nombre.", COLOR_WARNING)
@@ -165,12 +172,12 @@ class BuscadorSoportesNuevosWorker(QObject):
             self.exitos_lista.append(f"{factura_limpia} (por archivo)")
 
     def _encontrar_subcarpeta_destino(self, factura_buscada: str) -> str:
-        match = re.match(r'([a-zA-Z]+)(\d+)', factura_buscada)
-        if not match:
+        partes_factura = separar_factura(factura_buscada)
+        if not partes_factura:
             self._log(f"-> AVISO: No se pudo extraer el número de la factura '{factura_buscada}' para buscar subcarpeta. Se usará el destino raíz.", COLOR_WARNING)
             return self.dir_destino
 
-        numero_factura = match.groups()[1]
+        numero_factura = partes_factura[1]
 
         try:
             for nombre_subcarpeta in os.listdir(self.dir_destino):
@@ -183,22 +190,21 @@ class BuscadorSoportesNuevosWorker(QObject):
         self._log(f"-> AVISO: No se encontró subcarpeta con el número '{numero_factura}'. Se usará el directorio destino raíz.", COLOR_WARNING)
         return self.dir_destino
 
-    def _copiar_soportes_desde_carpeta(self, ruta_origen: str, ruta_destino: str, factura_info: str):
+    def _copiar_soportes_desde_carpeta(self, ruta_origen: str, nombres_archivos: list[str], ruta_destino: str, factura_info: str):
         archivos_copiados = 0
         try:
             if not os.path.isdir(ruta_destino):
                 os.makedirs(ruta_destino)
                 self._log(f"-> Carpeta de destino creada: {os.path.basename(ruta_destino)}", COLOR_INFO)
 
-            for nombre_item in os.listdir(ruta_origen):
+            for nombre_item in nombres_archivos:
                 ruta_completa_origen = os.path.join(ruta_origen, nombre_item)
-                if os.path.isfile(ruta_completa_origen):
-                    ruta_completa_destino = os.path.join(ruta_destino, nombre_item)
-                    if not os.path.exists(ruta_completa_destino):
-                        shutil.copy2(ruta_completa_origen, ruta_completa_destino)
-                        archivos_copiados += 1
-                    else:
-                        self._log(f"-> Omitido (ya existe): {nombre_item}", "gray")
+                ruta_completa_destino = os.path.join(ruta_destino, nombre_item)
+                if not os.path.exists(ruta_completa_destino):
+                    shutil.copy2(ruta_completa_origen, ruta_completa_destino)
+                    archivos_copiados += 1
+                else:
+                    self._log(f"-> Omitido (ya existe): {nombre_item}", "gray")
             
             if archivos_copiados > 0:
                 self._log(f"-> Se copiaron {archivos_copiados} archivos de la carpeta.", COLOR_SUCCESS)
@@ -1,9 +1,9 @@
 import os
 import shutil
-import re
 from PySide6.QtCore import QObject, Signal
 
-from logica.core.identificador_archivos import identificar_documentos_aseguradoras
+from logica.core.identificador_archivos import identificar_documentos_aseguradoras, separar_factura
+from logica.core.indice_busqueda import IndiceBusqueda, fecha_carpeta
 
 # --- COLORES OPTIMIZADOS PARA DARK MODE ---
 COLOR_INFO = "#5DADE2"      # Azul claro
@@ -34,17 +34,25 @@ class BuscadorSoportesRatificadosWorker(QObject):
         self._log(f"Directorio de Búsqueda: {self.dir_busqueda}")
         self._log(f"Directorio de Destino: {self.dir_destino}")
 
+        indice = None
         try:
             # 1. FASE DE INDEXACIÓN
-            self._log("Creando índice de carpetas...", COLOR_INFO)
-            self.progreso_actualizado.emit("Escaneando directorios...", 0)
+            self._log("Actualizando índice de carpetas... La primera vez puede tardar.", COLOR_INFO)
+            self.progreso_actualizado.emit("Actualizando índice...", 0)
             
-            indice_carpetas = {}
-            for dirpath, dirnames, _ in os.walk(self.dir_busqueda):
-                for dirname in dirnames:
-                    indice_carpetas.setdefault(dirname, []).append(os.path.join(dirpath, dirname))
+            indice = IndiceBusqueda.para_raiz(self.dir_busqueda)
+            resumen = indice.actualizar(
+                cancelado=lambda: self.esta_cancelado,
+                progreso=lambda revisadas: self.progreso_actualizado.emit(f"Actualizando índice... {revisadas} carpetas revisadas", 0)
+            )
             
-            self._log(f"Se indexaron {len(indice_carpetas)} nombres de carpetas únicos.", COLOR_SUCCESS)
+            if resumen.cancelada:
+                self._log("Actualización del índice cancelada.", COLOR_WARNING)
+            else:
+                self._log(f"Índice al día: {resumen.revisadas} carpetas revisadas, {resumen.releidas} releídas.", COLOR_INFO)
+                if resumen.fallidas:
+                    self._log(f"No se pudieron leer {resumen.fallidas} carpetas; se usa lo que el índice tenía de ellas.", COLOR_WARNING)
+                self._log(f"Se indexaron {indice.contar()[0]} nombres de carpetas únicos.", COLOR_SUCCESS)
 
             # 2. FASE DE PROCESAMIENTO
             total_facturas = len(self.facturas_con_serie)
@@ -58,16 +66,18 @@ class BuscadorSoportesRatificadosWorker(QObject):
                 self.progreso_actualizado.emit(f"Procesando: {factura_limpia}", porcentaje)
                 self._log(f"<br><b>Procesando: {factura_limpia}</b>", COLOR_INFO)
 
-                match = re.match(r'([a-zA-Z]+)(\d+)', factura_limpia)
-                if not match:
+                partes_factura = separar_factura(factura_limpia)
+                if not partes_factura:
                     self._log(f"-> Formato no válido. Se esperaba 'SERIENUMERO'.", COLOR_WARNING)
                     self.fallos_lista.append(f"{factura_limpia} (formato no válido)")
                     continue
                 
-                serie, numero_factura = match.groups()
+                serie, numero_factura = partes_factura
                 self._log(f"-> Serie: '{serie}', Número: '{numero_factura}'")
 
-                rutas_encontradas = indice_carpetas.get(numero_factura)
+                carpetas_encontradas = indice.buscar_carpetas(numero_factura)
+                # Ordenar de más nueva a más vieja
+                rutas_encontradas = [carpeta.ruta for carpeta in sorted(carpetas_encontradas, key=fecha_carpeta, reverse=True)]
                 
                 if not rutas_encontradas:
                     self._log(f"-> No se encontró carpeta con el número '{numero_factura}'.", COLOR_WARNING)
@@ -77,7 +87,6 @@ class BuscadorSoportesRatificadosWorker(QObject):
                 # --- LÓGICA DE SELECCIÓN PARA R2 ---
                 carpeta_origen_final = None
                 if len(rutas_encontradas) > 1:
-                    rutas_encontradas.sort(key=os.path.getmtime, reverse=True) # Ordenar de más nueva a más vieja
                     self._log(f"-> Se encontraron {len(rutas_encontradas)} carpetas. Seleccionando la penúltima.", COLOR_INFO)
                     carpeta_origen_final = rutas_encontradas[1] # La penúltima
                 elif len(rutas_encontradas) == 1:
@@ -104,6 +113,9 @@ class BuscadorSoportesRatificadosWorker(QObject):
 
         except Exception as e:
             self._log(f"<b>ERROR CRÍTICO:</b> {e}", COLOR_ERROR)
+        finally:
+            if indice:
+                indice.cerrar()
         
         self.progreso_actualizado.emit("Operación completada.", 100)
         self._log(f"<br><b>--- RESUMEN ---</b>", COLOR_INFO)
@@ -4,6 +4,9 @@ import shutil
 import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+from logica.core.identificador_archivos import clasificar_nombre
+
 class OrganizadorRespuestasAdresWorker(QObject):
     """
     Clase que ejecuta la lógica de negocio para el procesamiento de ADRES en un hilo de trabajo.
@@ -28,14 +31,15 @@ class OrganizadorRespuestasAdresWorker(QObject):
         }
 
         try:
-            subcarpetas = sorted([d for d in os.listdir(self.carpeta_raiz) if os.path.isdir(os.path.join(self.carpeta_raiz, d))])
+            instantanea = InstantaneaCarpeta(self.carpeta_raiz)
+            subcarpetas = sorted(entrada.nombre for entrada in instantanea.carpetas())
 
             respuestas_disponibles = {}
-            for nombre_respuesta in os.listdir(self.carpeta_respuestas):
-                if os.path.isfile(os.path.join(self.carpeta_respuestas, nombre_respuesta)):
-                    info_respuesta = self._extraer_info_archivo(nombre_respuesta)
-                    if info_respuesta and info_respuesta['tipo'] == 'RESPUESTA':
-                        respuestas_disponibles[info_respuesta['codigo']] = nombre_respuesta
+            for entrada in InstantaneaCarpeta(self.carpeta_respuestas).archivos():
+                # Una respuesta es cualquier archivo cuyo nombre empieza por el código de la factura.
+                codigo = clasificar_nombre(entrada.nombre).codigo_inicial
+                if codigo:
+                    respuestas_disponibles[codigo] = entrada.nombre
             
             total_carpetas = len(subcarpetas)
             for i, nombre_subcarpeta in enumerate(subcarpetas):
@@ -46,17 +50,16 @@ class OrganizadorRespuestasAdresWorker(QObject):
                 porcentaje = (i + 1) / total_carpetas * 100
                 self.progreso_actualizado.emit(f"Procesando carpeta {nombre_subcarpeta}...", porcentaje)
 
-                factura_info = None
+                codigo_factura = None
                 respuesta_existente = False
-                for item in os.listdir(ruta_subcarpeta):
-                    info_item = self._extraer_info_archivo(item)
-                    if info_item:
-                        if info_item['tipo'] == 'FACTURA':
-                            factura_info = info_item
-                        elif info_item['tipo'] == 'RESPUESTA':
-                            respuesta_existente = True
+                for entrada in instantanea.contenido(nombre_subcarpeta):
+                    clasificacion = clasificar_nombre(entrada.nombre)
+                    if clasificacion.codigo_ancla:
+                        codigo_factura = clasificacion.codigo_ancla
+                    elif clasificacion.codigo_inicial:
+                        respuesta_existente = True
                 
-                if not factura_info:
+                if not codigo_factura:
                     resultados['fallidos'].append({'carpeta': nombre_subcarpeta, 'razon': 'No se encontró archivo de Factura con formato válido.'})
                     continue
 
@@ -64,7 +67,6 @@ class OrganizadorRespuestasAdresWorker(QObject):
                     resultados['ya_tenian_respuesta'].append({'carpeta': nombre_subcarpeta})
                     continue
                 
-                codigo_factura = factura_info['codigo']
                 if codigo_factura in respuestas_disponibles:
                     nombre_respuesta_encontrada = respuestas_disponibles[codigo_factura]
                     origen_path = os.path.join(self.carpeta_respuestas, nombre_respuesta_encontrada)
@@ -95,26 +97,10 @@ class OrganizadorRespuestasAdresWorker(QObject):
     def cancelar(self):
         self.esta_cancelado = True
 
-    def _extraer_info_archivo(self, nombre_archivo):
-        match_factura = re.match(r'^\d{4,}_([A-Z]+)(\d+)_FACTURA', nombre_archivo, re.IGNORECASE)
-        if match_factura:
-            serie = match_factura.group(1).upper()
-            numero = match_factura.group(2)
-            return {"tipo": "FACTURA", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}"}
-
-        base_nombre, _ = os.path.splitext(nombre_archivo)
-        match_respuesta = re.match(r'^(COEX|FECR|FERD|FERR)([0-9]+)', base_nombre, re.IGNORECASE)
-        if match_respuesta:
-            serie = match_respuesta.group(1).upper()
-            numero = match_respuesta.group(2)
-            return {"tipo": "RESPUESTA", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}"}
-
-        return None
-
     def _limpiar_nombre_respuesta(self, nombre):
-        info = self._extraer_info_archivo(nombre)
-        if info and info['tipo'] == 'RESPUESTA':
-            return f"{info['serie']}{info['numero']}.pdf"
+        clasificacion = clasificar_nombre(nombre)
+        if clasificacion.codigo_inicial:
+            return f"{clasificacion.serie_inicial}{clasificacion.numero_inicial}.pdf"
         
         nuevo_nombre = nombre.replace(" ", "")
         nuevo_nombre = re.sub(r'\.{2,}', '.', nuevo_nombre)
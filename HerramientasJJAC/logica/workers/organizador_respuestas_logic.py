@@ -1,9 +1,11 @@
 # logica/logica_organizar_pdfs.py
 import os
 import shutil
-import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+from logica.core.identificador_archivos import clasificar_nombre
+
 class OrganizadorRespuestasWorker(QObject):
     """
     Clase que ejecuta la lógica de negocio para organizar PDFs en un hilo de trabajo.
@@ -27,15 +29,13 @@ class OrganizadorRespuestasWorker(QObject):
         try:
             # 1. Obtener todas las respuestas disponibles
             respuestas_disponibles = []
-            for filename in os.listdir(self.carpeta_respuestas):
-                filepath = os.path.join(self.carpeta_respuestas, filename)
-                if os.path.isfile(filepath):
-                    info = self._extraer_info_respuesta(filename)
-                    if info:
-                        respuestas_disponibles.append({'nombre': filename, **info})
+            for entrada in InstantaneaCarpeta(self.carpeta_respuestas).archivos():
+                info = self._extraer_info_respuesta(entrada.nombre)
+                if info:
+                    respuestas_disponibles.append({'nombre': entrada.nombre, **info})
 
             # 2. Obtener todas las subcarpetas de la carpeta raíz
-            subcarpetas_raiz = [d for d in os.listdir(self.carpeta_raiz) if os.path.isdir(os.path.join(self.carpeta_raiz, d))]
+            subcarpetas_raiz = [entrada.nombre for entrada in InstantaneaCarpeta(self.carpeta_raiz).carpetas()]
 
             # 3. Procesar cada respuesta
             total_respuestas = len(respuestas_disponibles)
@@ -109,10 +109,7 @@ class OrganizadorRespuestasWorker(QObject):
         Extrae la información únicamente de un archivo de respuesta simple.
         Ej: 'FERD158.PDF' -> {'serie': 'FERD', 'numero': '158'}
         """
-        base_nombre, _ = os.path.splitext(nombre_archivo)
-        match = re.match(r'^(COEX|FECR|FERD|FERR)([0-9]+)$', base_nombre, re.IGNORECASE)
-        if match:
-            serie = match.group(1).upper()
-            numero = match.group(2)
-            return {"serie": serie, "numero": numero}
+        clasificacion = clasificar_nombre(nombre_archivo)
+        if clasificacion.solo_codigo:
+            return {"serie": clasificacion.serie_inicial, "numero": clasificacion.numero_inicial}
         return None
@@ -1,9 +1,11 @@
 # logica/logica_organizar_xmls.py
 import os
 import shutil
-import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+from logica.core.identificador_archivos import clasificar_nombre, TIPO_XML
+
 class OrganizadorXMLWorker(QObject):
     """
     Clase que ejecuta la lógica de negocio para organizar XMLs en un hilo de trabajo.
@@ -28,14 +30,16 @@ class OrganizadorXMLWorker(QObject):
         }
 
         try:
-            subcarpetas = sorted([d for d in os.listdir(self.carpeta_raiz) if os.path.isdir(os.path.join(self.carpeta_raiz, d))])
+            instantanea = InstantaneaCarpeta(self.carpeta_raiz)
+            subcarpetas = sorted(entrada.nombre for entrada in instantanea.carpetas())
 
             xmls_disponibles = {}
-            for nombre_xml in os.listdir(self.carpeta_xmls):
+            for entrada in InstantaneaCarpeta(self.carpeta_xmls).archivos():
+                nombre_xml = entrada.nombre
                 if nombre_xml.lower().endswith('.xml'):
-                    info_xml = self._extraer_info_archivo(nombre_xml)
-                    if info_xml and info_xml['tipo'] == 'XML':
-                        xmls_disponibles[info_xml['codigo']] = info_xml
+                    clasificacion = clasificar_nombre(nombre_xml)
+                    if clasificacion.tipo == TIPO_XML:
+                        xmls_disponibles[clasificacion.codigo] = self._info_archivo(clasificacion, nombre_xml)
             
             total_carpetas = len(subcarpetas)
             for i, nombre_subcarpeta in enumerate(subcarpetas):
@@ -48,14 +52,15 @@ class OrganizadorXMLWorker(QObject):
 
                 factura_info = None
                 xml_existente = False
-                for item in os.listdir(ruta_subcarpeta):
-                    if os.path.isfile(os.path.join(ruta_subcarpeta, item)):
+                for entrada in instantanea.contenido(nombre_subcarpeta):
+                    if not entrada.es_carpeta:
+                        item = entrada.nombre
                         if item.lower().endswith('.xml'):
                             xml_existente = True
                         elif item.lower().endswith('.pdf'):
-                            info_item = self._extraer_info_archivo(item)
-                            if info_item and info_item['tipo'] == 'FACTURA':
-                                factura_info = info_item
+                            clasificacion = clasificar_nombre(item)
+                            if clasificacion.codigo_ancla:
+                                factura_info = {"codigo": clasificacion.codigo_ancla, "nombre_completo": item}
                 
                 if not factura_info:
                     resultados['fallidos'].append({'carpeta': nombre_subcarpeta, 'razon': 'No se encontró archivo de Factura con formato válido.'})
@@ -98,22 +103,6 @@ class OrganizadorXMLWorker(QObject):
     def cancelar(self):
         self.esta_cancelado = True
 
-    def _extraer_info_archivo(self, nombre_archivo):
-        base_nombre, extension = os.path.splitext(nombre_archivo)
-        extension = extension.lower()
-        
-        if extension == '.pdf':
-            match_factura = re.match(r'^\d{4,}_([A-Z]+)(\d+)_FACTURA', base_nombre, re.IGNORECASE)
-            if match_factura:
-                serie = match_factura.group(1).upper()
-                numero = match_factura.group(2)
-                return {"tipo": "FACTURA", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}", "nombre_completo": nombre_archivo}
-
-        elif extension == '.xml':
-            match_xml = re.search(r'(COEX|FECR|FERD|FERR)([0-9]+)', base_nombre, re.IGNORECASE)
-            if match_xml:
-                serie = match_xml.group(1).upper()
-                numero = match_xml.group(2)
-                return {"tipo": "XML", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}", "nombre_completo": nombre_archivo}
-
-        return None
+    def _info_archivo(self, clasificacion, nombre_archivo):
+        return {"tipo": clasificacion.tipo, "serie": clasificacion.serie, "numero": clasificacion.numero,
+                "codigo": clasificacion.codigo, "nombre_completo": nombre_archivo}
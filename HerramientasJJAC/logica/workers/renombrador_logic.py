@@ -39,7 +39,8 @@ class RenombradorWorker(QObject):
         Lógica específica para el renombrado de 'respuestas glosa' en modo glosa.
         """
         resultados = {'exitosos': [], 'fallidos': []}
-        subcarpetas = gestor_archivos.listar_subdirectorios(self.ruta_carpeta_raiz)
+        instantanea = gestor_archivos.InstantaneaCarpeta(self.ruta_carpeta_raiz)
+        subcarpetas = instantanea.carpetas()
 
         if not subcarpetas:
             resultados['fallidos'].append({"carpeta": "N/A", "razon": "No se encontraron subcarpetas."})
@@ -47,18 +48,19 @@ class RenombradorWorker(QObject):
             return
 
         total_carpetas = len(subcarpetas)
-        for i, ruta_carpeta in enumerate(subcarpetas):
+        for i, subcarpeta in enumerate(subcarpetas):
             if self.esta_cancelado:
                 resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado."})
                 break
             
-            nombre_carpeta = os.path.basename(ruta_carpeta)
+            ruta_carpeta = subcarpeta.ruta
+            nombre_carpeta = subcarpeta.nombre
             porcentaje = (i + 1) / total_carpetas * 100
             self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
             self.barra_progreso_actualizada.emit(porcentaje)
 
             try:
-                archivos_pdf = gestor_archivos.obtener_archivos_pdf(ruta_carpeta)
+                archivos_pdf = instantanea.archivos_pdf(nombre_carpeta)
                 if not archivos_pdf:
                     continue
 
@@ -92,7 +94,8 @@ class RenombradorWorker(QObject):
         Lógica específica para el renombrado de 'cartas glosa' en modo devolución.
         """
         resultados = {'exitosos': [], 'fallidos': []}
-        subcarpetas = gestor_archivos.listar_subdirectorios(self.ruta_carpeta_raiz)
+        instantanea = gestor_archivos.InstantaneaCarpeta(self.ruta_carpeta_raiz)
+        subcarpetas = instantanea.carpetas()
 
         if not subcarpetas:
             resultados['fallidos'].append({"carpeta": "N/A", "razon": "No se encontraron subcarpetas."})
@@ -100,18 +103,19 @@ class RenombradorWorker(QObject):
             return
 
         total_carpetas = len(subcarpetas)
-        for i, ruta_carpeta in enumerate(subcarpetas):
+        for i, subcarpeta in enumerate(subcarpetas):
             if self.esta_cancelado:
                 resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado."})
                 break
             
-            nombre_carpeta = os.path.basename(ruta_carpeta)
+            ruta_carpeta = subcarpeta.ruta
+            nombre_carpeta = subcarpeta.nombre
             porcentaje = (i + 1) / total_carpetas * 100
             self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
             self.barra_progreso_actualizada.emit(porcentaje)
 
             try:
-                archivos_pdf = gestor_archivos.obtener_archivos_pdf(ruta_carpeta)
+                archivos_pdf = instantanea.archivos_pdf(nombre_carpeta)
                 if not archivos_pdf:
                     continue
 
@@ -147,7 +151,8 @@ class RenombradorWorker(QObject):
         Lógica para revertir nombres de archivo que terminan en _PRG_1.
         """
         resultados = {'exitosos': [], 'fallidos': []}
-        subcarpetas = gestor_archivos.listar_subdirectorios(self.ruta_carpeta_raiz)
+        instantanea = gestor_archivos.InstantaneaCarpeta(self.ruta_carpeta_raiz)
+        subcarpetas = instantanea.carpetas()
 
         if not subcarpetas:
             resultados['fallidos'].append({"carpeta": "N/A", "razon": "No se encontraron subcarpetas."})
@@ -155,19 +160,20 @@ class RenombradorWorker(QObject):
             return
 
         total_carpetas = len(subcarpetas)
-        for i, ruta_carpeta in enumerate(subcarpetas):
+        for i, subcarpeta in enumerate(subcarpetas):
             if self.esta_cancelado:
                 resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado."})
                 break
             
-            nombre_carpeta = os.path.basename(ruta_carpeta)
+            ruta_carpeta = subcarpeta.ruta
+            nombre_carpeta = subcarpeta.nombre
             porcentaje = (i + 1) / total_carpetas * 100
             self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
             self.barra_progreso_actualizada.emit(porcentaje)
 
             try:
-                archivos = os.listdir(ruta_carpeta)
-                for nombre_archivo in archivos:
+                for entrada in instantanea.contenido(nombre_carpeta):
+                    nombre_archivo = entrada.nombre
                     if '_PRG_1' in nombre_archivo:
                         ruta_original = os.path.join(ruta_carpeta, nombre_archivo)
                         nuevo_nombre = nombre_archivo.replace('_PRG_1', '')
@@ -188,7 +194,8 @@ class RenombradorWorker(QObject):
         Lógica específica para el renombrado de 'cartas glosa' en modo escolar.
         """
         resultados = {'exitosos': [], 'fallidos': []}
-        subcarpetas = gestor_archivos.listar_subdirectorios(self.ruta_carpeta_raiz)
+        instantanea = gestor_archivos.InstantaneaCarpeta(self.ruta_carpeta_raiz)
+        subcarpetas = instantanea.carpetas()
 
         if not subcarpetas:
             resultados['fallidos'].append({"carpeta": "N/A", "razon": "No se encontraron subcarpetas."})
@@ -196,18 +203,19 @@ class RenombradorWorker(QObject):
             return
 
         total_carpetas = len(subcarpetas)
-        for i, ruta_carpeta in enumerate(subcarpetas):
+        for i, subcarpeta in enumerate(subcarpetas):
             if self.esta_cancelado:
                 resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado."})
                 break
             
-            nombre_carpeta = os.path.basename(ruta_carpeta)
+            ruta_carpeta = subcarpeta.ruta
+            nombre_carpeta = subcarpeta.nombre
             porcentaje = (i + 1) / total_carpetas * 100
             self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
             self.barra_progreso_actualizada.emit(porcentaje)
 
             try:
-                archivos_pdf = gestor_archivos.obtener_archivos_pdf(ruta_carpeta)
+                archivos_pdf = instantanea.archivos_pdf(nombre_carpeta)
                 if not archivos_pdf:
                     continue
 
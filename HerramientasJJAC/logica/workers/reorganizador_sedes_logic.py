@@ -4,6 +4,8 @@ import shutil
 import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+
 class ReorganizadorSedesWorker(QObject):
     progreso_actualizado = Signal(str, float)
     proceso_finalizado = Signal(dict)
@@ -29,10 +31,8 @@ class ReorganizadorSedesWorker(QObject):
             todas_las_subcarpetas = []
             for sede_nombre, sede_path in [("sede 1", ruta_sede1), ("sede 2", ruta_sede2)]:
                 if not os.path.isdir(sede_path): continue
-                for sub_nombre in os.listdir(sede_path):
-                    sub_path = os.path.join(sede_path, sub_nombre)
-                    if os.path.isdir(sub_path):
-                        todas_las_subcarpetas.append({'nombre': sub_nombre, 'path': sub_path, 'sede_actual': sede_nombre})
+                for entrada in InstantaneaCarpeta(sede_path).carpetas():
+                    todas_las_subcarpetas.append({'nombre': entrada.nombre, 'path': entrada.ruta, 'sede_actual': sede_nombre})
             
             total_carpetas = len(todas_las_subcarpetas)
             for i, subcarpeta_info in enumerate(todas_las_subcarpetas):
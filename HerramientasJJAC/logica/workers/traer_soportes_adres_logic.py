@@ -1,9 +1,11 @@
 # logica/logica_traer_soportes.py
 import os
 import shutil
-import re
 from PySide6.QtCore import QObject, Signal
 
+from logica.core.gestor_archivos import InstantaneaCarpeta
+from logica.core.identificador_archivos import clasificar_nombre
+
 class TraerSoportesAdresWorker(QObject):
     """
     Clase que ejecuta la lógica de negocio para traer soportes en un hilo de trabajo.
@@ -27,17 +29,17 @@ class TraerSoportesAdresWorker(QObject):
         }
 
         try:
-            subcarpetas = sorted([d for d in os.listdir(self.carpeta_raiz) if os.path.isdir(os.path.join(self.carpeta_raiz, d))])
+            instantanea = InstantaneaCarpeta(self.carpeta_raiz)
+            subcarpetas = sorted(entrada.nombre for entrada in instantanea.carpetas())
 
             soportes_disponibles = {}
-            for nombre_soporte in os.listdir(self.carpeta_soportes_origen):
-                if os.path.isfile(os.path.join(self.carpeta_soportes_origen, nombre_soporte)):
-                    info_soporte = self._extraer_info_archivo(nombre_soporte)
-                    if info_soporte and info_soporte['tipo'] == 'SOPORTE':
-                        codigo = info_soporte['codigo']
-                        if codigo not in soportes_disponibles:
-                            soportes_disponibles[codigo] = []
-                        soportes_disponibles[codigo].append(nombre_soporte)
+            for entrada in InstantaneaCarpeta(self.carpeta_soportes_origen).archivos():
+                # Un soporte es cualquier archivo cuyo nombre empieza por el código de la factura.
+                codigo = clasificar_nombre(entrada.nombre).codigo_inicial
+                if codigo:
+                    if codigo not in soportes_disponibles:
+                        soportes_disponibles[codigo] = []
+                    soportes_disponibles[codigo].append(entrada.nombre)
             
             total_carpetas = len(subcarpetas)
             for i, nombre_subcarpeta in enumerate(subcarpetas):
@@ -49,12 +51,11 @@ class TraerSoportesAdresWorker(QObject):
                 self.progreso_actualizado.emit(f"Procesando carpeta {nombre_subcarpeta}...", porcentaje)
 
                 codigo_factura_ancla = None
-                for item in os.listdir(ruta_subcarpeta):
-                    if item.lower().endswith('.pdf'):
-                        info_factura = self._extraer_info_archivo(item)
-                        if info_factura and info_factura['tipo'] == 'FACTURA':
-                            codigo_factura_ancla = info_factura['codigo']
-                            break
+                for item in instantanea.archivos_pdf(nombre_subcarpeta):
+                    clasificacion = clasificar_nombre(item)
+                    if clasificacion.codigo_ancla:
+                        codigo_factura_ancla = clasificacion.codigo_ancla
+                        break
                 
                 if not codigo_factura_ancla:
                     resultados['fallidos'].append({'carpeta': nombre_subcarpeta, 'razon': 'No se encontró archivo de Factura con formato válido.'})
@@ -94,19 +95,3 @@ class TraerSoportesAdresWorker(QObject):
 
     def cancelar(self):
         self.esta_cancelado = True
-
-    def _extraer_info_archivo(self, nombre_archivo):
-        match_factura = re.match(r'^\d{4,}_([A-Z]+)(\d+)_FACTURA', nombre_archivo, re.IGNORECASE)
-        if match_factura:
-            serie = match_factura.group(1).upper()
-            numero = match_factura.group(2)
-            return {"tipo": "FACTURA", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}"}
-
-        base_nombre, _ = os.path.splitext(nombre_archivo)
-        match_soporte = re.match(r'^(COEX|FECR|FERD|FERR)([0-9]+)', base_nombre, re.IGNORECASE)
-        if match_soporte:
-            serie = match_soporte.group(1).upper()
-            numero = match_soporte.group(2)
-            return {"tipo": "SOPORTE", "serie": serie, "numero": numero, "codigo": f"{serie}_{numero}"}
-
-        return None
@@ -1,12 +1,64 @@
 # logica/logica_unir_soportes.py
 import os
 import re
+import sqlite3
+import contextlib
+import multiprocessing
+import multiprocessing.connection
+from concurrent import futures
 from PySide6.QtCore import QObject, Signal
 
 # Importamos los módulos de la nueva estructura
 from logica.core import gestor_archivos
 from logica.core import identificador_archivos
 from logica.core import procesador_pdf
+from logica.core import bitacora_ejecucion
+from logica.core import optimizador_salida
+from logica.core import marcador_fusion
+from logica.core import triaje_pdf
+from logica.core.cache_huellas import CacheHuellasPaginas
+from logica.core.sesion_documentos import SesionDocumentos
+from logica.core.memoria_proceso import MedidorPicoMemoria
+from logica.core.precarga_carpetas import PrecargaCarpetas, CARPETAS_ADELANTE_POR_DEFECTO
+from logica.core.proceso_aislado import ProcesoAislado
+
+# Opciones de ejecución del worker. 'procesos' = 1 conserva el recorrido secuencial;
+# con un valor mayor las carpetas se reparten en un pool de procesos. Con 'reanudar'
+# se omiten las carpetas que la bitácora da por resueltas y cuyos PDFs no han cambiado.
+# 'optimizar_salida' reescribe cada PDF unido deduplicando objetos y comprimiéndolos;
+# 'perfil_salida' reduce sus imágenes solo si supera el tamaño máximo indicado.
+OPCIONES_POR_DEFECTO = {
+    'procesos': 1,
+    'usar_cache_huellas': True,
+    'escritura_incremental': False,
+    'reanudar': False,
+    'motor_fusion': procesador_pdf.MOTOR_POR_DEFECTO,
+    'optimizar_salida': False,
+    'perfil_salida': optimizador_salida.PERFIL_SALIDA_POR_DEFECTO,
+    # Memoria máxima para unir una carpeta, en MB. 0 = sin límite (una sola escritura).
+    'memoria_maxima_mb': 0,
+    # Lectura anticipada de las carpetas siguientes (solo con 1 proceso), en MB. 0 = desactivada.
+    'precarga_mb': 0,
+    'precarga_carpetas': CARPETAS_ADELANTE_POR_DEFECTO,
+    # Tiempo máximo por carpeta, en segundos. Con un límite, cada carpeta se procesa en
+    # un proceso aparte que se termina si lo supera. 0 = sin límite.
+    'limite_tiempo_s': 0,
+    # Revisión previa de todos los PDFs; las carpetas con PDFs ilegibles o cifrados no se unen.
+    'triaje': False,
+    # Durante la revisión previa, intentar reparar con PyMuPDF los PDFs dañados.
+    'reparar_pdfs': False,
+    # No anexar las páginas de los soportes que ya están en el PDF unido.
+    'deduplicar_paginas': False,
+    # Tamaño máximo de cada parte al dividir el PDF unido, en MB. 0 = no dividir.
+    'dividir_mb': 0,
+    # Guardar el PDF unido (y sus partes) linealizado, para verlo en el navegador sin
+    # descargarlo completo. Requiere pikepdf.
+    'linealizar_salida': False,
+}
+
+# Cada cuánto (en segundos) se revisa la bandera de cancelación mientras se espera
+# el resultado de una carpeta en modo paralelo.
+INTERVALO_CANCELACION = 0.25
 
 class UnirSoportesWorker(QObject):
     """
@@ -17,11 +69,17 @@ class UnirSoportesWorker(QObject):
     proceso_finalizado = Signal(dict)
     barra_progreso_actualizada = Signal(float)
 
-    def __init__(self, ruta_carpeta_raiz, modo):
+    def __init__(self, ruta_carpeta_raiz, modo, opciones=None):
         super().__init__()
         self.ruta_carpeta_raiz = ruta_carpeta_raiz
         self.modo = modo
+        self.opciones = {**OPCIONES_POR_DEFECTO, **(opciones or {})}
+        self.opciones['perfil_salida'] = {
+            **optimizador_salida.PERFIL_SALIDA_POR_DEFECTO, **self.opciones['perfil_salida']
+        }
         self.esta_cancelado = False
+        self._cache_huellas = None
+        self._bitacora = None
         # Paleta de colores para logs HTML
         self.color_texto = "#ecf0f1"
         self.color_exito = "#2ecc71"
@@ -33,11 +91,52 @@ class UnirSoportesWorker(QObject):
         """
         Función principal que orquesta el proceso. Será llamada por el hilo.
         """
-        resultados = {'exitosos': [], 'fallidos': []}
+        resultados = {
+            'exitosos': [], 'fallidos': [], 'bytes_ahorrados': 0, 'paginas_omitidas': 0, 'memoria_por_carpeta': []
+        }
         
-        subcarpetas = gestor_archivos.listar_subdirectorios(self.ruta_carpeta_raiz)
-        subcarpetas.sort(key=lambda path: self._extraer_numero_de_cadena(os.path.basename(path)))
+        subcarpetas = self._listar_carpetas()
 
+        if not subcarpetas:
+            mensaje = "Error: No se encontraron subcarpetas para procesar."
+            resultados['fallidos'].append({"carpeta": "N/A", "razon": mensaje})
+            self.proceso_finalizado.emit(resultados)
+            return
+
+        self._bitacora = bitacora_ejecucion.BitacoraEjecucion.para_cuenta(self.ruta_carpeta_raiz)
+        if self.opciones['reanudar']:
+            subcarpetas = self._omitir_carpetas_resueltas(subcarpetas, resultados)
+            if not subcarpetas:
+                self.barra_progreso_actualizada.emit(100.0)
+                self.proceso_finalizado.emit(resultados)
+                return
+
+        if self.opciones['triaje']:
+            subcarpetas = self._triar_carpetas(subcarpetas, resultados)
+
+        try:
+            if self.opciones['limite_tiempo_s']:
+                self._procesar_con_limite_de_tiempo(subcarpetas, resultados)
+            elif self.opciones['procesos'] > 1:
+                self._procesar_en_paralelo(subcarpetas, resultados)
+            else:
+                self._procesar_en_secuencia(subcarpetas, resultados)
+        finally:
+            self._cerrar_cache()
+
+        self.proceso_finalizado.emit(resultados)
+
+    def planificar(self):
+        """
+        Modo plan: recorre las carpetas igual que 'ejecutar' pero sin modificar nada.
+        Informa qué carpetas fallarían, cuáles ya están unidas según su marcador y, para
+        las demás, cuántas páginas y bytes tendrá el PDF resultante. Los conteos de
+        páginas salen del /Count del árbol de páginas, sin analizar las páginas; no se
+        hace la verificación por contenido.
+        """
+        resultados = {'exitosos': [], 'fallidos': [], 'plan': {'carpetas_a_unir': 0, 'paginas': 0, 'bytes': 0}}
+
+        subcarpetas = self._listar_carpetas()
         if not subcarpetas:
             mensaje = "Error: No se encontraron subcarpetas para procesar."
             resultados['fallidos'].append({"carpeta": "N/A", "razon": mensaje})
@@ -49,66 +148,566 @@ class UnirSoportesWorker(QObject):
             if self.esta_cancelado:
                 resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado por el usuario."})
                 break
-            
+
             nombre_carpeta = os.path.basename(ruta_carpeta)
             porcentaje = (i + 1) / total_carpetas * 100
-            
             self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
             self.barra_progreso_actualizada.emit(porcentaje)
-            
-            self._procesar_carpeta(ruta_carpeta, nombre_carpeta, resultados)
+
+            try:
+                self._planificar_carpeta(ruta_carpeta, nombre_carpeta, resultados)
+            except Exception as e:
+                resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": f"Error inesperado: {e}"})
 
         self.proceso_finalizado.emit(resultados)
 
-    def _procesar_carpeta(self, ruta_carpeta, nombre_carpeta, resultados):
-        """Refactorizado para procesar una carpeta y devolver el resultado como HTML."""
+    def _planificar_carpeta(self, ruta_carpeta, nombre_carpeta, resultados):
+        preparacion, razon = self._preparar_carpeta(ruta_carpeta)
+        if razon:
+            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
+        if not preparacion:
+            return
+
+        if marcador_fusion.marcador_confirma_fusion(preparacion['destino'], preparacion['verificar']):
+            mensaje = "Plan: ya está unida según su marcador; no se modificará."
+            resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
+            return
+
+        rutas = preparacion['previas'] + [preparacion['destino']] + preparacion['fuentes']
+        paginas = 0
+        for ruta in rutas:
+            try:
+                paginas += procesador_pdf.contar_paginas_rapido(ruta)
+            except Exception as e:
+                razon = f"Plan: no se pudo leer '{os.path.basename(ruta)}', la unión fallaría: {e}"
+                resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
+                return
+        tamano = sum(os.path.getsize(ruta) for ruta in rutas)
+
+        plan = resultados['plan']
+        plan['carpetas_a_unir'] += 1
+        plan['paginas'] += paginas
+        plan['bytes'] += tamano
+        mensaje = (f"Plan: se unirán {len(rutas)} archivo(s) en '{os.path.basename(preparacion['destino'])}': "
+                   f"{paginas} página(s), unos {tamano / (1024 * 1024):.2f} MB antes de optimizar.")
+        resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
+
+    def _listar_carpetas(self):
+        subcarpetas = [entrada.ruta for entrada in gestor_archivos.InstantaneaCarpeta(self.ruta_carpeta_raiz).carpetas()]
+        subcarpetas.sort(key=lambda path: self._extraer_numero_de_cadena(os.path.basename(path)))
+        return subcarpetas
+
+    def _triar_carpetas(self, subcarpetas, resultados):
+        """
+        Revisa todos los PDFs de las carpetas antes de unir (ver logica.core.triaje_pdf),
+        deja el informe de cuarentena en la carpeta raíz y devuelve solo las carpetas
+        cuyos PDFs se pueden leer. Las demás se registran como fallidas.
+        """
+        def al_avanzar(revisados, total):
+            porcentaje = revisados / total * 100
+            self.progreso_actualizado.emit(f"Revisión previa: {revisados}/{total} PDFs", porcentaje)
+            self.barra_progreso_actualizada.emit(porcentaje)
+
+        por_carpeta = triaje_pdf.triar_carpetas(
+            subcarpetas, self.opciones['procesos'], self.opciones['reparar_pdfs'],
+            al_avanzar=al_avanzar, cancelado=lambda: self.esta_cancelado
+        )
+        try:
+            triaje_pdf.escribir_informe_cuarentena(self.ruta_carpeta_raiz, por_carpeta)
+        except OSError as e:
+            print(f"Advertencia: No se pudo guardar el informe de cuarentena: {e}")
+
+        resumen = {'revisados': 0, 'en_cuarentena': 0, 'reparados': 0}
+        sanas = []
+        for ruta_carpeta in subcarpetas:
+            informes = por_carpeta[ruta_carpeta]
+            en_cuarentena = [informe for informe in informes if informe['estado'] in triaje_pdf.ESTADOS_EN_CUARENTENA]
+            resumen['revisados'] += sum(informe['ruta'] != ruta_carpeta for informe in informes)
+            resumen['en_cuarentena'] += len(en_cuarentena)
+            resumen['reparados'] += sum(informe['estado'] == triaje_pdf.ESTADO_REPARADO for informe in informes)
+            if en_cuarentena:
+                detalle = "; ".join(f"'{os.path.basename(informe['ruta'])}': {informe['razon']}" for informe in en_cuarentena)
+                razon = f"En cuarentena, no se unió. {detalle}"
+                resultados['fallidos'].append({"carpeta": os.path.basename(ruta_carpeta), "razon": razon})
+            else:
+                sanas.append(ruta_carpeta)
+        resultados['triaje'] = resumen
+        return sanas
+
+    def _procesar_en_secuencia(self, subcarpetas, resultados):
+        """
+        Recorre las carpetas una a una en el hilo del worker. Con 'precarga_mb' activada,
+        los PDFs de las carpetas siguientes se leen en segundo plano mientras tanto.
+        """
+        if self.opciones['precarga_mb']:
+            precarga = PrecargaCarpetas(
+                subcarpetas, self.opciones['precarga_mb'] * 1024 * 1024, self.opciones['precarga_carpetas']
+            )
+        else:
+            precarga = None
+
+        total_carpetas = len(subcarpetas)
+        with precarga or contextlib.nullcontext():
+            for i, ruta_carpeta in enumerate(subcarpetas):
+                if self.esta_cancelado:
+                    resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado por el usuario."})
+                    break
+
+                nombre_carpeta = os.path.basename(ruta_carpeta)
+                porcentaje = (i + 1) / total_carpetas * 100
+
+                self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
+                self.barra_progreso_actualizada.emit(porcentaje)
+
+                precargados = precarga.tomar(ruta_carpeta) if precarga else None
+                parciales = self._procesar_carpeta(ruta_carpeta, nombre_carpeta, precargados)
+                self._registrar_en_bitacora(ruta_carpeta, parciales)
+                _combinar_resultados(resultados, parciales)
+
+    def _procesar_en_paralelo(self, subcarpetas, resultados):
+        """
+        Reparte las carpetas en un pool de procesos. Los resultados se recogen en el
+        mismo orden en que se enviaron, de modo que el progreso y el resumen final
+        se ven igual que en el modo secuencial.
+        """
+        total_carpetas = len(subcarpetas)
+        # 'spawn' evita heredar el estado de Qt del proceso padre (y es lo que usa Windows de todas formas).
+        contexto = multiprocessing.get_context("spawn")
+        ejecutor = futures.ProcessPoolExecutor(max_workers=self.opciones['procesos'], mp_context=contexto)
+        siguiente = 0
+        try:
+            tareas = [
+                ejecutor.submit(_procesar_carpeta_en_proceso, self.ruta_carpeta_raiz, self.modo, self.opciones, ruta_carpeta)
+                for ruta_carpeta in subcarpetas
+            ]
+
+            for i, (ruta_carpeta, tarea) in enumerate(zip(subcarpetas, tareas)):
+                while not self.esta_cancelado and not tarea.done():
+                    futures.wait([tarea], timeout=INTERVALO_CANCELACION)
+
+                if self.esta_cancelado:
+                    break
+
+                nombre_carpeta = os.path.basename(ruta_carpeta)
+                porcentaje = (i + 1) / total_carpetas * 100
+
+                self.progreso_actualizado.emit(nombre_carpeta, porcentaje)
+                self.barra_progreso_actualizada.emit(porcentaje)
+
+                try:
+                    parciales = tarea.result()
+                except Exception as e:
+                    parciales = {'exitosos': [], 'fallidos': [{"carpeta": nombre_carpeta, "razon": f"Error inesperado en el proceso de trabajo: {e}"}]}
+                self._registrar_en_bitacora(ruta_carpeta, parciales)
+                _combinar_resultados(resultados, parciales)
+                siguiente = i + 1
+        finally:
+            # Las carpetas pendientes se descartan de inmediato; solo se espera a las que
+            # ya están escribiendo para no dejar un PDF a medio guardar.
+            ejecutor.shutdown(wait=True, cancel_futures=True)
+
+        if siguiente < total_carpetas:
+            resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado por el usuario."})
+            # Las carpetas que terminaron fuera de orden, o mientras se esperaba a las que
+            # estaban en curso, ya escribieron su PDF: también cuentan.
+            for ruta_carpeta, tarea in zip(subcarpetas[siguiente:], tareas[siguiente:]):
+                if tarea.done() and not tarea.cancelled() and tarea.exception() is None:
+                    self._registrar_en_bitacora(ruta_carpeta, tarea.result())
+                    _combinar_resultados(resultados, tarea.result())
+
+    def _procesar_con_limite_de_tiempo(self, subcarpetas, resultados):
+        """
+        Procesa las carpetas en 'procesos' procesos aislados (ver ProcesoAislado). Si una
+        carpeta supera 'limite_tiempo_s', su proceso se termina, la carpeta se registra
+        como fallida, se deshace lo que hubiera quedado a medio escribir y se continúa
+        con las demás. Los resultados se agregan en el orden de las carpetas.
+        """
+        limite = self.opciones['limite_tiempo_s']
+        total_carpetas = len(subcarpetas)
+        contexto = multiprocessing.get_context("spawn")
+        trabajadores = [
+            ProcesoAislado(_procesar_carpeta_en_proceso, contexto)
+            for _ in range(max(1, min(self.opciones['procesos'], total_carpetas)))
+        ]
+        pendientes = list(enumerate(subcarpetas))
+        terminados = {}
+        siguiente = 0
+        try:
+            while siguiente < total_carpetas:
+                if self.esta_cancelado and pendientes:
+                    # Las carpetas en curso terminan (o agotan su tiempo); no se envían más.
+                    pendientes = []
+                for trabajador in trabajadores:
+                    if pendientes and not trabajador.ocupado:
+                        indice, ruta_carpeta = pendientes.pop(0)
+                        trabajador.enviar(
+                            (indice, ruta_carpeta), self.ruta_carpeta_raiz, self.modo, self.opciones, ruta_carpeta
+                        )
+
+                ocupados = [trabajador for trabajador in trabajadores if trabajador.ocupado]
+                if not ocupados:
+                    break
+                espera = min(INTERVALO_CANCELACION, *(limite - t.transcurrido() for t in ocupados))
+                listos = multiprocessing.connection.wait([t.conexion for t in ocupados], timeout=max(espera, 0))
+
+                for trabajador in ocupados:
+                    indice, ruta_carpeta = trabajador.encargo
+                    nombre_carpeta = os.path.basename(ruta_carpeta)
+                    if trabajador.conexion in listos:
+                        try:
+                            parciales = trabajador.recibir()
+                        except RuntimeError as e:
+                            parciales = {'exitosos': [], 'fallidos': [
+                                {"carpeta": nombre_carpeta, "razon": f"Error inesperado en el proceso de trabajo: {e}"}
+                            ]}
+                    elif trabajador.transcurrido() >= limite:
+                        trabajador.matar()
+                        parciales = {'exitosos': [], 'fallidos': [
+                            {"carpeta": nombre_carpeta, "razon": f"Tiempo agotado: la carpeta superó el límite de {limite} s."}
+                        ]}
+                        try:
+                            bitacora_ejecucion.reparar_escritura_interrumpida(ruta_carpeta)
+                        except OSError as e:
+                            print(f"Advertencia: No se pudo deshacer la unión interrumpida de '{nombre_carpeta}': {e}")
+                    else:
+                        continue
+                    terminados[indice] = parciales
+
+                while siguiente in terminados:
+                    ruta_carpeta = subcarpetas[siguiente]
+                    parciales = terminados.pop(siguiente)
+                    siguiente += 1
+                    self.progreso_actualizado.emit(os.path.basename(ruta_carpeta), siguiente / total_carpetas * 100)
+                    self.barra_progreso_actualizada.emit(siguiente / total_carpetas * 100)
+                    self._registrar_en_bitacora(ruta_carpeta, parciales)
+                    _combinar_resultados(resultados, parciales)
+
+            if siguiente < total_carpetas:
+                resultados['fallidos'].append({"carpeta": "N/A", "razon": "Proceso cancelado por el usuario."})
+                # Las carpetas que terminaron fuera de orden antes de la cancelación también cuentan.
+                for indice in sorted(terminados):
+                    self._registrar_en_bitacora(subcarpetas[indice], terminados[indice])
+                    _combinar_resultados(resultados, terminados[indice])
+        finally:
+            for trabajador in trabajadores:
+                trabajador.cerrar()
+
+    def _procesar_carpeta(self, ruta_carpeta, nombre_carpeta, precargados=None):
+        """
+        Procesa una carpeta y devuelve sus resultados parciales, incluido su pico de memoria.
+        'precargados' son sus PDFs ya leídos por PrecargaCarpetas, si los hay.
+        """
+        resultados = {
+            'exitosos': [], 'fallidos': [], 'bytes_ahorrados': 0, 'paginas_omitidas': 0, 'memoria_por_carpeta': []
+        }
+        reparacion = None
+        # Cada PDF de la carpeta se lee y analiza una sola vez para verificar y unir.
+        sesion = SesionDocumentos(precargados)
+        with MedidorPicoMemoria() as medidor:
+            try:
+                # Una unión interrumpida en una ejecución anterior se deshace antes de volver a verificar.
+                reparacion = bitacora_ejecucion.reparar_escritura_interrumpida(ruta_carpeta)
+                if self.modo == "ADRES":
+                    self._procesar_carpeta_adres(ruta_carpeta, nombre_carpeta, resultados, sesion)
+                else:  # "Aseguradoras"
+                    self._procesar_carpeta_aseguradoras(ruta_carpeta, nombre_carpeta, resultados, sesion)
+            except Exception as e:
+                resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": f"Error inesperado: {e}"})
+            finally:
+                sesion.cerrar()
+                if self._cache_huellas is not None:
+                    self._cache_huellas.registrar_usos()
+
+        if medidor.pico is not None:
+            resultados['memoria_por_carpeta'].append({"carpeta": nombre_carpeta, "pico_bytes": medidor.pico})
+
+        if reparacion:
+            for entrada in resultados['exitosos'] + resultados['fallidos']:
+                entrada['razon'] = f"{reparacion} {entrada['razon']}"
+        return resultados
+
+    def _omitir_carpetas_resueltas(self, subcarpetas, resultados):
+        """
+        Devuelve las carpetas que aún hay que procesar. Las que la bitácora registra como
+        resueltas en este modo, con los mismos PDFs (tamaño y fecha), se dan por exitosas.
+        """
+        try:
+            registradas = self._bitacora.cargar()
+        except OSError as e:
+            print(f"Advertencia: No se pudo leer la bitácora: {e}. Se procesarán todas las carpetas.")
+            return subcarpetas
+
+        pendientes = []
+        for ruta_carpeta in subcarpetas:
+            nombre_carpeta = os.path.basename(ruta_carpeta)
+            entrada = registradas.get(nombre_carpeta)
+            try:
+                sin_cambios = (
+                    entrada is not None
+                    and entrada['modo'] == self.modo
+                    and entrada['resultado'] != 'fallido'
+                    and entrada['firmas'] == bitacora_ejecucion.firmas_carpeta(ruta_carpeta)
+                )
+            except OSError:
+                sin_cambios = False
+
+            if sin_cambios:
+                mensaje = "Reanudación: la carpeta ya se había procesado y sus archivos no cambiaron."
+                resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
+            else:
+                pendientes.append(ruta_carpeta)
+        return pendientes
+
+    def _registrar_en_bitacora(self, ruta_carpeta, parciales):
+        """Anexa a la bitácora el resultado de una carpeta ya terminada."""
+        if parciales['fallidos']:
+            resultado, razon = 'fallido', parciales['fallidos'][-1]['razon']
+        elif parciales['exitosos']:
+            resultado, razon = 'exitoso', parciales['exitosos'][-1]['razon']
+        else:
+            resultado, razon = 'sin_pdfs', ""
         try:
-            if self.modo == "ADRES":
-                self._procesar_carpeta_adres(ruta_carpeta, nombre_carpeta, resultados)
-            else:  # "Aseguradoras"
-                self._procesar_carpeta_aseguradoras(ruta_carpeta, nombre_carpeta, resultados)
+            self._bitacora.registrar(
+                os.path.basename(ruta_carpeta), self.modo, resultado, razon,
+                bitacora_ejecucion.firmas_carpeta(ruta_carpeta)
+            )
+        except OSError as e:
+            print(f"Advertencia: No se pudo escribir en la bitácora: {e}")
+
+    def _fusionar(self, ruta_carpeta, resultados, **kwargs):
+        """
+        Llama a procesador_pdf.fusionar_pdfs_en_destino dejando un marcador en la carpeta
+        mientras dura la escritura, para poder detectarla si el programa se interrumpe.
+        Después aplica la optimización y el perfil de salida que estén activados, suma los
+        bytes ahorrados a 'resultados' y devuelve un texto para el mensaje de la carpeta.
+
+        Con una memoria máxima configurada se une por tramos incrementales (ver
+        procesador_pdf.fusionar_pdfs_por_tramos). Las páginas repetidas omitidas se suman
+        a 'resultados'. Con 'dividir_mb', el PDF unido (que se conserva) se copia además
+        en partes de ese tamaño máximo. La linealización va al final, sobre el PDF unido
+        y sus partes, porque cualquier reescritura posterior la perdería.
+        """
+        ruta_destino = kwargs['ruta_pdf_destino']
+        nota = ""
+        memoria_maxima_mb = self.opciones['memoria_maxima_mb']
+        if memoria_maxima_mb:
+            # Todos los tramos se marcan juntos para poder deshacer la unión completa.
+            bitacora_ejecucion.marcar_escritura_en_curso(ruta_carpeta, ruta_destino, True)
+            try:
+                tramos, omitidas = procesador_pdf.fusionar_pdfs_por_tramos(
+                    memoria_maxima=memoria_maxima_mb * 1024 * 1024, deduplicar=self.opciones['deduplicar_paginas'],
+                    **kwargs
+                )
+            except BaseException:
+                # Los tramos ya escritos se retiran y el destino queda como estaba.
+                bitacora_ejecucion.reparar_escritura_interrumpida(ruta_carpeta)
+                raise
+            bitacora_ejecucion.desmarcar_escritura_en_curso(ruta_carpeta)
+            if tramos > 1:
+                nota = f" Unido en {tramos} tramos para no superar {memoria_maxima_mb} MB de memoria."
+        else:
+            bitacora_ejecucion.marcar_escritura_en_curso(
+                ruta_carpeta, ruta_destino, self.opciones['escritura_incremental']
+            )
+            try:
+                omitidas = procesador_pdf.fusionar_pdfs_en_destino(
+                    incremental=self.opciones['escritura_incremental'],
+                    motor=self.opciones['motor_fusion'],
+                    deduplicar=self.opciones['deduplicar_paginas'],
+                    **kwargs
+                )
+            finally:
+                # Si la escritura falló, fusionar_pdfs_en_destino ya dejó el destino como estaba.
+                bitacora_ejecucion.desmarcar_escritura_en_curso(ruta_carpeta)
+
+        resultados['paginas_omitidas'] += omitidas
+        if omitidas:
+            nota += f" Se omitieron {omitidas} página(s) repetida(s)."
+
+        perfil = self.opciones['perfil_salida']
+        if self.opciones['optimizar_salida'] or perfil['limite_mb']:
+            nota += self._optimizar_salida(ruta_carpeta, ruta_destino, resultados, kwargs.get('cache'))
+        partes = []
+        if self.opciones['dividir_mb']:
+            partes, nota_division = self._dividir_salida(ruta_destino)
+            nota += nota_division
+        if self.opciones['linealizar_salida']:
+            nota += self._linealizar_salida(ruta_carpeta, [ruta_destino] + partes, kwargs.get('cache'))
+        return nota
+
+    def _optimizar_salida(self, ruta_carpeta, ruta_destino, resultados, cache):
+        """Aplica la optimización y el perfil de salida activados al PDF unido."""
+        perfil = self.opciones['perfil_salida']
+        nota = ""
+        ahorro = 0
+        # Estos pasos reemplazan el archivo completo, así que se marcan como escritura no incremental.
+        bitacora_ejecucion.marcar_escritura_en_curso(ruta_carpeta, ruta_destino, False)
+        try:
+            if self.opciones['optimizar_salida']:
+                ahorro += optimizador_salida.optimizar_pdf(ruta_destino, cache=cache)
+            if perfil['limite_mb']:
+                reducido, cabe = optimizador_salida.ajustar_a_limite(
+                    ruta_destino, perfil['limite_mb'] * 1024 * 1024,
+                    dpi=perfil['dpi'], calidad_jpeg=perfil['calidad_jpeg'], cache=cache
+                )
+                ahorro += reducido
+                if not cabe:
+                    nota += f" Atención: el PDF sigue superando el límite de {perfil['limite_mb']} MB."
+        except Exception as e:
+            print(f"Advertencia: No se pudo optimizar '{os.path.basename(ruta_destino)}': {e}. Se conserva sin optimizar.")
+        finally:
+            bitacora_ejecucion.desmarcar_escritura_en_curso(ruta_carpeta)
+
+        resultados['bytes_ahorrados'] += ahorro
+        # Un ahorro de menos de medio KB no se informa (se vería como "0 KB menos").
+        ahorrado = optimizador_salida.describir_tamano(ahorro)
+        if ahorrado:
+            nota += f" Optimización: {ahorrado} menos."
+        return nota
+
+    def _dividir_salida(self, ruta_destino):
+        """Divide el PDF unido en partes de 'dividir_mb' como máximo. Devuelve (partes, nota)."""
+        dividir_mb = self.opciones['dividir_mb']
+        try:
+            partes, excedidas = optimizador_salida.dividir_pdf(ruta_destino, dividir_mb * 1024 * 1024)
         except Exception as e:
-            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": f"Error inesperado: {e}"})
+            print(f"Advertencia: No se pudo dividir '{os.path.basename(ruta_destino)}': {e}.")
+            return [], " Atención: no se pudo dividir el PDF en partes."
+        if not partes:
+            return [], ""
+        nota = f" Dividido en {len(partes)} partes de hasta {dividir_mb} MB."
+        if excedidas:
+            nota += f" Atención: {excedidas} parte(s) superan el límite (una sola página ya lo supera)."
+        return partes, nota
+
+    def _linealizar_salida(self, ruta_carpeta, rutas_pdf, cache):
+        """Linealiza el PDF unido y sus partes (ver optimizador_salida.linealizar_pdf)."""
+        bitacora_ejecucion.marcar_escritura_en_curso(ruta_carpeta, rutas_pdf[0], False)
+        try:
+            for ruta_pdf in rutas_pdf:
+                optimizador_salida.linealizar_pdf(ruta_pdf, cache=cache)
+        except Exception as e:
+            print(f"Advertencia: No se pudo linealizar '{os.path.basename(ruta_pdf)}': {e}.")
+            return " Atención: no se pudo linealizar el PDF."
+        finally:
+            bitacora_ejecucion.desmarcar_escritura_en_curso(ruta_carpeta)
+        return " Linealizado para vista web."
 
     def cancelar(self):
         self.esta_cancelado = True
 
+    def _obtener_cache(self):
+        """Abre la caché de huellas de la cuenta la primera vez que se necesita."""
+        if not self.opciones['usar_cache_huellas']:
+            return None
+        if self._cache_huellas is None:
+            try:
+                self._cache_huellas = CacheHuellasPaginas.para_cuenta(self.ruta_carpeta_raiz)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Advertencia: No se pudo abrir la caché de huellas: {e}. Se continuará sin caché.")
+                self.opciones['usar_cache_huellas'] = False
+        return self._cache_huellas
+
+    def _cerrar_cache(self):
+        if self._cache_huellas is not None:
+            self._cache_huellas.cerrar()
+            self._cache_huellas = None
+
     def _extraer_numero_de_cadena(self, s):
         """Extrae el primer número de una cadena. Usado para ordenar carpetas."""
         match = re.search(r'\d+', s)
         return int(match.group()) if match else 99999999
 
-    def _procesar_carpeta_aseguradoras(self, ruta_carpeta, nombre_carpeta, resultados):
-        """Procesa una única carpeta para el modo Aseguradoras."""
+    def _preparar_carpeta(self, ruta_carpeta):
+        """
+        Clasifica los PDFs de la carpeta según el modo y decide qué se unirá, sin abrir
+        ningún PDF. Devuelve (preparacion, razon_fallo). 'preparacion' es None si la
+        carpeta no tiene PDFs o no se puede procesar; en ese caso 'razon_fallo' explica
+        por qué (o es None si simplemente no hay nada que hacer).
+        """
         archivos_pdf = gestor_archivos.obtener_archivos_pdf(ruta_carpeta)
         if not archivos_pdf:
-            return
+            return None, None
+        if self.modo == "ADRES":
+            return self._preparar_carpeta_adres(archivos_pdf, ruta_carpeta)
+        return self._preparar_carpeta_aseguradoras(archivos_pdf, ruta_carpeta)
 
-        documentos = identificador_archivos.identificar_documentos_aseguradoras(archivos_pdf, ruta_carpeta)
+    def _preparar_carpeta_aseguradoras(self, archivos_pdf, ruta_carpeta):
+        """Modo Aseguradoras: la Carta Glosa y los soportes se anexan a la Respuesta Glosa."""
+        documentos = _identificar_sin_partes(
+            identificador_archivos.identificar_documentos_aseguradoras, archivos_pdf, ruta_carpeta, 'respuesta_glosa'
+        )
         
         carta_glosa = documentos['carta_glosa']
         respuesta_glosa = documentos['respuesta_glosa']
         soportes = documentos['soportes']
 
         if not carta_glosa:
-            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": "No se encontró la Carta Glosa."})
-            return
+            return None, "No se encontró la Carta Glosa."
 
         if not respuesta_glosa:
-            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": "No se encontró la Respuesta Glosa."})
-            return
+            return None, "No se encontró la Respuesta Glosa."
             
         if respuesta_glosa['type'] == 'VERIFICABLE':
             if (carta_glosa['serie'] != respuesta_glosa['serie'] or
                 carta_glosa['numero'] != respuesta_glosa['numero']):
                 razon = f"Discrepancia Serie/Número. Carta: {carta_glosa['serie']}-{carta_glosa['numero']}, Respuesta: {respuesta_glosa['serie']}-{respuesta_glosa['numero']}"
-                resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
-                return
-                
+                return None, razon
+
+        archivos_a_fusionar = [carta_glosa['path']] + soportes
+        archivos_a_fusionar.sort()
+        return {
+            'destino': respuesta_glosa['path'],
+            'verificar': carta_glosa['path'],
+            'previas': [],
+            'fuentes': archivos_a_fusionar,
+            'soportes': len(soportes),
+        }, None
+
+    def _preparar_carpeta_adres(self, archivos_pdf, ruta_carpeta):
+        """Modo ADRES: la Respuesta Glosa va antes de la Epicrisis y los soportes después."""
+        documentos = _identificar_sin_partes(
+            identificador_archivos.identificar_documentos_adres, archivos_pdf, ruta_carpeta, 'epicrisis'
+        )
+        
+        epicrisis = documentos['epicrisis']
+        respuesta_glosa = documentos['respuesta_glosa']
+        soportes = documentos['soportes']
+
+        if not epicrisis:
+            return None, "Modo ADRES: No se encontró el archivo de Epicrisis."
+
+        if not respuesta_glosa:
+            return None, "Modo ADRES: No se encontró el archivo de Respuesta Glosa."
+
+        soportes.sort()
+        return {
+            'destino': epicrisis['path'],
+            'verificar': respuesta_glosa['path'],
+            'previas': [respuesta_glosa['path']],
+            'fuentes': soportes,
+            'soportes': len(soportes),
+        }, None
+
+    def _procesar_carpeta_aseguradoras(self, ruta_carpeta, nombre_carpeta, resultados, sesion):
+        """Procesa una única carpeta para el modo Aseguradoras."""
+        preparacion, razon = self._preparar_carpeta(ruta_carpeta)
+        if razon:
+            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
+        if not preparacion:
+            return
+
+        if marcador_fusion.marcador_confirma_fusion(preparacion['destino'], preparacion['verificar'], sesion):
+            mensaje = "Marcador de unión vigente. La Carta Glosa ya está unida."
+            resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
+            return
+
         try:
             ya_procesado = procesador_pdf.verificar_fusion_por_contenido(
-                ruta_pdf_destino=respuesta_glosa['path'],
-                ruta_pdf_fuente=carta_glosa['path']
+                ruta_pdf_destino=preparacion['destino'],
+                ruta_pdf_fuente=preparacion['verificar'],
+                cache=self._obtener_cache(),
+                sesion=sesion
             )
             if ya_procesado:
                 mensaje = "Validación de contenido correcta. La Carta Glosa ya está unida."
@@ -118,72 +717,105 @@ class UnirSoportesWorker(QObject):
             razon = f"Error al verificar el contenido del archivo: {e}"
             resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
             return
-            
-        archivos_a_fusionar = [carta_glosa['path']] + soportes
-        archivos_a_fusionar.sort()
 
         try:
-            procesador_pdf.fusionar_pdfs_en_destino(
-                ruta_pdf_destino=respuesta_glosa['path'],
-                rutas_pdf_fuentes=archivos_a_fusionar
+            nota = self._fusionar(
+                ruta_carpeta,
+                resultados,
+                ruta_pdf_destino=preparacion['destino'],
+                rutas_pdf_fuentes=preparacion['fuentes'],
+                cache=self._obtener_cache(),
+                sesion=sesion
             )
-            mensaje = f"¡Unión exitosa! Se anexó la Carta Glosa y {len(soportes)} soporte(s)."
+            mensaje = f"¡Unión exitosa! Se anexó la Carta Glosa y {preparacion['soportes']} soporte(s)."
+            mensaje += nota
             resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
         except Exception as e:
             razon = f"Error crítico al intentar unir los PDFs: {e}"
             resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
 
-    def _procesar_carpeta_adres(self, ruta_carpeta, nombre_carpeta, resultados):
+    def _procesar_carpeta_adres(self, ruta_carpeta, nombre_carpeta, resultados, sesion):
         """Procesa una única carpeta según las reglas de ADRES."""
-        archivos_pdf = gestor_archivos.obtener_archivos_pdf(ruta_carpeta)
-        if not archivos_pdf:
+        preparacion, razon = self._preparar_carpeta(ruta_carpeta)
+        if razon:
+            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
+        if not preparacion:
             return
-
-        documentos = identificador_archivos.identificar_documentos_adres(archivos_pdf, ruta_carpeta)
-        
-        epicrisis = documentos['epicrisis']
-        respuesta_glosa = documentos['respuesta_glosa']
-        soportes = documentos['soportes']
-
-        if not epicrisis:
-            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": "Modo ADRES: No se encontró el archivo de Epicrisis."})
+            
+        if marcador_fusion.marcador_confirma_fusion(preparacion['destino'], preparacion['verificar'], sesion):
+            mensaje = "Marcador de unión vigente. La Respuesta Glosa ya está unida a la Epicrisis."
+            resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
             return
 
-        if not respuesta_glosa:
-            resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": "Modo ADRES: No se encontró el archivo de Respuesta Glosa."})
-            return
-            
+        cache = self._obtener_cache()
         if procesador_pdf.verificar_fusion_por_contenido(
-            ruta_pdf_destino=epicrisis['path'], 
-            ruta_pdf_fuente=respuesta_glosa['path']
+            ruta_pdf_destino=preparacion['destino'], 
+            ruta_pdf_fuente=preparacion['verificar'],
+            cache=cache,
+            sesion=sesion
         ):
             mensaje = "Validación correcta. La Respuesta Glosa ya parece estar unida a la Epicrisis."
             resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
             return
             
         try:
-            escritor = procesador_pdf.pypdf.PdfWriter()
-
-            lector_respuesta = procesador_pdf.pypdf.PdfReader(respuesta_glosa['path'])
-            for pagina in lector_respuesta.pages:
-                escritor.add_page(pagina)
+            nota = self._fusionar(
+                ruta_carpeta,
+                resultados,
+                ruta_pdf_destino=preparacion['destino'],
+                rutas_pdf_fuentes=preparacion['fuentes'],
+                cache=cache,
+                rutas_pdf_previas=preparacion['previas'],
+                sesion=sesion
+            )
 
-            lector_epicrisis = procesador_pdf.pypdf.PdfReader(epicrisis['path'])
-            for pagina in lector_epicrisis.pages:
-                escritor.add_page(pagina)
-            
-            soportes.sort()
-            for ruta_soporte in soportes:
-                lector_soporte = procesador_pdf.pypdf.PdfReader(ruta_soporte)
-                for pagina in lector_soporte.pages:
-                    escritor.add_page(pagina)
-
-            with open(epicrisis['path'], 'wb') as archivo_salida:
-                escritor.write(archivo_salida)
-                
-            mensaje = f"¡Unión ADRES exitosa! Se unió Respuesta + Epicrisis + {len(soportes)} soporte(s) en '{os.path.basename(epicrisis['path'])}'."
+            mensaje = f"¡Unión ADRES exitosa! Se unió Respuesta + Epicrisis + {preparacion['soportes']} soporte(s) en '{os.path.basename(preparacion['destino'])}'."
+            mensaje += nota
             resultados['exitosos'].append({"carpeta": nombre_carpeta, "razon": mensaje})
 
         except Exception as e:
             razon = f"Error crítico al intentar unir los PDFs en modo ADRES: {e}"
             resultados['fallidos'].append({"carpeta": nombre_carpeta, "razon": razon})
+
+
+def _identificar_sin_partes(identificar, archivos_pdf, ruta_carpeta, clave_destino):
+    """
+    Clasifica los PDF de la carpeta con 'identificar' sin tener en cuenta las partes en
+    que una ejecución anterior dividió el PDF destino ('<destino>_parte1.pdf'..., ver
+    optimizador_salida.dividir_pdf): por su nombre pueden pasar por otro documento (la
+    parte de 'FE_1.pdf' parece una Carta Glosa). Un nombre de parte nunca es el destino,
+    así que se busca el destino, se quitan sus partes y se vuelve a clasificar. Los
+    demás nombres terminados en '_parteN.pdf' se clasifican como cualquier otro.
+    """
+    documentos = identificar(archivos_pdf, ruta_carpeta)
+    destino = documentos[clave_destino]
+    if not destino:
+        return documentos
+    patron = optimizador_salida.patron_partes(destino['path'])
+    sin_partes = [nombre for nombre in archivos_pdf if not patron.fullmatch(nombre)]
+    if len(sin_partes) == len(archivos_pdf):
+        return documentos
+    return identificar(sin_partes, ruta_carpeta)
+
+
+def _procesar_carpeta_en_proceso(ruta_carpeta_raiz, modo, opciones, ruta_carpeta):
+    """
+    Punto de entrada de los procesos del pool: procesa una carpeta con un worker
+    propio y devuelve sus resultados parciales.
+    """
+    worker = UnirSoportesWorker(ruta_carpeta_raiz, modo, opciones)
+    try:
+        return worker._procesar_carpeta(ruta_carpeta, os.path.basename(ruta_carpeta))
+    finally:
+        worker._cerrar_cache()
+
+
+def _combinar_resultados(resultados, parciales):
+    """Agrega los resultados parciales de una carpeta al diccionario general."""
+    for clave, valor in parciales.items():
+        if isinstance(valor, list):
+            resultados.setdefault(clave, []).extend(valor)
+        else:
+            # Contadores numéricos (p. ej. 'bytes_ahorrados').
+            resultados[clave] = resultados.get(clave, 0) + valor
+
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
 from recursos.utils import resource_path
@@ -46,4 +47,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Necesario para que el pool de procesos de "Unir soportes" funcione en el ejecutable de PyInstaller.
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file